@@ -29,14 +29,14 @@ link = {
 	}
         
 flags = {
-	'c': ' -pedantic -fno-strict-aliasing -fno-common -DNDEBUG -O1'.split(),
+	'c': ' -pedantic -pthread -fno-strict-aliasing -fno-common -DNDEBUG -O3 -fno-trapping-math'.split(),
 	 'c++ cython': '-undefined dynamic_lookup'.split()
         }
 
 def make_links():    
     # populate with defaults unless altered above
     if link['c++ cython'] == '':        
-        link['c++ cython'] = '-L'+ get_python_lib() + ' -lpython2.7 -lcxsc'#.split()
+        link['c++ cython'] = '-L'+ get_python_lib() + ' -lpython2.7 -lcxsc -lpthread'#.split()
         link['c++ cython'] = link['c++ cython'].split()
     if link['c++'] == '':
         print link['c++ cython'] 
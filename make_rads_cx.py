@@ -43,7 +43,8 @@ dependencies = { # dependencies for cython (or c++!) files
     'cytree': ['tree','box','boxset','treedata'],
     'cyutils': ['box'],
     'cymapper': ['mapper','box','boxset'],
-    'cycombenc': ['tree','treedata','mapper','box','boxset'],
+    'cycombenc': ['enclosure','graphs','tree','treedata','mapper','box','boxset'],
+    'cygraphs': ['graphs'],
     'treetest': ['tree','treedata','box','boxset'],
     'debugtree': ['tree','treedata','box','boxset'],
     }
@@ -0,0 +1,83 @@
+#ifndef _bounds_h
+#define _bounds_h
+
+#include <math.h>
+#include <float.h>
+
+/*
+  Interval arithmetic on plain lower/upper bounds, for the batched
+  maps (see Mapper::map_boxes).  Each operation is done in the default
+  round-to-nearest mode and then moved outward by round_down/round_up,
+  which step past the rounding error of one operation (at most half an
+  ulp), so the results enclose the exact ones just as C-XSC's do, only
+  a few ulps wider.  There are no branches or mode switches, so loops
+  over arrays of bounds can be vectorized by the compiler.
+
+  exp is assumed accurate to within one ulp, as glibc's is.
+*/
+
+// 2^-51 times |x| is at least two ulps of x
+const double ROUND_EPS = 4.4408920985006262e-16;
+
+inline double round_down(double x) { return x - (fabs(x)*ROUND_EPS + DBL_MIN); }
+inline double round_up(double x) { return x + (fabs(x)*ROUND_EPS + DBL_MIN); }
+
+inline double min4(double a, double b, double c, double d)
+{
+  double ab = a < b ? a : b;
+  double cd = c < d ? c : d;
+  return ab < cd ? ab : cd;
+}
+
+inline double max4(double a, double b, double c, double d)
+{
+  double ab = a > b ? a : b;
+  double cd = c > d ? c : d;
+  return ab > cd ? ab : cd;
+}
+
+inline void add_bounds(double alo, double ahi, double blo, double bhi,
+					   double &lo, double &hi)
+{
+  lo = round_down(alo + blo);
+  hi = round_up(ahi + bhi);
+}
+
+inline void sub_bounds(double alo, double ahi, double blo, double bhi,
+					   double &lo, double &hi)
+{
+  lo = round_down(alo - bhi);
+  hi = round_up(ahi - blo);
+}
+
+inline void mul_bounds(double alo, double ahi, double blo, double bhi,
+					   double &lo, double &hi)
+{
+  double p = alo*blo, q = alo*bhi, r = ahi*blo, s = ahi*bhi;
+  lo = round_down(min4(p,q,r,s));
+  hi = round_up(max4(p,q,r,s));
+}
+
+inline void sqr_bounds(double alo, double ahi, double &lo, double &hi)
+{
+  double p = alo*alo, q = ahi*ahi;
+  double m = round_down(p < q ? p : q);
+  lo = alo*ahi > 0 ? m : 0.0;	// 0 if a holds 0
+  hi = round_up(p > q ? p : q);
+}
+
+inline void exp_bounds(double alo, double ahi, double &lo, double &hi)
+{
+  lo = round_down(exp(alo));
+  hi = round_up(exp(ahi));
+}
+
+// the smallest interval holding [alo,ahi] and [blo,bhi]
+inline void hull_bounds(double alo, double ahi, double blo, double bhi,
+						double &lo, double &hi)
+{
+  lo = alo < blo ? alo : blo;
+  hi = ahi > bhi ? ahi : bhi;
+}
+
+#endif
@@ -30,7 +30,7 @@ Box::operator IPoint()
   IPoint ints(size());
   for (int i=0; i<size(); i++)
     //ints[i] = capd::intervals::Interval< double > ( beg(i), end(i) );
-    ints[i] =  ( beg(i), end(i) );
+    ints[i] = interval( beg(i), end(i) );
   return ints;
 }
 
@@ -41,12 +41,21 @@ inline double Box::end(int i) const { return v[i]+w[i]; }
 int Box::size() const { return v.size(); }
 
 // convention: the ith coordinate of child number c is
-// (v[i],v[i]+w[i]/2) iff the ith bit of c is 0
+// (v[i],v[i]+w[i]/2) iff the ith bit of c is 0.  When splitting along a
+// single axis, child 0 is the lower half of that axis and child 1 the
+// upper half.
 
-Box Box::scale_down(int corner) const
+Box Box::scale_down(int corner, int axis) const
 {
   Box b(v,w);
 
+  if (axis >= 0)
+  {
+	b.w[axis] /= 2;
+	b.v[axis] += b.w[axis] * (corner & 1);
+	return b;
+  }
+
   for (int i=0; i<v.size(); i++)
   {
 	b.w[i] /= 2;
@@ -56,9 +65,14 @@ Box Box::scale_down(int corner) const
   return b;
 }
 
-Point Box::get_corner(int corner) const
+Point Box::get_corner(int corner, int axis) const
 {
   Point corner_vector = v;
+  if (axis >= 0)
+  {
+	corner_vector[axis] += (w[axis]/2) * (corner & 1);
+	return corner_vector;
+  }
   for (int i=0; i<v.size(); i++)
   {
 	// 1 if corner has a 1 in that bit, 0 otherwise
@@ -67,8 +81,11 @@ Point Box::get_corner(int corner) const
   return corner_vector;
 }
 
-int Box::child_hit(const Point &p) const
+int Box::child_hit(const Point &p, int axis) const
 {
+  if (axis >= 0)
+	return interval_contains(mid(axis),end(axis),p[axis]);
+
   int child=0;
   // use bitwise ops to corner the childnum
   for (int i=0; i<v.size(); i++)
@@ -93,13 +110,26 @@ bool Box::contains(const Point &p) const
   return true;
 }
 
-vector<int> Box::children_hit(const Box &b) const
+vector<int> Box::children_hit(const Box &b, int axis) const
 {
   // bit vectors
   unsigned int first=0;			// first half
   unsigned int second=0;		// second half
 
   vector<int> children;
+
+  if (axis >= 0)
+  {
+	for (int i=0; i<v.size(); i++)
+	  if (i != axis && !interval_intersect(b.beg(i),b.end(i),beg(i),end(i)))
+		return children;
+	if (interval_intersect(b.beg(axis),b.end(axis),beg(axis),mid(axis)))
+	  children.push_back(0);
+	if (interval_intersect(b.beg(axis),b.end(axis),mid(axis),end(axis)))
+	  children.push_back(1);
+	return children;
+  }
+
   int num_children = int( _double( power(2,v.size()) ) );
   children.reserve(num_children);
 
@@ -19,12 +19,14 @@ public:
   Box(const IPoint &i);
   operator IPoint();
 
-  Box scale_down(int i) const;
+  // children are numbered as in box.cpp.  With axis >= 0, the box is
+  // only split along that axis, into two children.
+  Box scale_down(int i, int axis=-1) const;
   bool contains(const Point &_v) const;
   bool intersects(const Box &b) const;
-  int child_hit(const Point &_v) const;
-  vector<int> children_hit(const Box &b) const;
-  Point get_corner(int corner) const;
+  int child_hit(const Point &_v, int axis=-1) const;
+  vector<int> children_hit(const Box &b, int axis=-1) const;
+  Point get_corner(int corner, int axis=-1) const;
   int size() const;
  
   // shorthand for the relevant points in the box
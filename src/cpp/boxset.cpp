@@ -1,5 +1,45 @@
 #include "boxset.h"
 
+UniformBoxSet::UniformBoxSet(const Point &w, const vector< Point > &c)
+  : count(c.size()), width(w)
+{
+  for (int i=0; i<count; i++)
+	set_corner(i,c[i]);
+}
+
+void UniformBoxSet::set_corner(int i, const Point &v)
+{
+  alloc();
+  copy(v.v.begin(),v.v.end(),corners.mutable_data()+i*dim());
+}
+
+Point UniformBoxSet::get_corner(int i) const
+{
+  Point p(dim());
+  copy(corner_data()+i*dim(),corner_data()+(i+1)*dim(),p.v.begin());
+  return p;
+}
+
+void BoxSet::set_box(int i, const Box &b)
+{
+  if (d == 0)
+  {
+	d = b.size();
+	corners.resize(count*d);
+	widths.resize(count*d);
+  }
+  copy(b.v.v.begin(),b.v.v.end(),corners.begin()+i*d);
+  copy(b.w.v.begin(),b.w.v.end(),widths.begin()+i*d);
+}
+
+Box BoxSet::get_box(int i) const
+{
+  Box b(d);
+  copy(corners.begin()+i*d,corners.begin()+(i+1)*d,b.v.v.begin());
+  copy(widths.begin()+i*d,widths.begin()+(i+1)*d,b.w.v.begin());
+  return b;
+}
+
 ostream &operator<<(ostream &output, const BoxSet &bs)
 {
   for (int i=0; i<bs.size(); i++)
@@ -5,44 +5,85 @@
 #include <vector>
 #include "point.h"
 #include "box.h"
+#include "sharedarray.h"
 
 using namespace std;
 
+// Boxes of any widths.  Corners and widths are kept in two flat
+// arrays of size()*dim() doubles; with the dimension left out, it is
+// taken from the first box set.
 class BoxSet
 {
-  vector<Box> boxes;
+  int count;
+  int d;
+  vector<double> corners;
+  vector<double> widths;
 
 public:
-  BoxSet() {};
-  BoxSet(int size) : boxes(size) {};
+  BoxSet() : count(0), d(0) {};
+  BoxSet(int size, int dimension=0)
+	: count(size), d(dimension), corners(size*dimension), widths(size*dimension) {};
 
-  void set_box(int i, const Box &b) { boxes[i] = b; }
-  Box get_box(int i) const { return boxes[i]; }
-  int size() const { return boxes.size(); }
-  int dim() const { return ((size()==0) ? 0 : boxes[0].size()); }
+  void set_box(int i, const Box &b);
+  Box get_box(int i) const;
+  int size() const { return count; }
+  int dim() const { return d; }
+
+  // the flat arrays, box i at [i*dim(),(i+1)*dim())
+  double *corner_data() { return corners.empty() ? 0 : &corners[0]; }
+  double *width_data() { return widths.empty() ? 0 : &widths[0]; }
+  const double *corner_data() const { return corners.empty() ? 0 : &corners[0]; }
+  const double *width_data() const { return widths.empty() ? 0 : &widths[0]; }
 };
 
+// Boxes of one common width, or, for the leaves of a locally refined
+// tree, of a few widths: box i then has width level_widths[levels[i]].
+// get_width() is always the smallest width.  The corners are kept in a
+// single flat array of size()*dim() doubles, shared (copy-on-write)
+// with wherever they came from, e.g. the leaves of a Tree.
 class UniformBoxSet
 {
-  vector<Point > corners;
+  int count;
+  SharedArray<double> corners;
   Point width;
+  SharedArray<unsigned char> levels; // empty if all widths are equal
+  vector<Point> level_widths;
+
+  // allocate the corners, once the dimension is known
+  void alloc() { if (corners.size() < (size_t)count*dim()) corners.resize(count*dim()); }
+
 public:
   
-  UniformBoxSet() {};
-  UniformBoxSet(int size) : corners(size) {};
-  UniformBoxSet(const Point &w) : width(w) {};
-  UniformBoxSet(int size, const Point &w) : corners(size), width(w) {};
-  UniformBoxSet(const Point &w, const vector< Point > &c) : corners(c), width(w) {};
+  UniformBoxSet() : count(0) {};
+  UniformBoxSet(int size) : count(size) {};
+  UniformBoxSet(const Point &w) : count(0), width(w) {};
+  UniformBoxSet(int size, const Point &w) : count(size), corners(size*w.size()), width(w) {};
+  UniformBoxSet(const Point &w, const vector< Point > &c);
+  UniformBoxSet(const Point &w, const SharedArray<double> &c)
+	: count(w.size() ? c.size()/w.size() : 0), corners(c), width(w) {};
+  UniformBoxSet(const SharedArray<double> &c, const SharedArray<unsigned char> &l,
+				const vector<Point> &lw)
+	: count(l.size()), corners(c), width(lw.back()), levels(l), level_widths(lw) {};
 
   void set_width(const Point &w) { width = w; }
   Point get_width() const { return width; }
-  void set_corner(int i, const Point &v) {	corners[i] = v; }
-  Point get_corner(int i) const { return corners[i]; }
-  Box get_box(int i) const { return Box(corners[i],width); }
-  int size() const { return corners.size(); }
+  void set_corner(int i, const Point &v);
+  Point get_corner(int i) const;
+  Point get_width(int i) const { return levels.empty() ? width : level_widths[levels[i]]; }
+  Box get_box(int i) const { return Box(get_corner(i),get_width(i)); }
+  int size() const { return count; }
   int dim() const { return width.size(); }
-};
 
+  // levels, for sets of several widths
+  int get_level(int i) const { return levels.empty() ? 0 : levels[i]; }
+  int num_levels() const { return levels.empty() ? 1 : level_widths.size(); }
+  Point get_level_width(int l) const { return levels.empty() ? width : level_widths[l]; }
+
+  // the flat corner array, without copying
+  const SharedArray<double> &corner_array() const { return corners; }
+  const double *corner_data() const { return corners.data(); }
+  const unsigned char *level_data() const { return levels.data(); }
+};
 
 ostream &operator<<(ostream &output, const BoxSet &bs);
 ostream &operator<<(ostream &output, const UniformBoxSet &ubs);
@@ -0,0 +1,192 @@
+#include <algorithm>
+#include "enclosure.h"
+#include "threads.h"
+#include "graphs.h"
+
+// boxes per chunk; fewer chunks would make each thread map its boxes
+// in fewer, longer loops, but balance the load worse
+const int ENCLOSURE_CHUNK = 4096;
+
+// a job over the boxes of ubs, in chunks, each giving a CSR piece
+class ChunkTask : public Task
+{
+protected:
+  const UniformBoxSet &ubs;
+
+public:
+  vector< vector<int> > indptrs;
+  vector< vector<int> > indices;
+
+  ChunkTask(const UniformBoxSet &bs)
+	: ubs(bs), indptrs(num_chunks()), indices(num_chunks()) {}
+
+  int num_chunks() const { return (ubs.size()+ENCLOSURE_CHUNK-1)/ENCLOSURE_CHUNK; }
+  int first(int k) const { return k*ENCLOSURE_CHUNK; }
+  int last(int k) const { return min(first(k)+ENCLOSURE_CHUNK,ubs.size()); }
+
+  // sort the rows of chunk k, so that the result is in id order
+  void sort_rows(int k)
+  {
+	vector<int> &p = indptrs[k];
+	for (size_t i=1; i<p.size(); i++)
+	  sort(indices[k].begin()+p[i-1],indices[k].begin()+p[i]);
+  }
+
+  // run on nthreads threads, and concatenate the chunks in order
+  void run_all(int nthreads, vector<int> &indptr, vector<int> &ind)
+  {
+	int nchunks = num_chunks();
+	run_tasks(*this,nchunks,nthreads);
+
+	size_t total = 0;
+	for (int k=0; k<nchunks; k++)
+	  total += indices[k].size();
+	indptr.assign(ubs.size()+1,0);
+	ind.clear();
+	ind.reserve(total);
+	for (int k=0; k<nchunks; k++)
+	{
+	  const vector<int> &p = indptrs[k];
+	  for (size_t i=1; i<p.size(); i++)
+		indptr[first(k)+i] = ind.size() + p[i];
+	  ind.insert(ind.end(),indices[k].begin(),indices[k].end());
+	  vector<int>().swap(indices[k]); // free as we go
+	}
+  }
+};
+
+// searches the tree for the boxes (or their images under m, if m is
+// given) of each chunk of ubs
+class SearchTask : public ChunkTask
+{
+  const Mapper *m;
+  const Tree &t;
+
+public:
+  SearchTask(const Mapper *mm, const Tree &tt, const UniformBoxSet &bs)
+	: ChunkTask(bs), m(mm), t(tt) {}
+
+  void run(int k)
+  {
+	if (m)
+	{
+	  BoxSet ims = m->map_points(ubs,first(k),last(k));
+	  t.search_boxes(ims,indptrs[k],indices[k]);
+	}
+	else
+	{
+	  BoxSet bs(last(k)-first(k),ubs.dim());
+	  for (int i=first(k); i<last(k); i++)
+		bs.set_box(i-first(k),ubs.get_box(i));
+	  t.search_boxes(bs,indptrs[k],indices[k]);
+	}
+	sort_rows(k);
+  }
+};
+
+// maps the boxes of each chunk of ubs (if m is given), and tests their
+// images against the boxes inside the previous leaves hit by their
+// parents' images
+class RefineTask : public ChunkTask
+{
+  const Mapper *m;
+  const int *parent;
+  const int *prevptr, *previnds;
+  const int *kidptr, *kids;
+  vector<double> widths;		// the box widths of each level
+
+public:
+  RefineTask(const Mapper *mm, const UniformBoxSet &bs, const int *par,
+			 const int *pp, const int *pi, const int *kp, const int *ki)
+	: ChunkTask(bs), m(mm), parent(par),
+	  prevptr(pp), previnds(pi), kidptr(kp), kids(ki)
+  {
+	for (int l=0; l<ubs.num_levels(); l++)
+	{
+	  Point w = ubs.get_level_width(l);
+	  widths.insert(widths.end(),w.v.begin(),w.v.end());
+	}
+  }
+
+  void run(int k)
+  {
+	int d = ubs.dim();
+	const double *corners = ubs.corner_data();
+	BoxSet ims;
+	if (m)
+	  ims = m->map_points(ubs,first(k),last(k));
+	vector<int> &p = indptrs[k];
+	vector<int> &hits = indices[k];
+	p.assign(1,0);
+	for (int i=first(k); i<last(k); i++)
+	{
+	  // the image, as Tree::search sees it
+	  const double *v = corners+i*d;
+	  const double *w = &widths[ubs.get_level(i)*d];
+	  if (m)
+	  {
+		v = ims.corner_data()+(i-first(k))*d;
+		w = ims.width_data()+(i-first(k))*d;
+	  }
+	  int a = parent[i];
+	  for (int r=prevptr[a]; r<prevptr[a+1]; r++)
+	  {
+		int b = previnds[r];
+		for (int s=kidptr[b]; s<kidptr[b+1]; s++)
+		{
+		  int j = kids[s];
+		  const double *c = corners+j*d;
+		  const double *cw = &widths[ubs.get_level(j)*d];
+		  bool hit = true;
+		  for (int x=0; x<d && hit; x++)
+			hit = interval_intersect(v[x],v[x]+w[x],c[x],c[x]+cw[x]);
+		  if (hit)
+			hits.push_back(j);
+		}
+	  }
+	  p.push_back(hits.size());
+	}
+	sort_rows(k);
+  }
+};
+
+void invariant_set(int n, const int *indptr, const int *indices,
+				   vector<char> &keep)
+{
+  vector<int> revptr, rev;
+  reverse_csr(n,indptr,indices,revptr,rev);
+  InvariantSet s(n,indptr,indices,&revptr[0],rev.empty() ? 0 : &rev[0],0);
+  keep = s.mask();
+}
+
+void enclosure_mvm(const Mapper &m, const Tree &t, const UniformBoxSet &ubs,
+				   int nthreads, vector<int> &indptr, vector<int> &indices)
+{
+  SearchTask task(&m,t,ubs);
+  task.run_all(nthreads,indptr,indices);
+}
+
+void enclosure_adj(const Tree &t, const UniformBoxSet &ubs,
+				   int nthreads, vector<int> &indptr, vector<int> &indices)
+{
+  SearchTask task(0,t,ubs);
+  task.run_all(nthreads,indptr,indices);
+}
+
+void enclosure_mvm_refine(const Mapper &m, const UniformBoxSet &ubs,
+						  const int *parent, const int *prevptr, const int *previnds,
+						  const int *kidptr, const int *kids,
+						  int nthreads, vector<int> &indptr, vector<int> &indices)
+{
+  RefineTask task(&m,ubs,parent,prevptr,previnds,kidptr,kids);
+  task.run_all(nthreads,indptr,indices);
+}
+
+void enclosure_adj_refine(const UniformBoxSet &ubs,
+						  const int *parent, const int *prevptr, const int *previnds,
+						  const int *kidptr, const int *kids,
+						  int nthreads, vector<int> &indptr, vector<int> &indices)
+{
+  RefineTask task(0,ubs,parent,prevptr,previnds,kidptr,kids);
+  task.run_all(nthreads,indptr,indices);
+}
@@ -0,0 +1,51 @@
+#ifndef _enclosure_h
+#define _enclosure_h
+
+#include <vector>
+#include "boxset.h"
+#include "mapper.h"
+#include "tree.h"
+
+// The multivalued map of a combinatorial enclosure, in CSR form: the
+// boxes of t hit by the image of box i of ubs under m are
+// indices[indptr[i]] .. indices[indptr[i+1]-1], in increasing order.
+//
+// The boxes are mapped and searched in chunks on up to nthreads threads
+// (one per processor if nthreads <= 0; see threads.h).  The result does
+// not depend on the number of threads.  Nothing here touches Python, so
+// it can run without the GIL; m and t must not change meanwhile.
+void enclosure_mvm(const Mapper &m, const Tree &t, const UniformBoxSet &ubs,
+				   int nthreads, vector<int> &indptr, vector<int> &indices);
+
+// The same for the boxes of t meeting each box of ubs (its neighbors,
+// and itself, if ubs are the boxes of t).
+void enclosure_adj(const Tree &t, const UniformBoxSet &ubs,
+				   int nthreads, vector<int> &indptr, vector<int> &indices);
+
+// enclosure_mvm for the boxes of a tree refined since the last time:
+// box i of ubs lies in leaf parent[i] of the tree as it was then, and
+// (prevptr,previnds) was the map on those leaves, in CSR form.  The
+// image of a box lies in the image of the box it lies in, so it can
+// only meet boxes inside the leaves that image met; those inside leaf
+// b are kids[kidptr[b]] .. kids[kidptr[b+1]-1].  Only these are tested,
+// instead of searching the whole tree.
+void enclosure_mvm_refine(const Mapper &m, const UniformBoxSet &ubs,
+						  const int *parent, const int *prevptr, const int *previnds,
+						  const int *kidptr, const int *kids,
+						  int nthreads, vector<int> &indptr, vector<int> &indices);
+
+// the same for enclosure_adj: a box can only meet boxes inside the
+// leaves its parent met
+void enclosure_adj_refine(const UniformBoxSet &ubs,
+						  const int *parent, const int *prevptr, const int *previnds,
+						  const int *kidptr, const int *kids,
+						  int nthreads, vector<int> &indptr, vector<int> &indices);
+
+// the maximal invariant set of the directed graph on n nodes with the
+// CSR edges indptr, indices: the nodes on a bi-infinite walk.  keep[i]
+// is set to 1 for those, 0 for the others.  Nodes with no edge in or
+// no edge out among those left are peeled off until there are none.
+void invariant_set(int n, const int *indptr, const int *indices,
+				   vector<char> &keep);
+
+#endif
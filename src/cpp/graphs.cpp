@@ -0,0 +1,562 @@
+#include <algorithm>
+#include "graphs.h"
+#include "threads.h"
+
+// frontier nodes per chunk, for the searches of scc_labels_parallel
+const int GRAPH_CHUNK = 4096;
+// scc_labels_parallel leaves the nodes to scc_labels once fewer than
+// GRAPH_SERIAL are left, or a round took less than 1/GRAPH_PEEL of them
+const int GRAPH_SERIAL = 4*GRAPH_CHUNK;
+const int GRAPH_PEEL = 8;
+
+int scc_labels(int n, const int *indptr, const int *indices, const char *alive,
+			   vector<int> &label, vector<int> &order, vector<int> &compptr,
+			   vector<char> &real)
+{
+  vector<int> pre(n,0), low(n,0), next(n,0);
+  vector<int> queue, sccq;
+  label.assign(n,-1);
+  order.clear();
+  compptr.assign(1,0);
+  real.clear();
+  int count = 0;				// preorder counter
+  for (int s=0; s<n; s++)
+  {
+	if ((alive && !alive[s]) || label[s] >= 0)
+	  continue;
+	queue.push_back(s);
+	while (!queue.empty())
+	{
+	  int v = queue.back();
+	  if (pre[v] == 0)
+	  {
+		pre[v] = ++count;
+		next[v] = indptr[v];
+	  }
+	  // descend to the first unvisited successor; the ones before it
+	  // stay visited, so the scan picks up where it left off
+	  bool done = true;
+	  for (; next[v]<indptr[v+1]; next[v]++)
+	  {
+		int w = indices[next[v]];
+		if ((!alive || alive[w]) && pre[w] == 0)
+		{
+		  queue.push_back(w);
+		  done = false;
+		  break;
+		}
+	  }
+	  if (!done)
+		continue;
+	  bool loop = false;
+	  low[v] = pre[v];
+	  for (int r=indptr[v]; r<indptr[v+1]; r++)
+	  {
+		int w = indices[r];
+		if ((alive && !alive[w]) || label[w] >= 0)
+		  continue;
+		if (w == v)
+		  loop = true;
+		low[v] = min(low[v], pre[w] > pre[v] ? low[w] : pre[w]);
+	  }
+	  queue.pop_back();
+	  if (low[v] == pre[v])
+	  {
+		int c = compptr.size()-1;
+		label[v] = c;
+		order.push_back(v);
+		while (!sccq.empty() && pre[sccq.back()] > pre[v])
+		{
+		  label[sccq.back()] = c;
+		  order.push_back(sccq.back());
+		  sccq.pop_back();
+		}
+		real.push_back(order.size()-compptr.back() > 1 || loop);
+		compptr.push_back(order.size());
+	  }
+	  else
+		sccq.push_back(v);
+	}
+  }
+  return compptr.size()-1;
+}
+
+void reverse_csr(int n, const int *indptr, const int *indices,
+				 vector<int> &revptr, vector<int> &rev)
+{
+  revptr.assign(n+1,0);
+  rev.resize(indptr[n]);
+  for (int r=0; r<indptr[n]; r++)
+	revptr[indices[r]+1]++;
+  for (int i=0; i<n; i++)
+	revptr[i+1] += revptr[i];
+  vector<int> fill(revptr.begin(),revptr.end()-1);
+  for (int i=0; i<n; i++)
+	for (int r=indptr[i]; r<indptr[i+1]; r++)
+	  rev[fill[indices[r]]++] = i;
+}
+
+void reach(int n, const int *indptr, const int *indices, const char *alive,
+		   vector<char> &mark)
+{
+  vector<int> stack;
+  for (int i=0; i<n; i++)
+	if (mark[i])
+	  stack.push_back(i);
+  while (!stack.empty())
+  {
+	int v = stack.back();
+	stack.pop_back();
+	for (int r=indptr[v]; r<indptr[v+1]; r++)
+	{
+	  int w = indices[r];
+	  if (!mark[w] && (!alive || alive[w]))
+	  {
+		mark[w] = 1;
+		stack.push_back(w);
+	  }
+	}
+  }
+}
+
+void invariant_nodes(int n, const int *indptr, const int *indices,
+					 const char *alive, const int *label, const char *real,
+					 vector<char> &keep)
+{
+  vector<char> back(n,0);
+  keep.assign(n,0);
+  for (int i=0; i<n; i++)
+	if (label[i] >= 0 && real[label[i]])
+	  keep[i] = back[i] = 1;
+  reach(n,indptr,indices,alive,keep);
+  vector<int> revptr, rev;
+  reverse_csr(n,indptr,indices,revptr,rev);
+  reach(n,&revptr[0],rev.empty() ? 0 : &rev[0],alive,back);
+  for (int i=0; i<n; i++)
+	keep[i] = keep[i] && back[i];
+}
+
+InvariantSet::InvariantSet(int nn, const int *ip, const int *ind,
+						   const int *rp, const int *r, const char *alive)
+  : n(nn), indptr(ip), indices(ind), revptr(rp), rev(r),
+	indeg(nn,0), outdeg(nn,0), keep(nn,1), count(0)
+{
+  if (alive)
+	keep.assign(alive,alive+n);
+  for (int i=0; i<n; i++)
+	if (keep[i])
+	  for (int s=indptr[i]; s<indptr[i+1]; s++)
+		if (keep[indices[s]])
+		{
+		  outdeg[i]++;
+		  indeg[indices[s]]++;
+		}
+  vector<int> stack, lost;
+  for (int i=0; i<n; i++)
+	if (keep[i])
+	{
+	  count++;
+	  if (outdeg[i] == 0 || indeg[i] == 0)
+	  {
+		keep[i] = 0;
+		stack.push_back(i);
+	  }
+	}
+  peel(stack,lost);
+}
+
+void InvariantSet::peel(vector<int> &stack, vector<int> &lost)
+{
+  // the nodes on the stack have just left the set
+  count -= stack.size();
+  lost.insert(lost.end(),stack.begin(),stack.end());
+  while (!stack.empty())
+  {
+	int v = stack.back();
+	stack.pop_back();
+	for (int s=indptr[v]; s<indptr[v+1]; s++)
+	{
+	  int w = indices[s];
+	  if (keep[w] && --indeg[w] == 0)
+	  {
+		keep[w] = 0;
+		count--;
+		lost.push_back(w);
+		stack.push_back(w);
+	  }
+	}
+	for (int s=revptr[v]; s<revptr[v+1]; s++)
+	{
+	  int u = rev[s];
+	  if (keep[u] && --outdeg[u] == 0)
+	  {
+		keep[u] = 0;
+		count--;
+		lost.push_back(u);
+		stack.push_back(u);
+	  }
+	}
+  }
+}
+
+void InvariantSet::remove(int k, const int *ids, vector<int> &lost)
+{
+  vector<int> stack;
+  for (int i=0; i<k; i++)
+	if (ids[i] >= 0 && ids[i] < n && keep[ids[i]])
+	{
+	  keep[ids[i]] = 0;
+	  stack.push_back(ids[i]);
+	}
+  peel(stack,lost);
+}
+
+// one round of a search on many threads: visit(v,out) for each node v
+// of the frontier, in chunks, each adding the nodes it changed to its
+// own out list, for the next round
+template <class Visit>
+class FrontierTask : public Task
+{
+  Visit &visit;
+  const vector<int> &frontier;
+
+public:
+  vector< vector<int> > out;
+
+  FrontierTask(Visit &vis, const vector<int> &f)
+	: visit(vis), frontier(f), out(num_chunks()) {}
+
+  int num_chunks() const { return (frontier.size()+GRAPH_CHUNK-1)/GRAPH_CHUNK; }
+
+  void run(int k)
+  {
+	int last = min((k+1)*GRAPH_CHUNK,(int)frontier.size());
+	for (int i=k*GRAPH_CHUNK; i<last; i++)
+	  visit(frontier[i],out[k]);
+  }
+};
+
+// rounds of visit from frontier until nothing changes (a node may come
+// up twice in a round, if two threads change it at once)
+template <class Visit>
+void search(Visit &visit, vector<int> frontier, ThreadPool &pool)
+{
+  while (!frontier.empty())
+  {
+	FrontierTask<Visit> task(visit,frontier);
+	pool.run(task,task.num_chunks());
+	frontier.clear();
+	for (size_t k=0; k<task.out.size(); k++)
+	  frontier.insert(frontier.end(),task.out[k].begin(),task.out[k].end());
+  }
+}
+
+// the colors (nodes) are ordered by a fixed shuffle of the nodes, not
+// by number: with the largest node winning, a chain of components
+// numbered up from its end would be colored from the top, every node
+// taking the color of each component above it in turn
+static inline unsigned color_rank(int v)
+{
+  unsigned h = (unsigned)v*2654435761u;
+  return h ^ (h >> 16);
+}
+
+// pushes the colors of the nodes (-1 in label) forward: each node
+// takes the largest color (see color_rank) of a node with an edge to it
+struct Colorer
+{
+  const int *indptr, *indices, *label;
+  int *color;
+
+  void operator()(int v, vector<int> &out)
+  {
+	int c = color[v];
+	unsigned rc = color_rank(c);
+	for (int s=indptr[v]; s<indptr[v+1]; s++)
+	{
+	  int w = indices[s];
+	  if (label[w] != -1)
+		continue;
+	  // raise color[w] to c, unless another thread raised it further
+	  int old = color[w];
+	  while (color_rank(old) < rc)
+	  {
+		int seen = __sync_val_compare_and_swap(&color[w],old,c);
+		if (seen == old)
+		{
+		  out.push_back(w);
+		  break;
+		}
+		old = seen;
+	  }
+	}
+  }
+};
+
+// marks the nodes reached from v (-1 in label) on the edges given
+struct Reacher
+{
+  const int *indptr, *indices, *label;
+  char *mark;
+
+  void operator()(int v, vector<int> &out)
+  {
+	for (int s=indptr[v]; s<indptr[v+1]; s++)
+	{
+	  int w = indices[s];
+	  if (label[w] == -1 && !mark[w] &&
+		  __sync_bool_compare_and_swap(&mark[w],0,1))
+		out.push_back(w);
+	}
+  }
+};
+
+// labels the nodes reaching v (on the reverse edges) with its color,
+// among those (-1 in label) of the same color
+struct Claimer
+{
+  const int *revptr, *rev, *color;
+  int *label;
+
+  void operator()(int v, vector<int> &out)
+  {
+	for (int s=revptr[v]; s<revptr[v+1]; s++)
+	{
+	  int u = rev[s];
+	  if (label[u] == -1 && color[u] == color[v] &&
+		  __sync_bool_compare_and_swap(&label[u],-1,color[v]))
+		out.push_back(u);
+	}
+  }
+};
+
+// takes the components of one or two nodes off the nodes left (-1 in
+// label): a node with no edge in, or none out, from the others, and a
+// pair of nodes whose only edges in (or only edges out) are from each
+// other.  As they go, the nodes they had edges with are looked at
+// again, so a chain of such components goes in one pass.
+class Trimmer
+{
+  const int *indptr, *indices, *revptr, *rev;
+  int *label;
+  vector<int> indeg, outdeg, stack;
+
+  // the one node left, other than v, on the edges of v given
+  int other(const int *ptr, const int *adj, int v) const
+  {
+	for (int s=ptr[v]; s<ptr[v+1]; s++)
+	  if (label[adj[s]] == -1 && adj[s] != v)
+		return adj[s];
+	return -1;
+  }
+
+  // the node u at the other end of the one edge of v given (in, or
+  // out) if that is also the one edge of u, -1 if there is none
+  int partner(const int *ptr, const int *adj, const vector<int> &deg, int v) const
+  {
+	if (deg[v] != 1)
+	  return -1;
+	int u = other(ptr,adj,v);
+	return (u >= 0 && deg[u] == 1 && other(ptr,adj,u) == v) ? u : -1;
+  }
+
+  void take(int v, int root)
+  {
+	label[v] = root;
+	for (int s=indptr[v]; s<indptr[v+1]; s++)
+	  if (label[indices[s]] == -1 && indices[s] != v)
+	  {
+		indeg[indices[s]]--;
+		stack.push_back(indices[s]);
+	  }
+	for (int s=revptr[v]; s<revptr[v+1]; s++)
+	  if (label[rev[s]] == -1 && rev[s] != v)
+	  {
+		outdeg[rev[s]]--;
+		stack.push_back(rev[s]);
+	  }
+  }
+
+public:
+  Trimmer(int n, const int *ip, const int *ind, const int *rp, const int *r,
+		  int *lab)
+	: indptr(ip), indices(ind), revptr(rp), rev(r), label(lab),
+	  indeg(n), outdeg(n) {}
+
+  // trim the nodes of active, leaving the rest in it
+  void trim(vector<int> &active)
+  {
+	for (size_t i=0; i<active.size(); i++)
+	{
+	  int v = active[i];
+	  indeg[v] = outdeg[v] = 0;
+	  for (int s=indptr[v]; s<indptr[v+1]; s++)
+		outdeg[v] += label[indices[s]] == -1 && indices[s] != v;
+	  for (int s=revptr[v]; s<revptr[v+1]; s++)
+		indeg[v] += label[rev[s]] == -1 && rev[s] != v;
+	}
+	stack = active;
+	while (!stack.empty())
+	{
+	  int v = stack.back();
+	  stack.pop_back();
+	  if (label[v] != -1)
+		continue;
+	  if (indeg[v] == 0 || outdeg[v] == 0)
+	  {
+		take(v,v);
+		continue;
+	  }
+	  int u = partner(revptr,rev,indeg,v);
+	  if (u < 0)
+		u = partner(indptr,indices,outdeg,v);
+	  if (u >= 0)
+	  {
+		take(v,v);
+		take(u,v);
+	  }
+	}
+	vector<int> left;
+	for (size_t i=0; i<active.size(); i++)
+	  if (label[active[i]] == -1)
+		left.push_back(active[i]);
+	active.swap(left);
+  }
+};
+
+// number the components (their roots in label, -2 for the nodes not
+// alive) by their smallest nodes, and flag the real ones
+static int number_components(int n, const int *indptr, const int *indices,
+							 vector<int> &label, vector<char> &real)
+{
+  vector<int> number(n,-1), size;
+  for (int v=0; v<n; v++)
+  {
+	if (label[v] == -2)
+	{
+	  label[v] = -1;
+	  continue;
+	}
+	int &c = number[label[v]];
+	if (c < 0)
+	{
+	  c = size.size();
+	  size.push_back(0);
+	}
+	label[v] = c;
+	size[c]++;
+  }
+  real.assign(size.size(),0);
+  for (int v=0; v<n; v++)
+	if (label[v] >= 0)
+	{
+	  real[label[v]] |= size[label[v]] > 1;
+	  for (int s=indptr[v]; s<indptr[v+1]; s++)
+		if (indices[s] == v)
+		  real[label[v]] = 1;
+	}
+  return size.size();
+}
+
+int scc_labels_parallel(int n, const int *indptr, const int *indices,
+						const char *alive, int nthreads, vector<int> &label,
+						vector<char> &real, vector<char> &keep)
+{
+  label.clear();
+  real.clear();
+  keep.clear();
+  if (n == 0)
+	return 0;
+  vector<int> revptr, rev;
+  reverse_csr(n,indptr,indices,revptr,rev);
+  const int *rp = &revptr[0], *r = rev.empty() ? 0 : &rev[0];
+
+  // trim: outside the invariant set, each node is a component, which
+  // is its own label here (-2 for the nodes not alive)
+  keep = InvariantSet(n,indptr,indices,rp,r,alive).mask();
+  label.assign(n,-1);
+  vector<int> active;
+  for (int v=0; v<n; v++)
+	if (keep[v])
+	  active.push_back(v);
+	else
+	  label[v] = (alive && !alive[v]) ? -2 : v;
+
+  if (active.empty())
+	return number_components(n,indptr,indices,label,real);
+
+  // the component of a pivot, likely the big one, is the nodes it
+  // reaches which reach it
+  ThreadPool pool(nthreads);
+  int pivot = active[0];
+  long best = -1;
+  for (size_t i=0; i<active.size(); i++)
+  {
+	int v = active[i];
+	long d = (long)(indptr[v+1]-indptr[v])*(revptr[v+1]-revptr[v]);
+	if (d > best)
+	{
+	  best = d;
+	  pivot = v;
+	}
+  }
+  vector<char> fw(n,0), bw(n,0);
+  fw[pivot] = bw[pivot] = 1;
+  Reacher forward = { indptr, indices, &label[0], &fw[0] };
+  Reacher backward = { rp, r, &label[0], &bw[0] };
+  search(forward,vector<int>(1,pivot),pool);
+  search(backward,vector<int>(1,pivot),pool);
+  vector<int> left;
+  for (size_t i=0; i<active.size(); i++)
+	if (fw[active[i]] && bw[active[i]])
+	  label[active[i]] = pivot;
+	else
+	  left.push_back(active[i]);
+  active.swap(left);
+  Trimmer trimmer(n,indptr,indices,rp,r,&label[0]);
+  trimmer.trim(active);
+
+  // then color the rest, while the rounds take enough of it
+  vector<int> color(n);
+  Colorer colorer = { indptr, indices, &label[0], &color[0] };
+  Claimer claimer = { rp, r, &color[0], &label[0] };
+  while (active.size() >= (size_t)GRAPH_SERIAL)
+  {
+	size_t before = active.size();
+	for (size_t i=0; i<active.size(); i++)
+	  color[active[i]] = active[i];
+	search(colorer,active,pool);
+	vector<int> roots;
+	for (size_t i=0; i<active.size(); i++)
+	  if (color[active[i]] == active[i])
+	  {
+		label[active[i]] = active[i];
+		roots.push_back(active[i]);
+	  }
+	search(claimer,roots,pool);
+	left.clear();
+	for (size_t i=0; i<active.size(); i++)
+	  if (label[active[i]] == -1)
+		left.push_back(active[i]);
+	active.swap(left);
+	trimmer.trim(active);
+	if (before - active.size() < before/GRAPH_PEEL)
+	  break;
+  }
+
+  // and the last of it in one pass, each component labeled by its root
+  if (!active.empty())
+  {
+	vector<char> rest(n,0);
+	for (size_t i=0; i<active.size(); i++)
+	  rest[active[i]] = 1;
+	vector<int> sl, order, compptr;
+	vector<char> sreal;
+	int m = scc_labels(n,indptr,indices,&rest[0],sl,order,compptr,sreal);
+	for (int c=0; c<m; c++)
+	  for (int i=compptr[c]; i<compptr[c+1]; i++)
+		label[order[i]] = order[compptr[c]];
+  }
+
+  return number_components(n,indptr,indices,label,real);
+}
@@ -0,0 +1,91 @@
+#ifndef _graphs_h
+#define _graphs_h
+
+#include <vector>
+using namespace std;
+
+// Directed graphs on the nodes 0..n-1 given by CSR arrays: the edges
+// out of node i go to indices[indptr[i]] .. indices[indptr[i+1]-1].
+// If alive is not 0, only the nodes i with alive[i] are in the graph
+// (with the edges between them).  Nothing here touches Python.
+
+// The strongly connected components, by Tarjan's algorithm with
+// Nuutila's modifications, without recursion.  The nodes are taken as
+// sources in order, and the edges of each in CSR order, so that the
+// components come out in the same order as from scc_raf walking the
+// same graph.  label[i] is the component of node i (-1 if not alive).
+// Component c is order[compptr[c]] .. order[compptr[c+1]-1], its root
+// first, as scc_raf lists it, and real[c] is 1 if it has more than one
+// node or a loop (is not transient).  Returns the number of components.
+int scc_labels(int n, const int *indptr, const int *indices, const char *alive,
+			   vector<int> &label, vector<int> &order, vector<int> &compptr,
+			   vector<char> &real);
+
+// The reverse of the graph (all nodes), in CSR form: the edges into
+// node j come from rev[revptr[j]] .. rev[revptr[j+1]-1], in order.
+void reverse_csr(int n, const int *indptr, const int *indices,
+				 vector<int> &revptr, vector<int> &rev);
+
+// Marks the nodes reachable from those marked in mark (by walks of
+// length 0 or more among the nodes alive).
+void reach(int n, const int *indptr, const int *indices, const char *alive,
+		   vector<char> &mark);
+
+// The maximal invariant set, as graph_mis finds it: the nodes reached
+// from a real component (see scc_labels) which also reach one.  keep[i]
+// is set to 1 for those, 0 for the others.  label and real are from
+// scc_labels on the same graph.
+void invariant_nodes(int n, const int *indptr, const int *indices,
+					 const char *alive, const int *label, const char *real,
+					 vector<char> &keep);
+
+// The maximal invariant set of a graph, kept as nodes are removed:
+// the nodes with no edge in or no edge out among those left in the
+// set are peeled off until there are none, starting from the set as
+// it was rather than from the whole graph.  It points to the arrays
+// of the graph (and its reverse, from reverse_csr), which must stay
+// put; copies share them.
+class InvariantSet
+{
+  int n;
+  const int *indptr, *indices, *revptr, *rev;
+  vector<int> indeg, outdeg;	// the edges in from, and out to, the set
+  vector<char> keep;
+  int count;
+
+  void peel(vector<int> &stack, vector<int> &lost);
+
+public:
+  InvariantSet(int nn, const int *ip, const int *ind, const int *rp,
+			   const int *r, const char *alive);
+
+  // take the nodes ids[0] .. ids[k-1] out of the graph (those not in
+  // the set are ignored); the nodes which leave the set are added to
+  // lost
+  void remove(int k, const int *ids, vector<int> &lost);
+
+  int size() const { return count; }
+  const vector<char> &mask() const { return keep; }
+};
+
+// The strongly connected components on nthreads threads (one per
+// processor if nthreads <= 0; see threads.h, the threads being started
+// once for the whole call), by trimming, a pivot and coloring.  The
+// nodes outside the maximal invariant set (as InvariantSet finds it)
+// are components of their own.  The component of a pivot with many
+// edges, likely the big one, is the nodes it reaches which reach it.
+// In the rest, each node takes the largest node reaching it, in a
+// fixed shuffled order, as its color, by searches in parallel until no color changes; the nodes of
+// color r which reach r (found by searches back from each such r at
+// once) make the component of r.  After the pivot and each round of
+// coloring, the components of one or two nodes are trimmed off what is
+// left, down chains of them at once.  The rounds go on while they take
+// a good share of the nodes left, and scc_labels does the last of
+// them.  The result is that of scc_labels, but for the order: the
+// components are numbered by their smallest nodes.  keep is set to the
+// maximal invariant set, as invariant_nodes would find it.
+int scc_labels_parallel(int n, const int *indptr, const int *indices,
+						const char *alive, int nthreads, vector<int> &label,
+						vector<char> &real, vector<char> &keep);
+
+#endif
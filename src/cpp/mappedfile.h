@@ -0,0 +1,48 @@
+#ifndef _mappedfile_h
+#define _mappedfile_h
+
+#include <sys/types.h>
+#include <sys/stat.h>
+#include <sys/mman.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include "sharedarray.h"
+
+// A whole file mapped read-only into memory.  SharedArrays wrapping
+// parts of it keep it mapped until the last of them goes away.
+class MappedFile : public ExternalMemory
+{
+  void *addr;
+  size_t len;
+
+public:
+  MappedFile() : addr(0), len(0) {}
+  ~MappedFile() { if (addr) munmap(addr,len); }
+
+  // returns false on failure
+  bool open(const char *path)
+  {
+	int fd = ::open(path,O_RDONLY);
+	if (fd < 0) return false;
+	struct stat st;
+	if (fstat(fd,&st) != 0 || st.st_size == 0)
+	{
+	  close(fd);
+	  return false;
+	}
+	len = st.st_size;
+	addr = mmap(0,len,PROT_READ,MAP_SHARED,fd,0);
+	close(fd);					// the mapping stays valid
+	if (addr == MAP_FAILED)
+	{
+	  addr = 0;
+	  return false;
+	}
+	return true;
+  }
+
+  const char *data() const { return (const char *)addr; }
+  size_t size() const { return len; }
+};
+
+#endif
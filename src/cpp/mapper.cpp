@@ -1,27 +1,63 @@
 #include "mapper.h"
 //#include "henon_cpp.h"
 
+// map n boxes given by flat corner and width arrays (n*dim doubles
+// each, box by box; widths may be 0 for a common width w), via
+// map_boxes
+static BoxSet map_flat (const Mapper &m, int n, const double *corners,
+						const double *widths, const Point &w)
+{
+  int d = m.dim();
+  vector<double> lo(n*d), hi(n*d), imlo(n*d), imhi(n*d);
+  for (int i=0; i<n; i++)
+	for (int k=0; k<d; k++)
+	{
+	  lo[k*n+i] = corners[i*d+k];
+	  hi[k*n+i] = round_up(corners[i*d+k] + (widths ? widths[i*d+k] : w[k]));
+	}
+  BoxSet vals(n,d);
+  if (n == 0)
+	return vals;
+  m.map_boxes(n,&lo[0],&hi[0],&imlo[0],&imhi[0]);
+  if (m.is_centered())
+	m.center_boxes(n,&lo[0],&hi[0],&imlo[0],&imhi[0]);
+  double *c = vals.corner_data();
+  double *cw = vals.width_data();
+  for (int i=0; i<n; i++)
+	for (int k=0; k<d; k++)
+	{
+	  c[i*d+k] = imlo[k*n+i];
+	  cw[i*d+k] = round_up(imhi[k*n+i] - imlo[k*n+i]);
+	}
+  return vals;
+}
+
 BoxSet Mapper::map_points (const UniformBoxSet &bs) const
 {
-  BoxSet vals(bs.size());
-  Box b;
-  b.w = bs.get_width();
-  for (int i=0; i<bs.size(); i++)
+  return map_points(bs,0,bs.size());
+}
+
+BoxSet Mapper::map_points (const UniformBoxSet &bs, int first, int last) const
+{
+  int d = dim();
+  int n = last-first;
+  const double *corners = bs.corner_data()+first*d;
+  if (bs.num_levels() == 1 || n == 0)
+	return map_flat(*this,n,corners,0,bs.get_width());
+
+  // boxes of several widths
+  vector<double> widths(n*d);
+  for (int i=0; i<n; i++)
   {
-	b.v = bs.get_corner(i);
-	vals.set_box(i,Box(map_point(b)));
+	Point w = bs.get_level_width(bs.get_level(first+i));
+	copy(w.v.begin(),w.v.end(),widths.begin()+i*d);
   }
-  return vals;
+  return map_flat(*this,n,corners,&widths[0],bs.get_width());
 }
 
 BoxSet Mapper::map_points (const BoxSet &bs) const
 {
-  BoxSet vals(bs.size());
-  for (int i=0; i<bs.size(); i++)
-  {
-	vals.set_box(i,Box(map_point(bs.get_box(i))));
-  }
-  return vals;
+  return map_flat(*this,bs.size(),bs.corner_data(),bs.width_data(),Point(dim()));
 }
 
 void maptest(const Mapper &m, int num_pts)
@@ -8,34 +8,128 @@
 #include <stdlib.h>
 #include <string>
 #include "boxset.h"
+#include "bounds.h"
 
 class Mapper
 {
 protected:
   IPoint params;
   vector<string> param_names;
+  bool centered;
 public:
   const int mydim;
   const string myname;
   
   Mapper(int dimension, string mapname)
 	: mydim(dimension), myname(mapname),
-	  params(dimension), param_names(dimension) {}
+	  params(dimension), param_names(dimension), centered(false) {}
 
       /* This constructor does not assume that the map and parameter
        * space have the same dimension. */
   Mapper(int dimension, int param_dimension, string mapname)
 	: mydim(dimension), myname(mapname),
-	  params(param_dimension), param_names(param_dimension) {}
+	  params(param_dimension), param_names(param_dimension), centered(false) {}
 
   virtual IPoint map_point (const IPoint &v) const = 0;
+
+  // an enclosure of the Jacobian matrix over the box v, row k holding
+  // the partial derivatives of coordinate k of the map; returns false
+  // if the map has none (the default)
+  virtual bool jacobian (const IPoint &v, vector<IPoint> &J) const { return false; }
+
+  // the image of v in centered form, f(c) + J(v)(v-c) for the center
+  // c of v, intersected with img (an image of v already computed).
+  // Like map_boxes, it is defined here for the maps (see below).
+  IPoint map_point_centered (const IPoint &v, const IPoint &img) const
+  {
+	int d = dim();
+	vector<IPoint> J(d,IPoint(d));
+	if (!jacobian(v,J))
+	  return img;
+	IPoint c(d), dv(d);
+	for (int k=0; k<d; k++)
+	{
+	  c[k] = interval((_double(Inf(v[k]))+_double(Sup(v[k])))/2);
+	  dv[k] = v[k] - c[k];
+	}
+	IPoint fc = map_point(c);
+	IPoint w(d);
+	for (int k=0; k<d; k++)
+	{
+	  interval y = fc[k];
+	  for (int j=0; j<d; j++)
+		y = y + J[k][j] * dv[j];
+	  // both enclose the image, so their intersection does
+	  double ylo = max(_double(Inf(y)),_double(Inf(img[k])));
+	  double yhi = min(_double(Sup(y)),_double(Sup(img[k])));
+	  w[k] = (ylo <= yhi) ? interval(ylo,yhi) : img[k];
+	}
+	return w;
+  }
+
+  // tighten the images imlo, imhi of n boxes lo, hi (as map_boxes
+  // wrote them) by map_point_centered
+  void center_boxes (int n, const double *lo, const double *hi,
+					 double *imlo, double *imhi) const
+  {
+	int d = dim();
+	IPoint v(d), img(d);
+	for (int i=0; i<n; i++)
+	{
+	  for (int k=0; k<d; k++)
+	  {
+		v[k] = interval(lo[k*n+i],hi[k*n+i]);
+		img[k] = interval(imlo[k*n+i],imhi[k*n+i]);
+	  }
+	  img = map_point_centered(v,img);
+	  for (int k=0; k<d; k++)
+	  {
+		imlo[k*n+i] = _double(Inf(img[k]));
+		imhi[k*n+i] = _double(Sup(img[k]));
+	  }
+	}
+  }
+
+  // map n boxes at once.  The bounds are in structure-of-arrays order:
+  // coordinate k of box i is [lo[k*n+i],hi[k*n+i]], and the image box
+  // is written the same way to imlo, imhi.  The default calls map_point
+  // on every box; maps override it with loops over the whole arrays
+  // (see bounds.h).  It is defined here, so that the maps, which are
+  // built without mapper.cpp, still get the vtable.
+  virtual void map_boxes (int n, const double *lo, const double *hi,
+						  double *imlo, double *imhi) const
+  {
+	int d = dim();
+	IPoint v(d);
+	for (int i=0; i<n; i++)
+	{
+	  for (int k=0; k<d; k++)
+		v[k] = interval(lo[k*n+i],hi[k*n+i]);
+	  IPoint w = map_point(v);
+	  for (int k=0; k<d; k++)
+	  {
+		imlo[k*n+i] = _double(Inf(w[k]));
+		imhi[k*n+i] = _double(Sup(w[k]));
+	  }
+	}
+  }
+
   BoxSet map_points (const UniformBoxSet &bs) const;
+  // only boxes first .. last-1 of bs
+  BoxSet map_points (const UniformBoxSet &bs, int first, int last) const;
   BoxSet map_points (const BoxSet &bs) const;
 
   IPoint get_params() { return params; }
   vector<string> get_param_names() { return param_names; }
   void set_params(IPoint p) { params = p; }
 
+  // with centered on, map_points tightens the images of maps with a
+  // jacobian by the centered form, which is much narrower than plain
+  // interval arithmetic for small boxes when a variable appears more
+  // than once in the map
+  void set_centered(bool c) { centered = c; }
+  bool is_centered() const { return centered; }
+
   int dim() const { return mydim; }
   string name() const { return myname; }
 };
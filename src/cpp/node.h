@@ -1,54 +1,171 @@
 #ifndef _node_h
 #define _node_h
 
+#include <vector>
+#include "sharedarray.h"
+
+using namespace std;
+
 typedef unsigned int uint;
 
+// A node of the box tree.  Nodes hold no pointers: the parent and
+// children are referred to by their index in the owning NodeArray.
 class Node
 {
 public:
   //  int coord;				// which coord this is split
-  int id;						// node id, for the leaves only
-  int childnum;					// this is parent->children[childnum]
-  Node *parent;
-  Node **children;
- 
-  Node(Node *myparent, int mychildnum, int myid=0)
+  int id;						// node id, for the leaves only (-1 otherwise)
+  int childnum;					// this is child number childnum of parent
+  int parent;					// index of the parent node (-1 for the root)
+  int children;					// offset of the child links (-1 if none)
+
+  Node(int myparent=-1, int mychildnum=0, int myid=-1)
+	: id(myid), childnum(mychildnum), parent(myparent), children(-1) {}
+};
+
+// Contiguous storage for all of the nodes of a tree.  The children of
+// a node are stored as a block of nkids indices (2^dim, or 2 for a
+// tree split one axis at a time) in a single link
+// array (-1 for a missing child), so adding a node never allocates
+// anything beyond amortized growth of the two arrays.  Both arrays are
+// copy-on-write (see sharedarray.h), so they may be shared with other
+// trees or wrap a memory mapped file.
+class NodeArray
+{
+  int nkids;					// children per node
+  SharedArray<Node> nodes;		// all nodes, root at index 0
+  SharedArray<int> links;		// child blocks, nkids per expanded node
+
+public:
+  NodeArray() : nkids(1) {}
+  NodeArray(int numkids) : nkids(numkids)
   {
-	parent = myparent;
-	id = myid;
-	childnum = mychildnum;
-	children = 0;
+	nodes.push_back(Node());	// the root
   }
+  NodeArray(int numkids, const SharedArray<Node> &n, const SharedArray<int> &l)
+	: nkids(numkids), nodes(n), links(l) {}
 
-  ~Node()
+  // the non-const one detaches shared arrays (see sharedarray.h): read
+  // through a const NodeArray where nothing is written
+  Node &operator[] (int n) { return nodes.mutable_data()[n]; }
+  const Node &operator[] (int n) const { return nodes[n]; }
+
+  // the raw arrays, for saving
+  const SharedArray<Node> &node_array() const { return nodes; }
+  const SharedArray<int> &link_array() const { return links; }
+
+  int size() const { return nodes.size(); }
+  int num_children() const { return nkids; }
+
+  void reserve(int n, int nlinks)
   {
-	if (children != 0)
-	  delete [] children;
+	nodes.reserve(n);
+	links.reserve(nlinks);
   }
 
-  void expand(int dim)
+  // give node n a block of (empty) child links
+  void expand(int n)
   {
-	children = new Node *[1<<dim];
-	for (int i=0; i<(1<<dim); i++)
-	  children[i] = 0;
+	if (nodes[n].children >= 0) return;
+	int k = links.size();
+	links.resize(k+nkids,-1);
+	(*this)[n].children = k;
   }
 
-  Node *addchild(int dim, int mychildnum, int myid=0)
+  // add child c to node n, returning the index of the new node
+  int addchild(int n, int c, int myid=-1)
   {
-	if (!children) expand(dim);
-	children[mychildnum] = new Node(this, mychildnum, myid);
-	return children[mychildnum];
+	expand(n);
+	int k = nodes.size();
+	nodes.push_back(Node(n,c,myid));
+	links.set(nodes[n].children+c,k);
+	return k;
   }
 
-  void delchild(int child)
+  void delchild(int n, int c)
   {
-	delete children[child];
-	children[child] = 0;
+	links.set(nodes[n].children+c,-1);
   }
 
-  bool haschild(int child)
+  bool haschild(int n, int c) const
+  {
+	return (nodes[n].children >= 0 && links[nodes[n].children+c] >= 0);
+  }
+
+  int child(int n, int c) const
+  {
+	return (nodes[n].children >= 0) ? links[nodes[n].children+c] : -1;
+  }
+
+  bool has_children(int n) const
+  {
+	for (int c=0; c<nkids; c++)
+	  if (haschild(n,c))
+		return true;
+	return false;
+  }
+
+  // true if node n has a child not marked dead
+  bool has_live_children(int n, const vector<char> &dead) const
+  {
+	for (int c=0; c<nkids; c++)
+	{
+	  int l = child(n,c);
+	  if (l >= 0 && !dead[l])
+		return true;
+	}
+	return false;
+  }
+
+  // drop the nodes marked dead, keeping the others in order.  newidx[n]
+  // is set to the new index of node n (-1 if it was dropped).  Child
+  // blocks with no live children left are dropped too.  The old arrays
+  // are only read, so a tree sharing them is never copied first.
+  void compact(const vector<char> &dead, vector<int> &newidx)
+  {
+	int n = size();
+	newidx.assign(n,-1);
+	int k = 0;
+	for (int i=0; i<n; i++)
+	  if (!dead[i])
+		newidx[i] = k++;
+
+	vector<Node> newnodes;
+	vector<int> newlinks;
+	newnodes.reserve(k);
+	for (int i=0; i<n; i++)
+	{
+	  if (dead[i])
+		continue;
+	  Node m = nodes[i];
+	  if (m.parent >= 0)
+		m.parent = newidx[m.parent];
+	  if (has_live_children(i,dead))
+	  {
+		int block = newlinks.size();
+		for (int c=0; c<nkids; c++)
+		{
+		  int l = links[m.children+c];
+		  newlinks.push_back(l >= 0 ? newidx[l] : -1);
+		}
+		m.children = block;
+	  }
+	  else
+		m.children = -1;
+	  newnodes.push_back(m);
+	}
+	nodes.adopt(newnodes);
+	links.adopt(newlinks);
+  }
+
+  // bytes used by the node storage
+  size_t memory() const
+  {
+	return nodes.memory() + links.memory();
+  }
+  size_t unshared_memory() const
   {
-	return (children && children[child]);
+	return nodes.unshared_memory() + links.unshared_memory();
   }
 };
 
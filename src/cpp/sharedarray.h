@@ -0,0 +1,154 @@
+#ifndef _sharedarray_h
+#define _sharedarray_h
+
+#include <vector>
+#include <algorithm>
+#include <stddef.h>
+
+using namespace std;
+
+// Something that owns memory wrapped by SharedArrays (see
+// SharedArray::wrap); it is deleted along with the last array using it.
+class ExternalMemory
+{
+public:
+  int refs;
+  ExternalMemory() : refs(0) {}
+  virtual ~ExternalMemory() {}
+};
+
+// A reference-counted, copy-on-write array.  Copies of a SharedArray
+// share one block of memory until one of them is modified, at which
+// point the modified copy detaches and gets its own block.  This lets
+// a tree hand its leaf corners to a UniformBoxSet (and on to numpy)
+// without copying them.
+//
+// A SharedArray may also wrap memory it does not own (e.g. a memory
+// mapped file); such an array is read-only, and the first modification
+// copies it into owned storage.
+//
+// The reference count is not atomic: copying or destroying
+// SharedArrays that share a block must not happen from several
+// threads at once.  Reading through a const SharedArray is safe.
+template < class T >
+class SharedArray
+{
+  struct Block
+  {
+	vector<T> store;			// the data, when owned
+	const T *ext;				// the data, when not owned (else 0)
+	size_t extsize;
+	ExternalMemory *owner;		// who keeps ext alive (may be 0)
+	int refs;
+
+	Block() : ext(0), extsize(0), owner(0), refs(1) {}
+	~Block()
+	{
+	  if (owner && --owner->refs == 0)
+		delete owner;
+	}
+	bool owned() const { return ext == 0; }
+	size_t size() const { return owned() ? store.size() : extsize; }
+	const T *data() const
+	{
+	  return owned() ? (store.empty() ? 0 : &store[0]) : ext;
+	}
+  };
+
+  Block *b;
+
+  void release()
+  {
+	if (b && --b->refs == 0)
+	  delete b;
+	b = 0;
+  }
+
+  // make sure we are the only owner of our block
+  void detach()
+  {
+	if (b == 0)
+	  b = new Block();
+	else if (b->refs > 1 || !b->owned())
+	{
+	  Block *nb = new Block();
+	  nb->store.assign(b->data(),b->data()+b->size());
+	  release();
+	  b = nb;
+	}
+  }
+
+public:
+  SharedArray() : b(0) {}
+  SharedArray(size_t n, const T &val=T()) : b(new Block())
+  {
+	b->store.assign(n,val);
+  }
+  SharedArray(const SharedArray &a) : b(a.b)
+  {
+	if (b) b->refs++;
+  }
+  ~SharedArray() { release(); }
+
+  SharedArray &operator= (const SharedArray &a)
+  {
+	if (a.b) a.b->refs++;
+	release();
+	b = a.b;
+	return *this;
+  }
+
+  // wrap n elements at p.  If owner is given, it is kept alive as long
+  // as the result (or a copy of it) is; otherwise p must outlive them.
+  static SharedArray wrap(const T *p, size_t n, ExternalMemory *owner=0)
+  {
+	SharedArray a;
+	a.b = new Block();
+	a.b->ext = p;
+	a.b->extsize = n;
+	a.b->owner = owner;
+	if (owner) owner->refs++;
+	return a;
+  }
+
+  // read access
+  size_t size() const { return b ? b->size() : 0; }
+  bool empty() const { return size() == 0; }
+  const T *data() const { return b ? b->data() : 0; }
+  const T &operator[] (size_t i) const { return data()[i]; }
+  bool shared() const { return b && (b->refs > 1 || !b->owned()); }
+
+  // write access (detaches first)
+  T *mutable_data() { detach(); return b->store.empty() ? 0 : &b->store[0]; }
+  void set(size_t i, const T &val) { detach(); b->store[i] = val; }
+  void resize(size_t n, const T &val=T()) { detach(); b->store.resize(n,val); }
+  void push_back(const T &val) { detach(); b->store.push_back(val); }
+  void reserve(size_t n) { detach(); b->store.reserve(n); }
+  // take the contents of v (leaving it empty) without copying them
+  void adopt(vector<T> &v)
+  {
+	release();
+	b = new Block();
+	b->store.swap(v);
+  }
+  void append(const T *first, const T *last)
+  {
+	detach();
+	b->store.insert(b->store.end(),first,last);
+  }
+
+  // bytes held by the block (shared with any copies)
+  size_t memory() const
+  {
+	if (b == 0) return 0;
+	return (b->owned() ? b->store.capacity() : b->extsize)*sizeof(T);
+  }
+
+  // bytes held by the block if no other array shares it
+  size_t unshared_memory() const
+  {
+	return shared() ? 0 : memory();
+  }
+};
+
+#endif
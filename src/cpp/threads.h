@@ -0,0 +1,186 @@
+#ifndef _threads_h
+#define _threads_h
+
+#include <pthread.h>
+#include <unistd.h>
+#include <vector>
+
+// A job split into numbered tasks, run(0) .. run(ntasks-1), which
+// may run at the same time on different threads.
+class Task
+{
+public:
+  virtual ~Task() {}
+  virtual void run(int k) = 0;
+};
+
+// the number of processors online
+inline int num_cpus()
+{
+  long n = sysconf(_SC_NPROCESSORS_ONLN);
+  return n > 0 ? (int)n : 1;
+}
+
+struct TaskQueue
+{
+  Task *task;
+  int ntasks;
+  int next;						// the next task to hand out
+  pthread_mutex_t lock;
+};
+
+inline void *task_worker(void *arg)
+{
+  TaskQueue *q = (TaskQueue *)arg;
+  for (;;)
+  {
+	pthread_mutex_lock(&q->lock);
+	int k = q->next++;
+	pthread_mutex_unlock(&q->lock);
+	if (k >= q->ntasks)
+	  return 0;
+	q->task->run(k);
+  }
+}
+
+// run all tasks of task on up to nthreads threads (one per processor
+// if nthreads <= 0), the calling thread being one of them.  Threads
+// take the next task as they finish one, so tasks of uneven cost even
+// out.  Returns once every task is done.
+inline void run_tasks(Task &task, int ntasks, int nthreads)
+{
+  if (nthreads <= 0)
+	nthreads = num_cpus();
+  if (nthreads > ntasks)
+	nthreads = ntasks;
+
+  TaskQueue q;
+  q.task = &task;
+  q.ntasks = ntasks;
+  q.next = 0;
+  pthread_mutex_init(&q.lock,0);
+
+  // if a thread cannot be started, the others do its share
+  pthread_t *threads = new pthread_t[nthreads > 1 ? nthreads-1 : 1];
+  int started = 0;
+  for (int i=0; i<nthreads-1; i++)
+	if (pthread_create(&threads[started],0,task_worker,&q) == 0)
+	  started++;
+  task_worker(&q);
+  for (int i=0; i<started; i++)
+	pthread_join(threads[i],0);
+  delete [] threads;
+  pthread_mutex_destroy(&q.lock);
+}
+
+// Threads kept for many runs of tasks, for jobs made of many small
+// rounds, where starting threads for each (as run_tasks does) would
+// cost more than the work.  The threads wait for run between rounds,
+// and are stopped when the pool is destroyed.
+class ThreadPool
+{
+  pthread_mutex_t lock;
+  pthread_cond_t work, idle;
+  Task *task;
+  int ntasks;
+  int next;						// the next task to hand out
+  int busy;						// threads at tasks of this round
+  unsigned round;				// counts the runs, so threads see new ones
+  bool quit;
+  std::vector<pthread_t> threads;
+
+  static void *worker(void *arg)
+  {
+	ThreadPool *p = (ThreadPool *)arg;
+	unsigned seen = 0;
+	pthread_mutex_lock(&p->lock);
+	for (;;)
+	{
+	  while (!p->quit && p->round == seen)
+		pthread_cond_wait(&p->work,&p->lock);
+	  if (p->quit)
+		break;
+	  seen = p->round;
+	  p->busy++;
+	  p->take();
+	  if (--p->busy == 0)
+		pthread_cond_signal(&p->idle);
+	}
+	pthread_mutex_unlock(&p->lock);
+	return 0;
+  }
+
+  // run tasks until there are none left (called holding the lock)
+  void take()
+  {
+	while (next < ntasks)
+	{
+	  int k = next++;
+	  pthread_mutex_unlock(&lock);
+	  task->run(k);
+	  pthread_mutex_lock(&lock);
+	}
+  }
+
+  ThreadPool(const ThreadPool &);
+  ThreadPool &operator=(const ThreadPool &);
+
+public:
+  // nthreads threads in all (one per processor if nthreads <= 0),
+  // counting the one calling run; if a thread cannot be started, the
+  // others do its share
+  ThreadPool(int nthreads)
+	: task(0), ntasks(0), next(0), busy(0), round(0), quit(false)
+  {
+	if (nthreads <= 0)
+	  nthreads = num_cpus();
+	pthread_mutex_init(&lock,0);
+	pthread_cond_init(&work,0);
+	pthread_cond_init(&idle,0);
+	for (int i=0; i<nthreads-1; i++)
+	{
+	  pthread_t t;
+	  if (pthread_create(&t,0,worker,this) == 0)
+		threads.push_back(t);
+	}
+  }
+
+  ~ThreadPool()
+  {
+	pthread_mutex_lock(&lock);
+	quit = true;
+	pthread_cond_broadcast(&work);
+	pthread_mutex_unlock(&lock);
+	for (size_t i=0; i<threads.size(); i++)
+	  pthread_join(threads[i],0);
+	pthread_cond_destroy(&idle);
+	pthread_cond_destroy(&work);
+	pthread_mutex_destroy(&lock);
+  }
+
+  int size() const { return threads.size()+1; }
+
+  // run all tasks of t, as run_tasks does, on the threads of the pool
+  // and the calling thread.  A single task is just run here.
+  void run(Task &t, int n)
+  {
+	if (n <= 1 || threads.empty())
+	{
+	  for (int k=0; k<n; k++)
+		t.run(k);
+	  return;
+	}
+	pthread_mutex_lock(&lock);
+	task = &t;
+	ntasks = n;
+	next = 0;
+	round++;
+	pthread_cond_broadcast(&work);
+	take();
+	while (busy > 0)
+	  pthread_cond_wait(&idle,&lock);
+	pthread_mutex_unlock(&lock);
+  }
+};
+
+#endif
@@ -1,92 +1,55 @@
 #include <stdio.h>
+#include <string.h>
 #include <iostream>
 #include <algorithm>
 #include "tree.h"
+#include "mappedfile.h"
 
-Tree::Tree(const Box &b)
-  : data(b.w)
+Tree::Tree(const Box &b, bool bin, bool sorted)
+  : binary(bin), keep_sorted(sorted), nodes(bin ? 2 : 1<<b.v.size()), data(b.w,bin)
 {
   dim = b.v.size();				// dimension
   rootbox = b;					// bounding box
-  root = new Node(0,0,0);		// root of the tree
   fulldepth = 0;				// set depth
-  top();						// set recursive vars
 }
 
+// a snapshot: the node and leaf arrays are shared with t until one of
+// the two trees modifies them (see sharedarray.h), so copies of a big
+// tree are cheap as long as they are only searched or pruned
 Tree::Tree(const Tree &t)
-  : data(t.data)
+  : binary(t.binary), keep_sorted(t.keep_sorted), nodes(t.nodes), data(t.data)
 {
   dim = t.dim;					// dimension
   rootbox = t.rootbox;			// bounding box
   fulldepth = t.fulldepth;		// depth of the tree
-  root = new Node(0,0,0);		// root of the tree
-  top();						// set recursive vars
-  copy_rec(root,t.root);
-}
-
-void Tree::copy_rec(Node *to, Node *from)
-{
-  //  printf("copying node %i (depth %i)\n",from->id,recdepth);
-
-  if (recdepth == fulldepth)	// at a leaf
-  {
-	data.set_node(to);			// update entry for Node *
-  }
-  else if (from->children)		// node has kids
-  {
-	for (int i=0; i<power(2,dim); i++)
-	{
-	  if (from->children[i])
-	  {
-		to->addchild(dim,i,from->children[i]->id);
-		recdepth++;
-		copy_rec(to->children[i], from->children[i]);
-		recdepth--;
-	  }
-	}
-  }
 }
 
 Tree::~Tree()
 {
   cout << "in ~Tree()" << endl;
-  del(root);
 }
 
-void Tree::del(Node *n)
+void Tree::print() const
 {
-  //  printf("in Node %i's d'tor\n",n->id);
-
-  if (n->children)
-  {
-	for (int i=0; i<power(2,dim); i++)
-	{
-	  if (n->children[i]) del(n->children[i]);
-	}
-  }
-  delete n;	// recursively, all children are gone
-}
-
-void Tree::print()
-{
-  top();
-  print_rec();
+  Cursor c;
+  top(c);
+  print_rec(c);
 }
 
-void Tree::print_rec()
+void Tree::print_rec(Cursor &c) const
 {
-  cout << "depth = " << recdepth << "  "
-	   << "node->id = " << recnode->id << (recdepth==fulldepth ? " * " : "   ")
-	   << "box: " << recboxes.back().v
-	   << "," << recboxes.back().w
+  cout << "depth = " << c.depth << "  "
+	   << "node->id = " << nodes[c.node].id << (nodes[c.node].id >= 0 ? " * " : "   ")
+	   << "box: " << c.boxes.back().v
+	   << "," << c.boxes.back().w
 	   << endl;
 
-  for (int i=0; i<power(2,dim); i++)
+  for (int i=0; i<nodes.num_children(); i++)
   {
-	if (down(i))
+	if (down(c,i))
 	{
-	  print_rec();
-	  up();
+	  print_rec(c);
+	  up(c);
 	}
   }  
 }
@@ -94,52 +57,173 @@ void Tree::print_rec()
 // increase the depth by one
 void Tree::subdivide()
 {
-  Box box;
-  box.w = data.size_vector();
-  data.set_size_vector(halve_vector(box.w)); // shrink boxes
+  fulldepth++;
+  data.set_depth(fulldepth);
 
   int oldlen = data.count();
-  int num_children = power(2,dim);
+  int num_children = nodes.num_children();
+  nodes.reserve(nodes.size()+oldlen*num_children,
+				(nodes.size()+oldlen)*num_children);
   data.resize(oldlen*num_children);
 
   // start from the end so we can write in place
+  Box box;
   for (int i=oldlen-1; i>=0; i--)
   {
-	data.node(i)->expand(dim);
+	int n = data.node(i);
+	int level = data.level(i);
+	uint64_t key = data.key(i) << level_bits();
+	nodes[n].id = -1;			// no longer a leaf
+	box.v = data.corner_vector(i);			// ith corner vec
+	box.w = data.size_vector(level);
 
 	for (int c=num_children-1; c>=0; c--)
 	{
 	  int id = num_children*i+c;
 	  //	  cout << "adding node " << id << " to old node " << i << endl;
-	  data.set_node(id,data.node(i)->addchild(dim,c,id)); // add and wire simultaneously
-
-	  box.v = data.corner_vector(i);			// ith corner vec
-	  data.set_corner(id, box.get_corner(c));
+	  data.set_node(id,nodes.addchild(n,c,id)); // add and wire simultaneously
+	  data.set_corner(id, box.get_corner(c,split_axis(level)));
+	  data.set_level(id, level+1);
+	  data.set_key(id, key | c);
 	}
   }
-  fulldepth++;
 }  
 
-void Tree::set_depth(int depth)
+// subdivide only the leaves in ids.  Child 0 of each leaf keeps the
+// leaf's id and the other children are appended, so no other id
+// changes.  The ids of the children are appended to newids, in order
+// of the (sorted, distinct) ids, unless the tree is kept sorted, in
+// which case all ids may change.  Returns -1 if an id is out of range.
+int Tree::subdivide(vector<int> ids, vector<int> &newids)
+{
+  sort(ids.begin(),ids.end());
+  ids.erase(unique(ids.begin(),ids.end()),ids.end());
+  if (ids.size() == 0)
+	return 0;
+  if (ids.front() < 0 || ids.back() >= count())
+	return -1;
+
+  int first = count();
+  int num_children = nodes.num_children();
+  nodes.reserve(nodes.size()+ids.size()*num_children,
+				nodes.link_array().size()+ids.size()*num_children);
+  data.resize(first+ids.size()*(num_children-1));
+  newids.reserve(newids.size()+ids.size()*num_children);
+
+  Box box;
+  for (int k=0; k<ids.size(); k++)
+  {
+	int n = data.node(ids[k]);
+	int level = data.level(ids[k]);
+	if (level+1 > fulldepth)
+	{
+	  fulldepth = level+1;
+	  data.set_depth(fulldepth);
+	}
+	uint64_t key = data.key(ids[k]) << level_bits();
+	nodes[n].id = -1;			// no longer a leaf
+	box.v = data.corner_vector(ids[k]);
+	box.w = data.size_vector(level);
+
+	for (int c=0; c<num_children; c++)
+	{
+	  int id = (c == 0) ? ids[k] : first+k*(num_children-1)+c-1;
+	  data.set_node(id,nodes.addchild(n,c,id));
+	  data.set_corner(id, box.get_corner(c,split_axis(level)));
+	  data.set_level(id, level+1);
+	  data.set_key(id, key | c);
+	  newids.push_back(id);
+	}
+  }
+  if (keep_sorted)
+	resort(newids);
+  return 0;
+}
+
+// set the depth new boxes are inserted at.  Returns -1, changing
+// nothing, if depth is below the current depth.
+int Tree::set_depth(int depth)
 {
   if (depth < fulldepth)
-	cerr << "Tree.set_depth: cannot go to a lower depth.  Use Tree.clear() first." << endl;
+	return -1;
   fulldepth = depth;
+  data.set_depth(fulldepth);
+  return 0;
 }
   
 // find box by point, returning its id or -1 if not found
-int Tree::search(const Point &v)
+int Tree::search(const Point &v) const
+{
+  Cursor c;
+  return search(v,c);
+}
+
+int Tree::search(const Point &v, Cursor &c) const
 {
   if (!rootbox.contains(v))
 	return -1;
 
-  top();						// reset recnode, recbox
-  while (recdepth < fulldepth)
+  top(c);						// reset c.node, c.boxes
+  while (nodes[c.node].id < 0)	// until we reach a leaf
   {
-	int i = recboxes.back().child_hit(v); // has to hit a child
-	if (!down(i)) return -1;
+	int i = c.boxes.back().child_hit(v,split_axis(c.depth)); // has to hit a child
+	if (!down(c,i)) return -1;
+  }
+  return nodes[c.node].id;
+}
+
+// ids[k] is the leaf containing point k, or -1
+void Tree::search_points(int n, const double *pts, int *ids) const
+{
+  Cursor c;
+  Point v(dim);
+  for (int k=0; k<n; k++)
+  {
+	copy(pts+k*dim,pts+(k+1)*dim,v.v.begin());
+	ids[k] = search(v,c);
+  }
+}
+
+// CSR output: the leaves hit by box k are
+// indices[indptr[k]] .. indices[indptr[k+1]-1]
+void Tree::search_boxes(int n, const double *boxes,
+						vector<int> &indptr, vector<int> &indices) const
+{
+  Cursor c;
+  Box b(dim);
+  indptr.assign(n+1,0);
+  indices.clear();
+  for (int k=0; k<n; k++)
+  {
+	const double *bk = boxes+2*k*dim;
+	copy(bk,bk+dim,b.v.v.begin());
+	copy(bk+dim,bk+2*dim,b.w.v.begin());
+	if (rootbox.intersects(b))
+	{
+	  top(c);
+	  search_rec(b,indices,c);
+	}
+	indptr[k+1] = indices.size();
+  }
+}
+
+// the same, for the boxes of bs
+void Tree::search_boxes(const BoxSet &bs,
+						vector<int> &indptr, vector<int> &indices) const
+{
+  Cursor c;
+  indptr.assign(bs.size()+1,0);
+  indices.clear();
+  for (int k=0; k<bs.size(); k++)
+  {
+	Box b = bs.get_box(k);
+	if (rootbox.intersects(b))
+	{
+	  top(c);
+	  search_rec(b,indices,c);
+	}
+	indptr[k+1] = indices.size();
   }
-  return recnode->id;
 }
 
 // TODO: what does this need to return? success?
@@ -149,73 +233,74 @@ int Tree::insert(const Point &v)
   if (!rootbox.contains(v))
 	return -2;
 
-  top();						// reset recnode, recbox
+  Cursor c;
+  top(c);						// reset c.node, c.boxes
 
-  bool inserted = false;
-  while (recdepth < fulldepth)
+  while (c.depth < fulldepth)
   {
-	int i = recboxes.back().child_hit(v);
-	if (!down(i))
+	if (nodes[c.node].id >= 0)	// already covered by a coarser leaf
+	  return -1;
+	int i = c.boxes.back().child_hit(v,split_axis(c.depth));
+	if (!down(c,i))
 	{
-	  recnode->addchild(dim,i);
-	  inserted = true;
+	  nodes.addchild(c.node,i);
+	  down(c,i);
 	}
   }
 
-  if (inserted || fulldepth==0)	// add the new box! if depth==0, add the root box
+  if (nodes[c.node].id < 0)		// add the new box! if depth==0, add the root box
   {
-	data.add(recnode,recboxes.back().v);
-	return recnode->id;
+	vector<int> id(1,data.add(c.node,c.boxes.back().v,c.depth,path_key(c.node)));
+	nodes[c.node].id = id[0];
+	if (keep_sorted)
+	  resort(id);
+	return id[0];
   }
 
   return -1;
 }
 
-vector<int> Tree::search(const Box &b)
+vector<int> Tree::search(const Box &b) const
 {
   //  cout << "C++: tree.search(" << b << ")" << endl;
 
   vector<int> nums;
 
-  if (fulldepth==0)
+  if (rootbox.intersects(b))
   {
-    if (rootbox.intersects(b))
-	  nums.push_back(root->id);		// add root
-  }
-  else
-  {
-	top();
-	search_rec(b,nums);
+	Cursor c;
+	top(c);
+	search_rec(b,nums,c);
   }
   
   return nums;
 }
  
-void Tree::search_rec(const Box &b, vector<int> &nums)
+void Tree::search_rec(const Box &b, vector<int> &nums, Cursor &c) const
 {
-  if (recdepth == fulldepth)               // base case: at a leaf
+  if (nodes[c.node].id >= 0)               // base case: at a leaf
   {
 // 	cout << "C++: at leaf node ["
-// 		 << recdepth << ","
-// 		 << recnode->id << "]"
+// 		 << c.depth << ","
+// 		 << c.node->id << "]"
 // 		 << endl;
-    nums.push_back(recnode->id);
+    nums.push_back(nodes[c.node].id);
     return;
   }
 
-  vector<int> children = recboxes.back().children_hit(b);
+  vector<int> children = c.boxes.back().children_hit(b,split_axis(c.depth));
 
 //   cout << "C++: children of node ["
-// 	   << recdepth << ","
-// 	   << recnode->id << "]:  "
+// 	   << c.depth << ","
+// 	   << c.node->id << "]:  "
 // 	   << children << endl;
 
   for (int i=0; i<children.size(); i++)
   {
-	if (down(children[i]))		// descend into children[i]th child
+	if (down(c,children[i]))		// descend into children[i]th child
 	{
-	  search_rec(b,nums);
-	  up();
+	  search_rec(b,nums,c);
+	  up(c);
 	}
   }
 }
@@ -226,94 +311,521 @@ vector<int> Tree::insert(const Box &b)
   vector<int> nums;
 
   if (!rootbox.intersects(b)) return nums;
-  top();
-  insert_rec(b,nums,false);
+  Cursor c;
+  top(c);
+  insert_rec(b,nums,c);
+  if (keep_sorted)
+	resort(nums);
   return nums;
 }
  
-// bool inserted - whether this node was just inserted
-void Tree::insert_rec(const Box &box, vector<int> &nums, bool inserted)
+void Tree::insert_rec(const Box &box, vector<int> &nums, Cursor &c)
 {
-  if (recdepth == fulldepth)               // base case: at a leaf
+  if (nodes[c.node].id >= 0)	// already covered by a leaf
+	return;
+  if (c.depth == fulldepth)               // base case: at the bottom
   {
-	if (inserted || fulldepth==0) // a child was added to a node, or at root
-	{
-	  data.add(recnode,recboxes.back().v);
-      //	  nums.push_back(recnode->id);
-	}
+	// a child was just added to a node, or we are at an empty root
+	nodes[c.node].id = data.add(c.node,c.boxes.back().v,c.depth,path_key(c.node));
+	//	  nums.push_back(c.node->id);
     return;
   }
 
-  vector<int> children = recboxes.back().children_hit(box);
+  vector<int> children = c.boxes.back().children_hit(box,split_axis(c.depth));
   for (int i=0; i<children.size(); i++)
   {
-   	inserted = false;			// IMPORTANT: reset to false each time
-	if (!down(children[i]))		// try to go to children[i]th child
+	if (!down(c,children[i]))		// try to go to children[i]th child
 	{							
-	  recnode->addchild(dim,children[i]); // failed, so add the child
-	  inserted = true;					  // just inserted this child
-	  down(children[i]);		// now go to children[i]th child
+	  nodes.addchild(c.node,children[i]); // failed, so add the child
+	  down(c,children[i]);		// now go to children[i]th child
 	}
 
-	insert_rec(box,nums,inserted);
-	up();
+	insert_rec(box,nums,c);
+	up(c);
   }
 }
 
 // remove box(es)
 int Tree::remove(int id)
 {
-  remove(vector<int> (1,id));
-  return 0;
+  return remove(vector<int> (1,id));
 }
 
 int Tree::remove(vector<int> idvec)
 {
-  if (idvec.size() == 0)
-	return 0;					// successfully removed nothing!
+  vector<int> remap;
+  return remove(idvec,remap);
+}
+
+// remove the leaves in idvec, along with the internal nodes left without
+// children, and compact the node and leaf arrays.  The remaining leaves
+// keep their order; remap[i] is the new id of old leaf i (-1 if it was
+// removed).  Returns -1, removing nothing, if an id is out of range.
+int Tree::remove(vector<int> idvec, vector<int> &remap)
+{
   sort(idvec.begin(),idvec.end());
-  if (idvec.back() > count())
+  idvec.erase(unique(idvec.begin(),idvec.end()),idvec.end());
+  if (idvec.size() > 0 && (idvec.front() < 0 || idvec.back() >= count()))
 	return -1;		// exit softly if ids are out of range
+
+  // the new ids
+  int oldcount = count();
+  remap.resize(oldcount);
+  for (int i=0, gone=0; i<oldcount; i++)
+  {
+	if (gone < idvec.size() && idvec[gone] == i)
+	{
+	  remap[i] = -1;
+	  gone++;
+	}
+	else
+	  remap[i] = i-gone;
+  }
+  if (idvec.size() == 0)
+	return 0;					// successfully removed nothing!
   
-  // do the actual deletions
+  // mark the leaves dead, and any parents left without live children.
+  // The node arrays are not written until compact() builds new ones,
+  // so removing boxes from a snapshot (see Tree(const Tree&)) never
+  // copies the whole of the shared arrays.  They are read through cn:
+  // the non-const operator[] would detach them.
+  const NodeArray &cn = nodes;
+  vector<char> dead(cn.size(),0);
+  bool rootgone = false;
   for (int i=0; i<idvec.size(); i++)
   {
-	Node *node = data.node(idvec[i]);
-	node->parent->delchild(node->childnum);
-	// TODO: should nodes keep a child count and get destroyed if it's
-	// 0?  or is it okay to have a lot of 'dangling' intermediate nodes?
+	int n = data.node(idvec[i]);
+	if (n == 0)
+	  rootgone = true;			// never remove the root
+	else
+	  dead[n] = 1;
+	for (n = cn[n].parent; n > 0 && !cn.has_live_children(n,dead);
+		 n = cn[n].parent)
+	  dead[n] = 1;
   }
 
-  // update the lists and ids
+  // compact the nodes, then the leaves, and rewire them
+  vector<int> newidx;
+  nodes.compact(dead,newidx);
   data.remove(idvec);
+  if (rootgone)
+	nodes[0].id = -1;
+  for (int i=0; i<count(); i++)
+  {
+	int n = newidx[data.node(i)];
+	data.set_node(i,n);
+	nodes[n].id = i;
+  }
+  return 0;
+}
+
+/*
+  Keys.  The key of a leaf is the sequence of child numbers on its path
+  from the root, level_bits() bits per level, root first.  Child c of a
+  box is in the upper half of axis i iff bit i of c is set (or, in a
+  binary tree, iff c is 1, for the one axis split at that level), so
+  the key interleaves the bits of the leaf's integer grid coordinates.
+  Leaves of different levels are compared on the grid of the full
+  depth, by shifting their keys left to fulldepth levels ("aligned"
+  keys); a coarse leaf then gets the key and grid coordinates of its
+  lowest corner cell.  The order of the aligned keys is the order of a
+  depth first traversal of the tree.
+*/
+
+uint64_t Tree::path_key(int n) const
+{
+  uint64_t key = 0;
+  int shift = 0;
+  for (; nodes[n].parent >= 0; n = nodes[n].parent)
+  {
+	if (shift < 64)
+	  key |= (uint64_t)nodes[n].childnum << shift;
+	shift += level_bits();
+  }
+  return key;
+}
+
+uint64_t Tree::aligned_key(int id) const
+{
+  int shift = level_bits()*(fulldepth-data.level(id));
+  return (shift < 64) ? data.key(id) << shift : 0;
+}
+
+void Tree::key_to_coords(uint64_t key, int64_t *coords) const
+{
+  int b = level_bits();
+  uint64_t mask = ((uint64_t)1 << b) - 1;
+  fill(coords,coords+dim,0);
+  for (int k=0; k<fulldepth; k++)
+  {
+	uint64_t c = (key >> (b*(fulldepth-1-k))) & mask;
+	if (binary)
+	  coords[k%dim] = (coords[k%dim] << 1) | c;
+	else
+	  for (int i=0; i<dim; i++)
+		coords[i] = (coords[i] << 1) | ((c >> i) & 1);
+  }
+}
+
+// returns ~0 (not a valid key) for coordinates off the grid
+uint64_t Tree::coords_to_key(const int64_t *coords) const
+{
+  for (int i=0; i<dim; i++)
+  {
+	// number of times axis i is split
+	int splits = binary ? fulldepth/dim + (i < fulldepth%dim) : fulldepth;
+	if (coords[i] < 0 || coords[i] >= ((int64_t)1 << splits))
+	  return ~(uint64_t)0;
+  }
+
+  int b = level_bits();
+  uint64_t key = 0;
+  for (int k=0; k<fulldepth; k++)
+  {
+	uint64_t c = 0;
+	if (binary)
+	{
+	  int i = k%dim;
+	  int splits = fulldepth/dim + (i < fulldepth%dim);
+	  c = (coords[i] >> (splits-1-k/dim)) & 1;
+	}
+	else
+	  for (int i=0; i<dim; i++)
+		c |= ((coords[i] >> (fulldepth-1-k)) & 1) << i;
+	key = (key << b) | c;
+  }
+  return key;
+}
+
+int Tree::keys(uint64_t *out) const
+{
+  if (key_bits() > 63)
+	return -1;
+  for (int i=0; i<data.count(); i++)
+	out[i] = aligned_key(i);
   return 0;
 }
 
+int Tree::grid_coords(int64_t *out) const
+{
+  if (key_bits() > 63)
+	return -1;
+  for (int i=0; i<data.count(); i++)
+	key_to_coords(aligned_key(i),out+i*dim);
+  return 0;
+}
+
+int Tree::coords_to_keys(int n, const int64_t *coords, uint64_t *out) const
+{
+  if (key_bits() > 63)
+	return -1;
+  for (int k=0; k<n; k++)
+	out[k] = coords_to_key(coords+k*dim);
+  return 0;
+}
+
+// a depth first traversal visits the leaves in key order, at any depth
+void Tree::sort_leaves(vector<int> &order)
+{
+  // only read the nodes until something moves, so that sorting a
+  // sorted snapshot copies nothing
+  const NodeArray &cn = nodes;
+  order.clear();
+  order.reserve(count());
+  int num_children = cn.num_children();
+  vector<int> stack(1,0);
+  while (!stack.empty())
+  {
+	int n = stack.back();
+	stack.pop_back();
+	if (cn[n].id >= 0)
+	{
+	  order.push_back(cn[n].id);
+	  continue;
+	}
+	for (int c=num_children-1; c>=0; c--)
+	  if (cn.haschild(n,c))
+		stack.push_back(cn.child(n,c));
+  }
+
+  bool identity = true;
+  for (int i=0; i<order.size() && identity; i++)
+	identity = (order[i] == i);
+  if (identity)
+	return;
+  data.permute(order);
+  for (int i=0; i<count(); i++)
+	nodes[data.node(i)].id = i;
+}
+
+// restore the key order after a change, translating ids to the new order
+void Tree::resort(vector<int> &ids)
+{
+  vector<int> order;
+  sort_leaves(order);
+  vector<int> inverse(order.size());
+  for (int i=0; i<order.size(); i++)
+	inverse[order[i]] = i;
+  for (int i=0; i<ids.size(); i++)
+	ids[i] = inverse[ids[i]];
+}
+
+/*
+  Binary format (native byte order):
+
+    TreeHeader
+    root box corner, root box width              (dim doubles each)
+    nodes                                       (nnodes Nodes)
+    child links                                 (nlinks ints)
+    leaf nodes                                  (nleaves ints)
+    leaf levels                                 (nleaves bytes)
+    leaf keys                                   (nleaves uint64s)
+    leaf corners                                (nleaves*dim doubles)
+
+  Every section starts on an 8 byte boundary, so a memory mapped file
+  can be used in place.
+*/
+struct TreeHeader
+{
+  char magic[8];				// "RADSTREE"
+  int version;
+  int dim;
+  int depth;
+  int nnodes;
+  int nlinks;
+  int nleaves;
+  int flags;					// TREE_BINARY | TREE_SORTED
+  int reserved;					// keeps the header 8 byte aligned
+};
+
+#define TREE_BINARY 1
+#define TREE_SORTED 2
+
+static const char tree_magic[8] = {'R','A','D','S','T','R','E','E'};
+static const int tree_version = 4;
+
+static size_t align8(size_t n) { return (n+7) & ~(size_t)7; }
+
+// write n items, padded to a multiple of 8 bytes
+template < class T >
+static bool write_section(FILE *out, const T *p, size_t n)
+{
+  static const char zeros[8] = {0,0,0,0,0,0,0,0};
+  size_t pad = align8(n*sizeof(T)) - n*sizeof(T);
+  return fwrite(p,sizeof(T),n,out) == n && fwrite(zeros,1,pad,out) == pad;
+}
+
+// read n items at p, wrapping them if the file is mapped
+template < class T >
+static SharedArray<T> read_section(const char *&p, size_t n, MappedFile *mf)
+{
+  const T *q = (const T *)p;
+  p += align8(n*sizeof(T));
+  if (mf)
+	return SharedArray<T>::wrap(q,n,mf);
+  SharedArray<T> a(n);
+  copy(q,q+n,a.mutable_data());
+  return a;
+}
+
+static Point read_point(const char *&p, int dim)
+{
+  Point v(dim);
+  memcpy(&v.v[0],p,dim*sizeof(double));
+  p += align8(dim*sizeof(double));
+  return v;
+}
+
+int Tree::save(const char *path) const
+{
+  FILE *out = fopen(path,"wb");
+  if (!out)
+	return -1;
+
+  TreeHeader h;
+  memset(&h,0,sizeof(h));
+  memcpy(h.magic,tree_magic,8);
+  h.version = tree_version;
+  h.dim = dim;
+  h.depth = fulldepth;
+  h.nnodes = nodes.size();
+  h.nlinks = nodes.link_array().size();
+  h.nleaves = data.count();
+  h.flags = (binary ? TREE_BINARY : 0) | (keep_sorted ? TREE_SORTED : 0);
+
+  bool ok = (fwrite(&h,sizeof(h),1,out) == 1
+			 && write_section(out,&rootbox.v.v[0],dim)
+			 && write_section(out,&rootbox.w.v[0],dim)
+			 && write_section(out,nodes.node_array().data(),h.nnodes)
+			 && write_section(out,nodes.link_array().data(),h.nlinks)
+			 && write_section(out,data.node_array().data(),h.nleaves)
+			 && write_section(out,data.level_array().data(),h.nleaves)
+			 && write_section(out,data.key_array().data(),h.nleaves)
+			 && write_section(out,data.corner_array().data(),(size_t)h.nleaves*dim));
+  if (fclose(out) != 0)
+	ok = false;
+  return ok ? 0 : -1;
+}
+
+// the indices in the arrays of a file point inside them, the parent
+// and child links agree and form a tree (every parent comes before its
+// children, so there is no cycle), and the leaves are no deeper than
+// the tree, so that searching or changing the tree cannot read out of
+// bounds or loop
+static bool check_arrays(int nkids, int depth, const SharedArray<Node> &n,
+						 const SharedArray<int> &l, const SharedArray<int> &ln,
+						 const SharedArray<unsigned char> &lv)
+{
+  int nnodes = n.size(), nlinks = l.size(), nleaves = ln.size();
+  if (n[0].parent != -1)
+	return false;
+  for (int i=0; i<nnodes; i++)
+  {
+	const Node &m = n[i];
+	if ((i > 0 && (m.parent < 0 || m.parent >= i))
+		|| m.childnum < 0 || m.childnum >= nkids
+		|| (m.children != -1 && (m.children < 0 || m.children > nlinks-nkids))
+		|| m.id < -1 || m.id >= nleaves)
+	  return false;
+  }
+  for (int i=0; i<nlinks; i++)
+	if (l[i] < -1 || l[i] == 0 || l[i] >= nnodes)
+	  return false;
+  for (int i=1; i<nnodes; i++)
+  {
+	const Node &p = n[n[i].parent];
+	if (p.children == -1 || l[p.children+n[i].childnum] != i)
+	  return false;
+  }
+  for (int i=0; i<nnodes; i++)
+	if (n[i].children != -1)
+	  for (int c=0; c<nkids; c++)
+	  {
+		int k = l[n[i].children+c];
+		if (k != -1 && (n[k].parent != i || n[k].childnum != c))
+		  return false;
+	  }
+  for (int i=0; i<nleaves; i++)
+	if (ln[i] < 0 || ln[i] >= nnodes || n[ln[i]].id != i || lv[i] > depth)
+	  return false;
+  return true;
+}
+
+Tree *Tree::load(const char *path, bool use_mmap)
+{
+  MappedFile *mf = 0;
+  vector<char> buf;
+  const char *p;
+  size_t len;
+
+  if (use_mmap)
+  {
+	mf = new MappedFile();
+	if (!mf->open(path))
+	{
+	  delete mf;
+	  return 0;
+	}
+	p = mf->data();
+	len = mf->size();
+  }
+  else
+  {
+	FILE *in = fopen(path,"rb");
+	if (!in)
+	  return 0;
+	fseek(in,0,SEEK_END);
+	long n = ftell(in);
+	fseek(in,0,SEEK_SET);
+	if (n > 0)
+	{
+	  buf.resize(n);
+	  if (fread(&buf[0],1,n,in) != (size_t)n)
+		buf.clear();
+	}
+	fclose(in);
+	if (buf.empty())
+	  return 0;
+	p = &buf[0];
+	len = buf.size();
+  }
+
+  // check the header and that the file is long enough
+  TreeHeader h;
+  bool ok = (len >= sizeof(h));
+  if (ok)
+  {
+	memcpy(&h,p,sizeof(h));
+	ok = (memcmp(h.magic,tree_magic,8) == 0 && h.version == tree_version
+		  && h.dim > 0 && h.dim < 32 && h.depth >= 0
+		  && h.nnodes > 0 && h.nlinks >= 0 && h.nleaves >= 0);
+  }
+  if (ok)
+  {
+	size_t need = (sizeof(h) + 2*align8(h.dim*sizeof(double))
+				   + align8(h.nnodes*sizeof(Node))
+				   + align8(h.nlinks*sizeof(int))
+				   + align8(h.nleaves*sizeof(int))
+				   + align8(h.nleaves)
+				   + align8(h.nleaves*sizeof(uint64_t))
+				   + align8((size_t)h.nleaves*h.dim*sizeof(double)));
+	ok = (len >= need);
+  }
+  if (!ok)
+  {
+	delete mf;					// nothing wraps it yet
+	return 0;
+  }
+  p += sizeof(h);
+
+  Tree *t = new Tree();
+  t->dim = h.dim;
+  t->binary = (h.flags & TREE_BINARY) != 0;
+  t->keep_sorted = (h.flags & TREE_SORTED) != 0;
+  t->fulldepth = h.depth;
+  t->rootbox.v = read_point(p,h.dim);
+  t->rootbox.w = read_point(p,h.dim);
+  SharedArray<Node> n = read_section<Node>(p,h.nnodes,mf);
+  SharedArray<int> l = read_section<int>(p,h.nlinks,mf);
+  SharedArray<int> ln = read_section<int>(p,h.nleaves,mf);
+  SharedArray<unsigned char> lv = read_section<unsigned char>(p,h.nleaves,mf);
+  SharedArray<uint64_t> k = read_section<uint64_t>(p,h.nleaves,mf);
+  SharedArray<double> c = read_section<double>(p,(size_t)h.nleaves*h.dim,mf);
+  int nkids = t->binary ? 2 : 1<<h.dim;
+  if (!check_arrays(nkids,h.depth,n,l,ln,lv))
+  {
+	delete t;					// mf goes with the last array wrapping it
+	return 0;
+  }
+  t->nodes = NodeArray(nkids,n,l);
+  t->data = TreeData(t->rootbox.w,t->binary,h.depth,c,ln,lv,k);
+  return t;
+}
 
-inline void Tree::top()
+inline void Tree::top(Cursor &c) const
 {
-  recnode = root;
-  recboxes.clear();
-  recboxes.push_back(rootbox);
-  recdepth = 0;
+  c.node = 0;
+  c.boxes.clear();
+  c.boxes.push_back(rootbox);
+  c.depth = 0;
 }
 
-inline void Tree::up()
+inline void Tree::up(Cursor &c) const
 {
-  recnode = recnode->parent;
-  recboxes.pop_back();
-  recdepth--;
+  c.node = nodes[c.node].parent;
+  c.boxes.pop_back();
+  c.depth--;
 }
 
-bool Tree::down(int i)
+bool Tree::down(Cursor &c, int i) const
 {
-  if (!recnode->haschild(i))
+  if (!nodes.haschild(c.node,i))
 	return false;
-  recnode = recnode->children[i];
+  c.node = nodes.child(c.node,i);
   
   // scale down the last box and add it to the end
-  recboxes.push_back(recboxes.back().scale_down(i));
-  recdepth++;
+  c.boxes.push_back(c.boxes.back().scale_down(i,split_axis(c.depth)));
+  c.depth++;
   return true;
 }
 
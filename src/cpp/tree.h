@@ -7,34 +7,56 @@
 #include "boxset.h"
 #include "treedata.h"
 
+// traversal state: the current node, the boxes along the path from
+// the root to it, and its depth.  Every query keeps its own, so any
+// number of threads may search one tree at the same time (as long as
+// nobody modifies it meanwhile).
+struct Cursor
+{
+  int node;
+  vector<Box> boxes;
+  int depth;
+};
+
 class Tree
 {
   // fixed vars
   int dim;						// dimension
-  Node *root;					// root of the tree
   Box rootbox;					// bounding box
-
-  // loop vars
-  Node *recnode;				// node storage for recursion
-  vector<Box> recboxes;			// box storage for recursion
-  int recdepth;					// depth for recursion
+  bool binary;					// split one axis per level (else all)
+  bool keep_sorted;				// keep the leaves in key order
+  NodeArray nodes;				// all nodes; the root is node 0
 
   // state vars
   int fulldepth;				// height of the tree
   TreeData data;				// list of boxes, nodes
 
 public:
-  Tree(const Box &b);
+  // a binary tree splits its boxes along one axis at a time, cycling
+  // through the axes (axis depth%dim at each depth), so that each level
+  // only doubles the number of boxes.  A sorted tree keeps its leaf
+  // ids in key order (see sort_leaves) after every insert or subdivide.
+  Tree(const Box &b, bool bin=false, bool sorted=false);
   Tree(const Tree &t);
   ~Tree();
 
   // increase the depth by one, subdividing all boxes
   void subdivide();
-  void set_depth(int depth);
+  // subdivide only some boxes (see tree.cpp)
+  int subdivide(vector<int> ids, vector<int> &newids);
+  int set_depth(int depth);
   
   // find box(es), by point or interval
-  int search(const Point &v);
-  vector<int> search(const Box &b);
+  int search(const Point &v) const;
+  vector<int> search(const Box &b) const;
+
+  // batched searches over flat arrays: n points (n*dim doubles), or n
+  // boxes (n*2*dim doubles, each box its corner followed by its width)
+  void search_points(int n, const double *pts, int *ids) const;
+  void search_boxes(int n, const double *boxes,
+					vector<int> &indptr, vector<int> &indices) const;
+  void search_boxes(const BoxSet &bs,
+					vector<int> &indptr, vector<int> &indices) const;
 
   // insert box(es), by point or interval
   // TODO: the Point could hit multiple boxes, but currently only one
@@ -45,30 +67,66 @@ public:
   // remove box(es)
   int remove(int box);
   int remove(vector<int> boxvec);
+  int remove(vector<int> boxvec, vector<int> &remap);
+
+  // Morton (Z-order) keys and integer grid coordinates of the leaves,
+  // on the grid of the full depth (see tree.cpp).  These return -1 if
+  // the keys do not fit, i.e. key_bits() > 63.
+  int key_bits() const { return level_bits()*fulldepth; }
+  int keys(uint64_t *out) const;
+  int grid_coords(int64_t *out) const;
+  int coords_to_keys(int n, const int64_t *coords, uint64_t *out) const;
+
+  // renumber the leaves in key order; leaf i is old leaf order[i]
+  void sort_leaves(vector<int> &order);
 
 
   // tree state info
   int dimension() { return dim; };
+  bool is_binary() { return binary; };
+  bool is_sorted() { return keep_sorted; };
   int depth() { return fulldepth; };
   int count() { return data.count(); };  // number of leaves
   UniformBoxSet boxes() { return data.get_boxes(); }		   // the leaf boxes
   Box bounding_box() { return rootbox; };   // size of the leaf boxes
-  void print();
+  size_t memory() { return nodes.memory() + data.memory(); } // bytes used
+  // bytes not shared with any other tree (e.g. a snapshot)
+  size_t unshared_memory()
+  {
+	return nodes.unshared_memory() + data.unshared_memory();
+  }
+  void print() const;
 
-  // input / output
-  //  void save(FILE *out);
-  //  static Tree *load(FILE *in);
+  // input / output, in the binary format described in tree.cpp.
+  // save returns 0 on success, -1 on failure; load returns a new tree,
+  // or 0 on failure.  With use_mmap, the arrays of the loaded tree
+  // point into the mapped file until they are first modified.
+  int save(const char *path) const;
+  static Tree *load(const char *path, bool use_mmap=false);
 
 private:
-  void del(Node *n);		// destructor helper
+  Tree() : dim(0), binary(false), keep_sorted(false), fulldepth(0) {}	// for load
+
+  // the axis along which the boxes at a depth are split (-1 for all)
+  int split_axis(int depth) const { return binary ? depth % dim : -1; }
+
+  // keys
+  int level_bits() const { return binary ? 1 : dim; } // key bits per level
+  uint64_t path_key(int n) const;
+  uint64_t aligned_key(int id) const;
+  void key_to_coords(uint64_t key, int64_t *coords) const;
+  uint64_t coords_to_key(const int64_t *coords) const;
+  void resort(vector<int> &ids);
+
+
   // loop funcs:
-  void top();				// reset to root of tree
-  void up();				// ascend to the parent of recnode
-  bool down(int i);			// descend to child i (return success)
-  void search_rec(const Box &b, vector<int> &nums);
-  void insert_rec(const Box &b, vector<int> &nums, bool ins);
-  void print_rec();
-  void copy_rec(Node *to, Node *from);
+  void top(Cursor &c) const;	// reset to root of tree
+  void up(Cursor &c) const;		// ascend to the parent of c.node
+  bool down(Cursor &c, int i) const; // descend to child i (return success)
+  int search(const Point &v, Cursor &c) const;
+  void search_rec(const Box &b, vector<int> &nums, Cursor &c) const;
+  void insert_rec(const Box &b, vector<int> &nums, Cursor &c);
+  void print_rec(Cursor &c) const;
 };
 
 #endif
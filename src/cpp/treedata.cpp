@@ -2,34 +2,98 @@
 #include "treeutil.h"
 #include "treedata.h"
 
-TreeData::TreeData(const Point &mysize)
+TreeData::TreeData(const Point &rootsize, bool bin)
+  : sizes(1,rootsize), binary(bin)
 {
-  size = mysize;
 }
 
-void TreeData::add(Node *n, const Point &v)
+TreeData::TreeData(const Point &rootsize, bool bin, int depth, const SharedArray<double> &c,
+				   const SharedArray<int> &n, const SharedArray<unsigned char> &l,
+				   const SharedArray<uint64_t> &k)
+  : corners(c), nodes(n), levels(l), keys(k), sizes(1,rootsize), binary(bin)
 {
-  n->id = count();
-  boxes.push_back(v);
+  set_depth(depth);
+}
+
+void TreeData::set_depth(int depth)
+{
+  while ((int)sizes.size() < depth+1)
+  {
+	Point w = sizes.back();
+	if (binary)					// the axis split at the last level
+	  w[(sizes.size()-1) % dim()] /= 2;
+	else
+	  w = halve_vector(w);
+	sizes.push_back(w);
+  }
+  sizes.resize(depth+1);
+}
+
+// returns the id of the new leaf
+int TreeData::add(int n, const Point &v, int level, uint64_t key)
+{
+  int id = count();
   nodes.push_back(n);
+  levels.push_back(level);
+  keys.push_back(key);
+  corners.append(&v.v[0],&v.v[0]+v.size());
+  return id;
+}
+
+void TreeData::set_corner(int id, const Point &v)
+{
+  copy(v.v.begin(),v.v.end(),corners.mutable_data()+id*dim());
+}
+
+void TreeData::set_corner(int id, const double *v)
+{
+  copy(v,v+dim(),corners.mutable_data()+id*dim());
+}
+
+Point TreeData::corner_vector(int id) const
+{
+  Point p(dim());
+  copy(corner(id),corner(id)+dim(),p.v.begin());
+  return p;
 }
 
 inline void TreeData::move_node(int from, int to)
 {
-  nodes[to] = nodes[from]; // put the pointer in the right place
-  nodes[to]->id = to;	   // the new id is the array index
+  int *n = nodes.mutable_data();
+  n[to] = n[from];
 }
 
 inline void TreeData::move_box(int from, int to)
 {
-  boxes[to] = boxes[from];
+  levels.set(to,levels[from]);
+  keys.set(to,keys[from]);
+  double *c = corners.mutable_data();
+  copy(c+from*dim(),c+(from+1)*dim(),c+to*dim());
 }
 
-// assumes ids is sorted!
+// assumes ids is sorted!  the caller is responsible for updating the
+// ids stored in the nodes
 void TreeData::remove(vector<int> ids)
 {
   int num_gone = ids.size();
 
+  // shared arrays would be copied whole before shifting, so build the
+  // smaller ones directly instead
+  if (corners.shared() || nodes.shared())
+  {
+	vector<int> keep;
+	keep.reserve(nodes.size()-num_gone);
+	for (int i=0, k=0; i<nodes.size(); i++)
+	{
+	  if (k < num_gone && ids[k] == i)
+		k++;
+	  else
+		keep.push_back(i);
+	}
+	permute(keep);
+	return;
+  }
+
   // update the lists and ids
   ids.push_back(nodes.size()); // add last elt for the loop
 
@@ -41,12 +105,55 @@ void TreeData::remove(vector<int> ids)
 	  move_box(j+1,j-i);
 	}
   }
-  nodes.resize(nodes.size()-num_gone);
-  boxes.resize(boxes.size()-num_gone);
+  resize(nodes.size()-num_gone);
 }
 
 void TreeData::resize(int s)
 {
   nodes.resize(s);
-  boxes.resize(s);
+  levels.resize(s);
+  keys.resize(s);
+  corners.resize(s*dim());
+}
+
+// leaf i of the result is leaf order[i] now
+void TreeData::permute(const vector<int> &order)
+{
+  int n = order.size();
+  int d = dim();
+  SharedArray<double> c(n*d);
+  SharedArray<int> nd(n);
+  SharedArray<unsigned char> l(n);
+  SharedArray<uint64_t> k(n);
+  double *cp = c.mutable_data();
+  int *np = nd.mutable_data();
+  unsigned char *lp = l.mutable_data();
+  uint64_t *kp = k.mutable_data();
+  for (int i=0; i<n; i++)
+  {
+	copy(corner(order[i]),corner(order[i])+d,cp+i*d);
+	np[i] = nodes[order[i]];
+	lp[i] = levels[order[i]];
+	kp[i] = keys[order[i]];
+  }
+  corners = c;
+  nodes = nd;
+  levels = l;
+  keys = k;
+}
+
+UniformBoxSet TreeData::get_boxes() const
+{
+  return UniformBoxSet(corners,levels,sizes); // shares the arrays
+}
+
+size_t TreeData::memory() const
+{
+  return corners.memory() + nodes.memory() + levels.memory() + keys.memory();
+}
+
+size_t TreeData::unshared_memory() const
+{
+  return corners.unshared_memory() + nodes.unshared_memory()
+	+ levels.unshared_memory() + keys.unshared_memory();
 }
@@ -1,43 +1,69 @@
 #ifndef _treedata_h
 #define _treedata_h
 #include <vector>
+#include <stdint.h>
 #include "node.h"
 #include "boxset.h"
+#include "sharedarray.h"
 using namespace std;
 
+// Per-leaf storage.  The corners of all leaves live in one flat array
+// of count()*dim() doubles, and each leaf keeps the index of its node
+// its level (depth in the tree) and its path key (see Tree::keys).
+// The leaf width only depends on
+// the level, so it is kept in a small per-level table.  The arrays are
+// copy-on-write, so get_boxes() can share them.
 class TreeData
 {
 private:
-  vector<Point > boxes;
-  vector<Node *> nodes;
-  Point size;
+  SharedArray<double> corners;
+  SharedArray<int> nodes;
+  SharedArray<unsigned char> levels;
+  SharedArray<uint64_t> keys;
+  vector<Point> sizes;			// leaf width at each level, sizes[0] = root
+  bool binary;					// halve one axis per level (see Tree)
 
   // helpers for remove
   void move_node(int from, int to);
   void move_box(int from, int to);
 
 public:
-  TreeData() {};
-  TreeData(const Point &mysize);
+  TreeData() : binary(false) {};
+  TreeData(const Point &rootsize, bool bin=false);
+  TreeData(const Point &rootsize, bool bin, int depth, const SharedArray<double> &c,
+		   const SharedArray<int> &n, const SharedArray<unsigned char> &l,
+		   const SharedArray<uint64_t> &k);
 
   // manipulators
-  void add(Node *n, const Point &v);
+  int add(int n, const Point &v, int level, uint64_t key);
   void remove(vector<int> ids);
   void resize(int s);
+  void permute(const vector<int> &order); // leaf i becomes leaf order[i]
+  void set_depth(int depth);	// size the level table for levels 0..depth
 
   // setters
-  void set_node(int id, Node *n) { nodes[id] = n; }
-  void set_node(Node *n) { nodes[n->id] = n; }
-  void set_corner(int id, const Point &v) { boxes[id] = v; }
-  void set_size_vector(const Point &v) { size = v; }
+  void set_node(int id, int n) { nodes.set(id,n); }
+  void set_corner(int id, const Point &v);
+  void set_corner(int id, const double *v);
+  void set_level(int id, int l) { levels.set(id,l); }
+  void set_key(int id, uint64_t k) { keys.set(id,k); }
 
   // accessors
-  Point size_vector() const { return size; }
-  Point corner_vector(int id) const { return boxes[id]; }
-  Node *node(int id) const { return nodes[id]; }
+  const Point &size_vector(int level) const { return sizes[level]; }
+  int level(int id) const { return levels[id]; }
+  uint64_t key(int id) const { return keys[id]; }
+  Point corner_vector(int id) const;
+  const double *corner(int id) const { return corners.data()+id*dim(); }
+  int node(int id) const { return nodes[id]; }
   int count() const { return nodes.size(); }
-  int dim() const { return size.size(); }
-  UniformBoxSet get_boxes() const { return UniformBoxSet(size,boxes); } 
+  int dim() const { return sizes[0].size(); }
+  UniformBoxSet get_boxes() const;
+  const SharedArray<double> &corner_array() const { return corners; }
+  const SharedArray<int> &node_array() const { return nodes; }
+  const SharedArray<unsigned char> &level_array() const { return levels; }
+  const SharedArray<uint64_t> &key_array() const { return keys; }
+  size_t memory() const;
+  size_t unshared_memory() const;
 };
 
 #endif
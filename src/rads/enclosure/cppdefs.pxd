@@ -1,5 +1,6 @@
 from libcpp.vector cimport vector
 from libc cimport string
+from libc.stdint cimport uint64_t, int64_t
 
 #------------------------------
 # C++ declarations
@@ -73,44 +74,73 @@ cdef extern from "boxset.h":
         cUniformBoxSet(cPoint &w)
         cUniformBoxSet(int size, cPoint &w)
         cUniformBoxSet(cPoint &w, vector[cPoint] &c)
+        cUniformBoxSet(cUniformBoxSet &)
         
         void set_width(cPoint &w)
         cPoint get_width()
+        cPoint get_width(int i)
         void set_corner(int i, cPoint &v)
         cPoint get_corner(int i)
         cBox get_box(int i)
         int size()
         int dim()
+        const double *corner_data()
+        int get_level(int i)
+        int num_levels()
+        cPoint get_level_width(int l)
+        const unsigned char *level_data()
     cUniformBoxSet *new_UniformBoxSet "new UniformBoxSet" (int)
+    cUniformBoxSet *new_UniformBoxSet "new UniformBoxSet" (cUniformBoxSet &)
     void del_UniformBoxSet "delete" (cUniformBoxSet *)
 
 cdef extern from "tree.h":
     cdef cppclass cTree "Tree":
         cTree(cBox &)
+        cTree(cBox &, bint)
+        cTree(cBox &, bint, bint)
         cTree(cTree &)
         
         void subdivide()
-        void set_depth(int)
+        int subdivide(vector[int], vector[int] &)
+        int set_depth(int)
         void print_tree "print" ()
         
         int search(cPoint &)
         vector[int] search(cBox &)
+        void search_points(int, double *, int *) nogil
+        void search_boxes(int, double *, vector[int] &, vector[int] &) nogil
         
         int insert(cPoint &)
         vector[int] insert(cBox &)
         
         int remove(int)
         int remove(vector[int])
+        int remove(vector[int], vector[int] &)
         
         int dimension()
+        bint is_binary()
+        bint is_sorted()
         int depth()
         int count()
         cUniformBoxSet boxes()
         cBox bounding_box()
+        size_t memory()
+        size_t unshared_memory()
+        
+        int save(char *)
+        
+        int key_bits()
+        int keys(uint64_t *)
+        int grid_coords(int64_t *)
+        int coords_to_keys(int, int64_t *, uint64_t *)
+        void sort_leaves(vector[int] &)
         
     cTree *new_Tree "new Tree" (cBox&)
+    cTree *new_Tree "new Tree" (cBox&, bint)
+    cTree *new_Tree "new Tree" (cBox&, bint, bint)
     cTree *new_Tree "new Tree" (cTree&)
     void del_Tree "delete" (cTree *tree)
+    cTree *load_Tree "Tree::load" (char *, bint)
 
 
 cdef extern from "string":
@@ -124,8 +154,38 @@ cdef extern from "mapper.h":
         cIPoint map_point (cIPoint &v)
         cBoxSet map_points (cUniformBoxSet &bs)
         cBoxSet map_points (cBoxSet &bs)
+        void map_boxes (int, double *, double *, double *, double *) nogil
         cIPoint get_params()
         vector[std_string] get_param_names()
         void set_params(cIPoint p)
+        void set_centered(bint)
+        bint is_centered()
         int dim()
         std_string name()
+
+cdef extern from "enclosure.h":
+    void enclosure_mvm(cMapper &, cTree &, cUniformBoxSet &, int,
+                       vector[int] &, vector[int] &) nogil
+    void enclosure_adj(cTree &, cUniformBoxSet &, int,
+                       vector[int] &, vector[int] &) nogil
+    void enclosure_mvm_refine(cMapper &, cUniformBoxSet &, int *, int *, int *,
+                              int *, int *, int, vector[int] &, vector[int] &) nogil
+    void enclosure_adj_refine(cUniformBoxSet &, int *, int *, int *,
+                              int *, int *, int, vector[int] &, vector[int] &) nogil
+    void c_invariant_set "invariant_set" (int, int *, int *, vector[char] &) nogil
+
+cdef extern from "graphs.h":
+    int c_scc_labels "scc_labels" (int, int *, int *, char *,
+                                   vector[int] &, vector[int] &,
+                                   vector[int] &, vector[char] &) nogil
+    void invariant_nodes(int, int *, int *, char *, int *, char *,
+                         vector[char] &) nogil
+    void reverse_csr(int, int *, int *, vector[int] &, vector[int] &) nogil
+    int scc_labels_parallel(int, int *, int *, char *, int, vector[int] &,
+                            vector[char] &, vector[char] &) nogil
+    cdef cppclass cInvariantSet "InvariantSet":
+        cInvariantSet(int, int *, int *, int *, int *, char *)
+        cInvariantSet(cInvariantSet &)
+        void remove(int, int *, vector[int] &) nogil
+        int size()
+        vector[char] &mask()
@@ -3,7 +3,7 @@ import numpy as np
 from cppdefs cimport *
 
 cdef class UBoxSet:
-	cdef np.ndarray corners
+	cdef cUniformBoxSet *ubs
 	cdef np.ndarray width
 	cdef void init(self,cUniformBoxSet ubs)
 
@@ -2,17 +2,21 @@ cimport numpy as np
 import numpy as np
 from cppdefs cimport *
 from cyutils cimport *
+from libc.string cimport memcpy
 
 cdef class UBoxSet:
 	def __cinit__(self):
-		pass
+		self.ubs = NULL
+
+	def __dealloc__(self):
+		if self.ubs != NULL:
+			del_UniformBoxSet(self.ubs)
 
 	cdef void init(self,cUniformBoxSet ubs):
+		# keep the C++ set, which shares its corners with the tree they
+		# came from (see corners)
+		self.ubs = new_UniformBoxSet(ubs)
 		self.width = point2array(ubs.get_width())
-		self.corners = np.zeros((ubs.size(),ubs.dim()),dtype=np.double)
-		cdef Py_ssize_t i
-		for i in range(len(self.corners)):
-			self.corners[i] = point2array(ubs.get_corner(i))
 
 	property dim:
 		def __get__(self):
@@ -20,15 +24,52 @@ cdef class UBoxSet:
 
 	property size:
 		def __get__(self):
-			return self.corners.shape[0]
+			if self.ubs == NULL:
+				return 0
+			return self.ubs.size()
 
 	property width:
 		def __get__(self):
+			"""The width of the smallest boxes (of all boxes, unless they
+			come from a locally refined tree)."""
 			return self.width
 		
 	property corners:
 		def __get__(self):
-			return self.corners
+			"""The box corners, as an (N,d) array.  This is a read-only view
+			of the tree's storage rather than a copy, since writing to it
+			would change the tree.  (It is made on every access: keeping it
+			here would make a reference cycle numpy cannot collect.)
+			None if the set was never filled."""
+			if self.ubs == NULL:
+				return None
+			return view2array(self.ubs.corner_data(),self.ubs.size(),
+							  self.ubs.dim(),self)
+
+	property levels:
+		def __get__(self):
+			"""The level of each box, its depth in the tree: a box of
+			level l has the width of the bounding box halved l times
+			along every axis, or, in a binary tree, l times in all,
+			along one axis per level, cycling through the axes."""
+			if self.ubs == NULL:
+				return None
+			cdef np.ndarray a = np.zeros(self.size,dtype=np.uint8)
+			if self.ubs.level_data() != NULL:
+				memcpy(a.data,self.ubs.level_data(),self.size)
+			return a
+
+	property widths:
+		def __get__(self):
+			"""The width of each box, as an (N,d) array."""
+			cdef int l
+			if self.ubs == NULL:
+				return None
+			table = np.array([point2array(self.ubs.get_level_width(l))
+							  for l in range(self.ubs.num_levels())])
+			if self.ubs.level_data() == NULL:
+				return np.tile(self.width,(self.size,1))
+			return table[self.levels]
 		
 	def __repr__(self):
 		return "width: " + self.width.__repr__() + "\ncorners:\n" + self.corners.__repr__()
@@ -1,3 +1,4 @@
+cimport numpy as np
 from cppdefs cimport *
 
 cdef class CombEnc:
@@ -5,8 +6,21 @@ cdef class CombEnc:
 	cdef cTree * ctree
 	cdef object pymapper
 	cdef object pytree
-	cpdef update(self)
+	cpdef update(self,int threads=*,bint incremental=*,mode=*,int samples_per_box=*)
 	cdef object adj
 	cdef object mvm
-	cdef void compute_adj(self,cUniformBoxSet &ubs)
-	cdef void compute_mvm(self,cUniformBoxSet &ubs)
+	cdef object adj_csr
+	cdef object mvm_csr
+	cdef bint rigorous
+	cdef object prev_tree
+	cdef object prev_mark
+	cdef object prev_mvm
+	cdef object prev_adj
+	cdef object prev_mapper
+	cdef object prev_params
+	cdef object prev_centered
+	cdef void compute_adj(self,cUniformBoxSet &ubs,int threads) except *
+	cdef void compute_mvm(self,cUniformBoxSet &ubs,int threads) except *
+	cdef bint update_incremental(self,cUniformBoxSet &ubs,int threads) except *
+	cdef object refine_csr(self,cUniformBoxSet &ubs,cMapper *m,np.ndarray parent,
+						   np.ndarray kidptr,np.ndarray kids,prev,int threads)
@@ -1,5 +1,8 @@
 cimport numpy as np
 import numpy as np
+import itertools
+import time
+from libc.string cimport memcpy
 from cppdefs cimport *
 from cyutils cimport *
 from cyboxset cimport UBoxSet
@@ -10,8 +13,113 @@ from cytree cimport Tree
 #from sage.graphs.base.sparse_graph cimport SparseGraph
 ###from sage.all import Graph,DiGraph
 from rads.graphs import Graph,DiGraph
+from scipy import sparse
+
+def csr_from_search(n,indptr,indices):
+	# the n x n 0/1 matrix with row i holding the search results of box i
+	data = np.ones(len(indices),dtype=np.int8)
+	return sparse.csr_matrix((data,indices,indptr),shape=(n,n))
+
+def invariant_set(A):
+	"""The maximal invariant set of the directed graph with the sparse
+	adjacency matrix A (e.g. mvm_csr), as graph_mis gives it: the
+	sorted array of the nodes on a bi-infinite walk.  It is found on
+	the CSR arrays, by peeling off nodes without an edge in or out
+	until none are left, with no graph built."""
+	A = sparse.csr_matrix(A)
+	cdef np.ndarray p = np.ascontiguousarray(A.indptr,dtype=np.int32)
+	cdef np.ndarray q = np.ascontiguousarray(A.indices,dtype=np.int32)
+	cdef int n = A.shape[0]
+	cdef vector[char] keep
+	with nogil:
+		c_invariant_set(n,<int *>p.data,<int *>q.data,keep)
+	cdef np.ndarray mask = np.zeros(n,dtype=np.uint8)
+	if n > 0:
+		memcpy(mask.data,&keep[0],n)
+	return np.flatnonzero(mask).astype(np.int32)
+
+def on_grid(tree):
+	# True if all leaves of tree are at its full depth, tiling a grid
+	# whose cell keys fit in 63 bits (see Tree.keys)
+	bits = tree.depth if tree.binary else tree.dim*tree.depth
+	return tree.size > 0 and bits <= 63 and \
+		(tree.boxes().levels == tree.depth).all()
+
+def grid_adj(tree):
+	"""The adjacency matrix (as adj_csr) of a tree whose leaves are all
+	at its full depth, from their grid coordinates rather than by
+	searching the tree: the neighbors of a box are the leaves at the
+	3^d cells around it (itself included).  The cells are numbered
+	row by row, and looked up for all boxes at once, in a table of
+	the grid if it is not much bigger than the tree, and otherwise in
+	the sorted cell numbers of the leaves."""
+	c = tree.grid_coords()
+	n,d = c.shape
+	if tree.binary:
+		splits = [tree.depth/d + (i < tree.depth%d) for i in range(d)]
+	else:
+		splits = [tree.depth]*d
+	shape = np.array([1 << k for k in splits],dtype=np.int64)
+	strides = np.cumprod(np.r_[1,shape[:-1]])
+	cells = c.dot(strides)
+	if shape.prod() <= 8*n:
+		table = np.empty(shape.prod(),dtype=np.int32)
+		table.fill(-1)
+		table[cells] = np.arange(n,dtype=np.int32)
+		def lookup(k):
+			j = table[k]
+			return j >= 0,j
+	else:
+		order = np.argsort(cells).astype(np.int32)
+		scells = cells[order]
+		def lookup(k):
+			pos = np.minimum(np.searchsorted(scells,k),n-1)
+			hit = scells[pos] == k
+			return hit,order[pos]
+	# the neighbors of box i, in a row of J (-1 where none)
+	offsets = list(itertools.product((-1,0,1),repeat=d))
+	J = np.empty((n,len(offsets)),dtype=np.int32)
+	J.fill(-1)
+	for k,off in enumerate(offsets):
+		nb = c + off
+		on = np.flatnonzero(((nb >= 0) & (nb < shape)).all(1))
+		hit,j = lookup(nb[on].dot(strides))
+		J[on[hit],k] = j[hit]
+	J.sort(axis=1)
+	found = J >= 0
+	indptr = np.r_[0,np.cumsum(found.sum(1))].astype(np.int32)
+	return csr_from_search(n,indptr,J[found])
+
+def same_params(p,q):
+	# two get_params() dicts with the same parameters
+	return sorted(p) == sorted(q) and all(np.array_equal(p[k],q[k]) for k in p)
+
+def graph_from_csr(G,A):
+	# G with nodes 0..n-1 and the edges (i,j) of A, row by row
+	n = A.shape[0]
+	G.add_nodes_from(range(n))
+	src = np.repeat(np.arange(n),np.diff(A.indptr))
+	G.add_edges_from(zip(src.tolist(),A.indices.tolist()))
+	return G
 
 cdef class CombEnc:
+	"""CombEnc(tree,mapper)
+
+	A combinatorial enclosure of mapper on the boxes of tree.  After
+	update(), mvm_csr and adj_csr are scipy.sparse CSR matrices over
+	the box ids: mvm_csr[i,j] is 1 iff the image of box i meets box j,
+	and adj_csr[i,j] is 1 iff boxes i and j meet.  The networkx graphs
+	mvm and adj are only built from them when first asked for; for
+	large trees, rads.graphs.CSRDiGraph(mvm_csr) is a graph with the
+	same methods built on the arrays instead.
+
+	Each update() keeps a snapshot of the tree, and marks it (see Tree.mark),
+	so that the next one, after the tree was only subdivided or pruned, can
+	work from the previous matrices rather than start over (see update).
+
+	update(mode='sampled') gives a quick, NON-RIGOROUS mvm_csr from
+	sample points, only meant for pruning boxes before a rigorous
+	update; rigorous is False while it is in place."""
 	def __init__(self,tree=None,mapper=None):
 		if mapper is not None:
 			self.mapper = mapper
@@ -19,75 +127,278 @@ cdef class CombEnc:
 			self.tree = tree
 		self.adj = None
 		self.mvm = None
+		self.adj_csr = None
+		self.mvm_csr = None
+		self.prev_tree = None
+		self.rigorous = True
 
 	def __cinit__(self):
 		pass
 	def __dealloc__(self):
 		pass
 
-	cpdef update(self):
-		# just start all over for now; optimize later
+	cpdef update(self,int threads=1,bint incremental=True,mode='rigorous',
+				 int samples_per_box=16):
+		"""Recompute adj and mvm for the current tree.  The boxes are
+		mapped, and their images searched for in the tree, on up to
+		threads threads (one per processor if threads <= 0), without
+		the GIL; the result is the same for any number of threads.
+		(A PyMapper maps the boxes with NumPy, and ignores threads.)
+
+		If incremental, and the tree was only subdivided, pruned or
+		sorted since the last update (the tree keeps track of where
+		each box came from, see Tree.mark), with the same mapper and
+		settings, the image of a box can only meet boxes inside the old
+		boxes the image of its old box met: only those are tested,
+		instead of searching the whole tree.  Boxes that were only
+		pruned or renumbered just have their rows and columns picked
+		out of the old matrices.  The result is still rigorous, but it
+		is only that of a full update up to rounding: an edge to a box
+		the image of a box only touches within rounding may be left
+		out.
+
+		With mode='sampled', only mvm_csr is computed, and NOT
+		RIGOROUSLY: samples_per_box points of each box (its center, and
+		points at the same random places in every box) are mapped, and
+		box i gets an edge to the boxes holding their images.  Images
+		of the boxes are missed, so this is for pruning transient boxes
+		(or choosing a region) cheaply before a rigorous update, which
+		then maps only the boxes left.  adj_csr is None, rigorous is
+		False, and the next rigorous update still works incrementally
+		from the last rigorous one."""
+		if mode == 'sampled':
+			self.sampled_mvm(samples_per_box)
+			return
+		if mode != 'rigorous':
+			raise ValueError("CombEnc.update: mode must be 'rigorous' or 'sampled'")
 		cdef cUniformBoxSet ubs = self.ctree.boxes()
-		self.compute_adj(ubs)
-		self.compute_mvm(ubs)
-
-	cdef void compute_adj(self,cUniformBoxSet &ubs):
-		cdef Py_ssize_t i
-		cdef int N = ubs.size()
-		cdef np.ndarray a
-		#self.adj = Graph(N,implementation="c_graph")
-		self.adj = Graph()
-		self.adj.add_nodes_from(range(N))
-		for i in range(N):
-			# find the neighbors of box i
-			# search the tree for ith box
-			#   (search is inclusive, so we get the right boxes)
-			# convert the result to an array, and index into adj
-			#self.adj[i,vector2array_int(self.ctree.search(ubs.get_box(i)))] = 1
-			a = vector2array_int(self.ctree.search(ubs.get_box(i)))
-			# add (i,v) for v in a:
-			self.adj.add_edges_from(zip(np.tile(i,len(a)),a))
-
-	cdef void compute_mvm(self,cUniformBoxSet &ubs):
-		cdef Py_ssize_t i
-		cdef int N = ubs.size()
-		cdef np.ndarray a
-		#self.mvm = DiGraph(N,implementation="c_graph")
-		self.mvm = DiGraph()
-		self.mvm.add_nodes_from(range(N))
-
-		# map all boxes under mapper's mapper
-		cdef cBoxSet ims = self.cmapper.map_points(ubs)
-		# Cython won't let us stack allocate this!!! argh... will have
-		# to change cMapper.map_points to create a new BoxSet and
-		# return it, and we'll have to keep track of it and delete
-		# it... GRRR
-
-		# update the matrix
-		for i in range(ubs.size()):
-			#print 'image of', box2array(ubs.get_box(i)),
-			#'is', box2array(ims.get_box(i))
-			a = vector2array_int(self.ctree.search(ims.get_box(i)))
-			#print 'image box ids:', a
-			#print 'new edges:', zip(np.tile(i,len(a)),a)
-			# add (i,v) for v in a:
-			self.mvm.add_edges_from(zip(np.tile(i,len(a)),a))
-			#self.mvm[i,vector2array_int(self.ctree.search(ims.get_box(i)))] = 1
-			#self.mvm = self.mvm.transpose()	# since A[j,i] iff i->j
-		
+		self.adj = None
+		self.mvm = None
+		if not (incremental and self.update_incremental(ubs,threads)):
+			self.compute_adj(ubs,threads)
+			self.compute_mvm(ubs,threads)
+		self.rigorous = True
+		self.prev_mvm = self.mvm_csr
+		self.prev_adj = self.adj_csr
+		self.prev_tree = self.pytree.copy()
+		self.prev_mark = self.pytree.mark()
+		self.prev_mapper = self.pymapper
+		self.prev_params = self.pymapper.get_params()
+		self.prev_centered = getattr(self.pymapper,'centered',False)
+
+	cdef void compute_adj(self,cUniformBoxSet &ubs,int threads) except *:
+		# search the tree for each box (search is inclusive, so we get
+		# the neighbors, and the box itself), unless the boxes tile a
+		# grid and we can just look up the cells around each
+		cdef vector[int] indptr, indices
+		if on_grid(self.pytree):
+			self.adj_csr = grid_adj(self.pytree)
+			return
+		with nogil:
+			enclosure_adj(self.ctree[0],ubs,threads,indptr,indices)
+		self.adj_csr = csr_from_search(ubs.size(),vector2array_int32(indptr),
+									   vector2array_int32(indices))
+
+	cdef void compute_mvm(self,cUniformBoxSet &ubs,int threads) except *:
+		# map all boxes under mapper's mapper, and find the boxes their
+		# images hit: those of box i are indices[indptr[i]:indptr[i+1]]
+		cdef vector[int] indptr, indices
+		cdef np.ndarray p, q
+		if self.cmapper == NULL:
+			p,q = self.python_mvm()
+		else:
+			with nogil:
+				enclosure_mvm(self.cmapper[0],self.ctree[0],ubs,threads,indptr,indices)
+			p = vector2array_int32(indptr)
+			q = vector2array_int32(indices)
+		self.mvm_csr = csr_from_search(ubs.size(),p,q)
+
+	def refine(self,int depth,keep='mis',int threads=1,verbose=False):
+		"""refine(depth,keep='mis',threads=1,verbose=False)
+
+		The loop of test/test_henon.py, without leaving the arrays:
+		subdivide the tree depth times, each time updating the enclosure
+		(incrementally, see update) and, with keep='mis', removing the
+		boxes outside the maximal invariant set of mvm_csr (found by
+		invariant_set, where graph_mis would build graphs).  keep=None
+		removes nothing.  On return mvm_csr and adj_csr are those of the
+		boxes left.
+
+		Returns one dict per level: the depth, the number of boxes after
+		subdividing ('boxes') and after pruning ('kept'), and the
+		seconds taken by each step.  verbose prints them as it goes."""
+		if keep not in ('mis',None):
+			raise ValueError("CombEnc.refine: keep must be 'mis' or None")
+		levels = []
+		for d in range(depth):
+			t0 = time.time()
+			self.pytree.subdivide()
+			t1 = time.time()
+			self.update(threads)
+			t2 = time.time()
+			n = self.pytree.size
+			I = None
+			if keep == 'mis':
+				I = invariant_set(self.mvm_csr)
+			t3 = time.time()
+			if I is not None and len(I) < n:
+				self.keep_boxes(I)
+			t4 = time.time()
+			level = dict(depth=self.pytree.depth,boxes=n,kept=self.pytree.size,
+						 subdivide=t1-t0,update=t2-t1,mis=t3-t2,remove=t4-t3)
+			levels.append(level)
+			if verbose:
+				print 'depth %(depth)i: %(boxes)i boxes, %(kept)i kept' % level, \
+					'(subdivide %(subdivide).2f s, update %(update).2f s,' % level, \
+					'mis %(mis).2f s, remove %(remove).2f s)' % level
+		return levels
+
+	def keep_boxes(self,I):
+		"""Remove all boxes but those with the sorted ids I from the tree,
+		and their rows and columns from mvm_csr and adj_csr (the boxes
+		left keep their order), rather than update again."""
+		I = np.asarray(I,dtype=np.int32)
+		dead = np.ones(self.pytree.size,dtype=bool)
+		dead[I] = False
+		self.pytree.remove(np.flatnonzero(dead))
+		self.adj = None
+		self.mvm = None
+		if self.mvm_csr is not None:
+			self.mvm_csr = self.mvm_csr[I][:,I]
+			self.mvm_csr.sort_indices()
+		if self.adj_csr is not None:
+			self.adj_csr = self.adj_csr[I][:,I]
+			self.adj_csr.sort_indices()
+		if self.rigorous and self.prev_tree is not None:
+			self.prev_mvm = self.mvm_csr
+			self.prev_adj = self.adj_csr
+			self.prev_tree = self.pytree.copy()
+			self.prev_mark = self.pytree.mark()
+
+	cdef bint update_incremental(self,cUniformBoxSet &ubs,int threads) except *:
+		# the incremental update; False if it does not apply
+		if self.prev_tree is None:
+			return False
+		if self.prev_mapper is not self.pymapper or \
+		   not same_params(self.prev_params,self.pymapper.get_params()) or \
+		   self.prev_centered != getattr(self.pymapper,'centered',False):
+			return False
+		# the old box holding each box, as the tree kept track of it
+		cdef np.ndarray parent = self.pytree.origins(self.prev_mark)
+		if parent is None or len(parent) == 0:
+			return False
+		old = self.prev_tree.boxes()
+		if (old.widths[parent] == self.pytree.boxes().widths).all():
+			# nothing was subdivided: pick out the rows and columns left
+			self.mvm_csr = self.prev_mvm[parent][:,parent]
+			self.adj_csr = self.prev_adj[parent][:,parent]
+			self.mvm_csr.sort_indices()
+			self.adj_csr.sort_indices()
+			return True
+		if self.cmapper == NULL:
+			return False
+		# the boxes in each old box: kids[kidptr[a]:kidptr[a+1]]
+		cdef np.ndarray kids = np.argsort(parent,kind='mergesort').astype(np.int32)
+		cdef np.ndarray kidptr = np.searchsorted(parent[kids],np.arange(old.size+1)).astype(np.int32)
+		self.mvm_csr = self.refine_csr(ubs,self.cmapper,parent,kidptr,kids,self.prev_mvm,threads)
+		if on_grid(self.pytree):
+			self.compute_adj(ubs,threads)
+		else:
+			self.adj_csr = self.refine_csr(ubs,NULL,parent,kidptr,kids,self.prev_adj,threads)
+		return True
+
+	cdef object refine_csr(self,cUniformBoxSet &ubs,cMapper *m,np.ndarray parent,
+						   np.ndarray kidptr,np.ndarray kids,prev,int threads):
+		# prev refined to the boxes of ubs, under m (adj if m is NULL)
+		cdef np.ndarray pp = np.ascontiguousarray(prev.indptr,dtype=np.int32)
+		cdef np.ndarray pi = np.ascontiguousarray(prev.indices,dtype=np.int32)
+		cdef int *a = <int *>parent.data
+		cdef int *b = <int *>pp.data
+		cdef int *c = <int *>pi.data
+		cdef int *d = <int *>kidptr.data
+		cdef int *e = <int *>kids.data
+		cdef vector[int] indptr, indices
+		with nogil:
+			if m == NULL:
+				enclosure_adj_refine(ubs,a,b,c,d,e,threads,indptr,indices)
+			else:
+				enclosure_mvm_refine(m[0],ubs,a,b,c,d,e,threads,indptr,indices)
+		return csr_from_search(ubs.size(),vector2array_int32(indptr),
+							   vector2array_int32(indices))
+
+	def sampled_mvm(self,int k):
+		# the non-rigorous mvm_csr of update(mode='sampled'); the
+		# samples are boxes of width 0, mapped as any boxes, and their
+		# images taken at the midpoints
+		b = self.pytree.boxes()
+		n = b.size
+		u = np.random.RandomState(0).random_sample((max(k,1),b.dim))
+		u[0] = 0.5
+		pts = (b.corners[:,None] + b.widths[:,None]*u).reshape(-1,b.dim)
+		imlo,imhi = self.pymapper.map_boxes(pts,pts)
+		hit = self.pytree.search_points((imlo + imhi)/2)
+		src = np.repeat(np.arange(n,dtype=np.int64),len(u))
+		# the edges, without repeats, in row order
+		e = np.unique(src[hit >= 0]*n + hit[hit >= 0])
+		indptr = np.searchsorted(e,np.arange(n+1,dtype=np.int64)*n).astype(np.int32)
+		self.adj = None
+		self.mvm = None
+		self.adj_csr = None
+		self.mvm_csr = csr_from_search(n,indptr,(e % n).astype(np.int32))
+		self.rigorous = False
+
+	def python_mvm(self):
+		# the same, for a map written in Python (see rads.maps.pymapper),
+		# which maps all boxes at once with NumPy
+		b = self.pytree.boxes()
+		lo = b.corners
+		hi = np.nextafter(lo + b.widths,np.inf)
+		imlo,imhi = self.pymapper.map_boxes(lo,hi)
+		ims = np.empty((lo.shape[0],2,lo.shape[1]))
+		ims[:,0] = imlo
+		ims[:,1] = np.nextafter(imhi - imlo,np.inf)
+		return self.pytree.search_boxes(ims)
+
 	property adj:
 		def __get__(self):
+			"""adj_csr as a rads Graph (built on first use)."""
+			if self.adj is None and self.adj_csr is not None:
+				self.adj = graph_from_csr(Graph(),self.adj_csr)
 			return self.adj
 		
 	property mvm:
 		def __get__(self):
+			"""mvm_csr as a rads DiGraph (built on first use)."""
+			if self.mvm is None and self.mvm_csr is not None:
+				self.mvm = graph_from_csr(DiGraph(),self.mvm_csr)
 			return self.mvm
+
+	property adj_csr:
+		def __get__(self):
+			return self.adj_csr
+
+	property mvm_csr:
+		def __get__(self):
+			return self.mvm_csr
+
+	property rigorous:
+		def __get__(self):
+			"""False after update(mode='sampled'), whose mvm_csr is only
+			an approximation."""
+			return self.rigorous
 		
 	property mapper:
-		def __set__(self,Mapper mapper):
-			# TODO: type check that it's a Mapper
+		def __set__(self,mapper):
+			# a compiled Mapper, or a map written in Python with a
+			# map_boxes method (see rads.maps.pymapper)
 			self.pymapper = mapper
-			self.cmapper = mapper.mapper
+			self.prev_tree = None
+			if isinstance(mapper,Mapper):
+				self.cmapper = (<Mapper>mapper).mapper
+			elif hasattr(mapper,'map_boxes'):
+				self.cmapper = NULL
+			else:
+				raise TypeError("CombEnc: mapper must be a Mapper or a PyMapper")
 		def __get__(self):
 			return self.pymapper
 
@@ -96,6 +407,7 @@ cdef class CombEnc:
 			# TODO: type check that it's a Tree
 			self.pytree = tree
 			self.ctree = tree.tree
+			self.prev_tree = None
 		def __get__(self):
 			return self.pytree
 
@@ -1,3 +1,5 @@
+cimport numpy as np
+import numpy as np
 from cppdefs cimport *
 from cyutils cimport *
 
@@ -26,6 +28,35 @@ cdef class Mapper:
 			d[<object>names[i].c_str()] = interval2array(p[i])
 		return d
 
+	def map_boxes(self,lo,hi):
+		"""Map the boxes [lo[i],hi[i]] of two (N,d) arrays of bounds at
+		once, as PyMapper.map_boxes does.  Returns the bounds (imlo,imhi)
+		of their images, as (N,d) arrays."""
+		cdef np.ndarray l = np.ascontiguousarray(np.transpose(lo),dtype=np.double)
+		cdef np.ndarray h = np.ascontiguousarray(np.transpose(hi),dtype=np.double)
+		if l.ndim != 2 or l.shape[0] != self.mapper.dim() or h.shape[0] != l.shape[0] \
+		   or h.shape[1] != l.shape[1]:
+			raise ValueError("map_boxes: expected two (N,%i) arrays" % self.mapper.dim())
+		cdef np.ndarray imlo = np.empty_like(l)
+		cdef np.ndarray imhi = np.empty_like(l)
+		cdef int n = l.shape[1]
+		with nogil:
+			self.mapper.map_boxes(n,<double *>l.data,<double *>h.data,
+								  <double *>imlo.data,<double *>imhi.data)
+		return imlo.T,imhi.T
+
+	property centered:
+		"""If True, the images of boxes are tightened by the centered form
+		f(c) + J(box)(box - c), for maps which supply their Jacobian
+		(Henon, Ricker); others ignore it.  This costs a few more
+		evaluations per box, and pays off for small boxes of maps in
+		which a variable appears several times, whose plain interval
+		images are too wide, giving needlessly many edges in mvm."""
+		def __get__(self):
+			return self.mapper.is_centered()
+		def __set__(self,bint c):
+			self.mapper.set_centered(c)
+
 	cdef cMapper *get_mapper(self):
 		return self.mapper
 
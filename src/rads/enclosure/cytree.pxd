@@ -2,6 +2,9 @@ from cppdefs cimport *
 
 cdef class Tree:
 	cdef cTree *tree
-	cpdef object subdivide(self,int subdivs=*)
+	cdef object origin
+	cdef int marks
+	cdef void track(self,origin)
+	cpdef object subdivide(self,object subdivs=*)
 	cpdef object set_depth(self,int)
 	cdef cTree * get_tree(self)
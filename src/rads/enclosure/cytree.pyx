@@ -5,9 +5,26 @@ from cppdefs cimport *
 from cyutils cimport *
 from cyboxset cimport UBoxSet
 
+# passed as the box by Tree.load, which fills in the tree itself
+cdef object _loading = object()
+
 cdef class Tree:
-	def __cinit__(self,np.ndarray box,int depth=0,full=False):
-		self.tree = new_Tree(array2box(box))
+	"""Tree(box,depth=0,full=False,binary=False,sorted=False)
+
+	A tree of boxes in the bounding box box ([corner,width]).  Each
+	subdivision normally splits a box along every axis, into 2^dim
+	children; with binary=True, it only splits one axis, cycling
+	through the axes with the depth, into 2 children.
+
+	With sorted=True, the box ids are kept in Morton (Z-order) key
+	order (see keys), at the price of renumbering the boxes after every
+	insert or local subdivide."""
+
+	def __cinit__(self,box,int depth=0,full=False,binary=False,sorted=False):
+		if box is _loading:
+			self.tree = NULL
+			return
+		self.tree = new_Tree(array2box(box),binary,sorted)
 		if full:
 			self.insert(self.bbox)
 			for i in range(depth):
@@ -19,16 +36,37 @@ cdef class Tree:
 		del_Tree(self.tree)
 
 	def insert(self,np.ndarray a):
+		cdef int n = self.tree.count()
+		cdef object ids
 		if a.ndim == 2:
-			return vector2array_int(self.tree.insert(array2box(a)))
+			ids = vector2array_int(self.tree.insert(array2box(a)))
 		else:
-			return self.tree.insert(array2point(a))
+			ids = self.tree.insert(array2point(a))
+		if self.tree.count() != n:
+			self.track(None)
+		return ids
 
 	def insert_box(self,np.ndarray a):
-		return vector2array_int(self.tree.insert(array2box(a)))
+		cdef int n = self.tree.count()
+		cdef object ids
+		ids = vector2array_int(self.tree.insert(array2box(a)))
+		if self.tree.count() != n:
+			self.track(None)
+		return ids
 
 	def remove(self,ids):
-		return self.tree.remove(array2vector_int(ids))
+		"""Remove the boxes with the given ids, and any tree nodes left
+		without boxes below them.  The other boxes keep their order but
+		are renumbered; returns an int array mapping each old id to its
+		new id (-1 for the removed boxes), so that per-box data can be
+		relabeled rather than recomputed."""
+		cdef vector[int] remap
+		if self.tree.remove(array2vector_int(ids),remap) != 0:
+			raise IndexError("Tree.remove: box id out of range")
+		r = vector2array_int32(remap)
+		if self.origin is not None:
+			self.track(self.origin[r >= 0])
+		return r
 
 	def search(self,np.ndarray a):
 		if a.ndim == 2:
@@ -39,17 +77,189 @@ cdef class Tree:
 	def search_box(self,np.ndarray a):
 		return vector2array_int(self.tree.search(array2box(a)))
 
+	def search_points(self,P):
+		"""Search for an (N,d) array of points at once.  Returns an int
+		array of the leaf ids containing each point (-1 if none).
+
+		The GIL is released during the search, so several threads may
+		search the same tree at once, provided none of them modifies it."""
+		cdef np.ndarray pts = np.ascontiguousarray(P,dtype=np.double)
+		if pts.ndim != 2 or pts.shape[1] != self.tree.dimension():
+			raise ValueError("search_points: expected an (N,%i) array" % self.tree.dimension())
+		cdef np.ndarray ids = np.empty(pts.shape[0],dtype=np.int32)
+		cdef cTree *t = self.tree
+		cdef int n = pts.shape[0]
+		cdef double *p = <double *>pts.data
+		cdef int *q = <int *>ids.data
+		with nogil:
+			t.search_points(n,p,q)
+		return ids
+
+	def search_boxes(self,B):
+		"""Search for an (N,2,d) array of boxes at once (each box given
+		as [corner,width], as in search_box).  Returns CSR-style arrays
+		(indptr,indices): the leaves hit by box k are
+		indices[indptr[k]:indptr[k+1]].  Like search_points, this
+		releases the GIL."""
+		cdef np.ndarray boxes = np.ascontiguousarray(B,dtype=np.double)
+		if boxes.ndim != 3 or boxes.shape[1] != 2 or boxes.shape[2] != self.tree.dimension():
+			raise ValueError("search_boxes: expected an (N,2,%i) array" % self.tree.dimension())
+		cdef vector[int] indptr, indices
+		cdef cTree *t = self.tree
+		cdef int n = boxes.shape[0]
+		cdef double *p = <double *>boxes.data
+		with nogil:
+			t.search_boxes(n,p,indptr,indices)
+		return vector2array_int32(indptr),vector2array_int32(indices)
+
+	def keys(self):
+		"""The Morton (Z-order) key of each box, as a uint64 array.  The
+		key interleaves the bits of the box's grid coordinates (see
+		grid_coords), so sorting boxes by key puts nearby boxes close
+		together.  Raises ValueError if the keys need more than 63 bits
+		(dim*depth, or depth for a binary tree)."""
+		cdef np.ndarray k = np.empty(self.tree.count(),dtype=np.uint64)
+		if self.tree.keys(<uint64_t *>k.data) != 0:
+			raise ValueError("Tree.keys: %i bits needed, 63 available" % self.tree.key_bits())
+		return k
+
+	def grid_coords(self):
+		"""The integer coordinates of each box on the grid of the
+		smallest possible boxes at the tree's depth, as an (N,d) int64
+		array.  A box of a lower level gets the coordinates of its lower
+		corner.  Raises ValueError like keys."""
+		cdef np.ndarray c = np.empty((self.tree.count(),self.tree.dimension()),dtype=np.int64)
+		if self.tree.grid_coords(<int64_t *>c.data) != 0:
+			raise ValueError("Tree.grid_coords: %i bits needed, 63 available" % self.tree.key_bits())
+		return c
+
+	def coords_to_keys(self,coords):
+		"""The keys of the grid cells at an (N,d) array of grid
+		coordinates, e.g. grid_coords() plus an offset to look up
+		neighbors.  Cells off the grid get the key 2**64-1."""
+		cdef np.ndarray c = np.ascontiguousarray(coords,dtype=np.int64)
+		if c.ndim != 2 or c.shape[1] != self.tree.dimension():
+			raise ValueError("coords_to_keys: expected an (N,%i) array" % self.tree.dimension())
+		cdef np.ndarray k = np.empty(c.shape[0],dtype=np.uint64)
+		if self.tree.coords_to_keys(c.shape[0],<int64_t *>c.data,<uint64_t *>k.data) != 0:
+			raise ValueError("Tree.coords_to_keys: %i bits needed, 63 available" % self.tree.key_bits())
+		return k
+
+	def sort(self):
+		"""Renumber the boxes in key order.  Returns the old id of each
+		box, so that x[order] reorders per-box data x to match."""
+		cdef vector[int] order
+		self.tree.sort_leaves(order)
+		o = vector2array_int32(order)
+		if self.origin is not None:
+			self.track(self.origin[o])
+		return o
+
+	def mark(self):
+		"""Start keeping track of where the boxes come from.  Until the
+		next mark, origins gives the id each box had at this one, as
+		subdivide, remove and sort renumber them.  Returns the mark to
+		pass to origins."""
+		self.marks += 1
+		self.track(np.arange(self.tree.count(),dtype=np.int32))
+		return self.marks
+
+	def origins(self,mark):
+		"""The id each box had at mark (see mark): its own, or that of
+		the box it was split from, as a read-only int32 array.  None if
+		the tree was marked again since, or lost track: a box was
+		inserted, or some boxes of a sorted tree were subdivided, which
+		renumbers the others."""
+		if mark != self.marks:
+			return None
+		return self.origin
+
+	cdef void track(self,origin):
+		# the origins after a change (None if they are lost)
+		if origin is not None:
+			origin.flags.writeable = False
+		self.origin = origin
+
 	def boxes(self):
 		b = UBoxSet()
 		b.init(self.tree.boxes())
 		return b
 
-	cpdef object subdivide(self,int subdivs=1):
-		for i in range(subdivs):
-			self.tree.subdivide()
+	def save(self,path):
+		"""Write the tree to path in a compact binary format (see
+		Tree.load)."""
+		if self.tree.save(path) != 0:
+			raise IOError("Tree.save: could not write %s" % path)
+
+	@staticmethod
+	def load(path,mmap=True):
+		"""Read a tree written by Tree.save.  With mmap=True the file is
+		memory mapped rather than read: this is quick, and processes
+		loading the same file share its pages.  The mapped data are
+		never written to; modifying the tree copies what it changes
+		into memory first.  Either way, the node links and leaves are
+		checked first, and a damaged file raises IOError."""
+		cdef cTree *t = load_Tree(path,mmap)
+		if t == NULL:
+			raise IOError("Tree.load: could not read a tree from %s" % path)
+		cdef Tree tree = Tree(_loading)
+		tree.tree = t
+		return tree
+
+	def copy(self):
+		"""Return a snapshot of the tree.  The copy shares all of its
+		storage with this tree until either of them is changed, and then
+		only what changes is copied: searching, pruning (remove) or
+		saving the copy adds nothing, or only the pruned tree's size.
+		This makes it cheap to start each run of a parameter sweep from
+		the same refined tree."""
+		cdef Tree tree = Tree(_loading)
+		tree.tree = new_Tree(self.tree[0])
+		return tree
+
+	def __copy__(self):
+		return self.copy()
+
+	cpdef object subdivide(self,object subdivs=1):
+		"""subdivide(n) subdivides every box n times.
+
+		subdivide(ids), for a list or array of box ids, subdivides only
+		those boxes, leaving a tree whose boxes have different sizes
+		(see UBoxSet.levels).  The first child of each box keeps its id,
+		the others get new ids at the end, and no other id changes.
+		Returns the ids of the children, 2^dim per (sorted, distinct)
+		box id, or 2 per box id in a binary tree, which splits each box
+		along one axis only."""
+		cdef vector[int] newids
+		cdef int n = self.tree.count()
+		if np.ndim(subdivs) == 0:
+			for i in range(subdivs):
+				self.tree.subdivide()
+			# the children of box i are the ids k*i..k*i+k-1
+			if self.origin is not None and n > 0:
+				self.track(np.repeat(self.origin,self.tree.count()/n))
+			return
+		if self.tree.subdivide(array2vector_int(subdivs),newids) != 0:
+			raise IndexError("Tree.subdivide: box id out of range")
+		ids = vector2array_int32(newids)
+		if self.origin is not None and len(ids) > 0:
+			if self.tree.is_sorted():
+				self.track(None)
+			else:
+				# the first child of each box keeps its id
+				k = 2 if self.tree.is_binary() else 1 << self.tree.dimension()
+				origin = np.empty(self.tree.count(),dtype=np.int32)
+				origin[:n] = self.origin
+				origin[ids] = np.repeat(self.origin[ids[::k]],k)
+				self.track(origin)
+		return ids
 
 	cpdef object set_depth(self,int d):
-		self.tree.set_depth(d)
+		"""Set the depth new boxes are inserted at.  It cannot be lowered
+		(ValueError)."""
+		if self.tree.set_depth(d) != 0:
+			raise ValueError("Tree.set_depth: cannot go from depth %i to %i"
+							 % (self.tree.depth(),d))
 	
 	cdef cTree * get_tree(self):
 		return self.tree
@@ -62,6 +272,14 @@ cdef class Tree:
 		def __get__(self):
 			return self.tree.dimension()
 		
+	property binary:
+		def __get__(self):
+			return self.tree.is_binary()
+		
+	property sorted:
+		def __get__(self):
+			return self.tree.is_sorted()
+		
 	property depth:
 		def __get__(self):
 			return self.tree.depth()
@@ -69,6 +287,16 @@ cdef class Tree:
 	property size:
 		def __get__(self):
 			return self.tree.count()
+
+	property memory:
+		def __get__(self):
+			"""Bytes used by the node and leaf storage."""
+			return self.tree.memory()
+
+	property unshared_memory:
+		def __get__(self):
+			"""Bytes of the storage that no other tree (see copy) shares."""
+			return self.tree.unshared_memory()
 		
 	def __repr__(self):
 		self.tree.print_tree()
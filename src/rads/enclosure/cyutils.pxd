@@ -11,6 +11,8 @@ cdef cBox array2box(np.ndarray a)
 cdef np.ndarray[np.double_t,ndim=1] point2array(cPoint p)
 cdef np.ndarray[np.double_t,ndim=2] box2array(cBox b)
 cdef np.ndarray[np.long_t] vector2array_int(vector[int] v)
+cdef np.ndarray vector2array_int32(vector[int] &v)
+cdef np.ndarray view2array(const double *data, int n, int d, object owner)
 #cdef vector[int] array2vector_int(np.ndarray[int_t,ndim=1] o)
 cdef vector[int] array2vector_int(object o)
 cdef np.ndarray[np.double_t] vector2array(vector[double] v)
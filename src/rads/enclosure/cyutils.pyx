@@ -1,7 +1,10 @@
 cimport numpy as np
 import numpy as np
+from libc.string cimport memcpy
 from cppdefs cimport *
 
+np.import_array()
+
 #------------------------------
 # Helpers
 #------------------------------
@@ -46,6 +49,25 @@ cdef np.ndarray[np.long_t] vector2array_int(vector[int] v):
 		a[i] = <np.long_t>v[i]
 	return a
 
+cdef np.ndarray vector2array_int32(vector[int] &v):
+	# one block copy, for the (potentially huge) batched search results
+	cdef np.ndarray a = np.empty((v.size()),dtype=np.int32)
+	if v.size() > 0:
+		memcpy(a.data,&v[0],v.size()*sizeof(int))
+	return a
+
+cdef np.ndarray view2array(const double *data, int n, int d, object owner):
+	# a read-only (n,d) view of data, which owner keeps alive
+	if n == 0 or d == 0:
+		return np.zeros((n,d),dtype=np.double)
+	cdef np.npy_intp shape[2]
+	shape[0] = n
+	shape[1] = d
+	cdef np.ndarray a = np.PyArray_SimpleNewFromData(2,shape,np.NPY_DOUBLE,<void *>data)
+	np.set_array_base(a,owner)
+	a.flags.writeable = False
+	return a
+
 cdef np.ndarray[np.double_t] vector2array(vector[double] v):
 	cdef np.ndarray[np.double_t,ndim=1] a = np.zeros((v.size()),dtype=np.double)
 	cdef Py_ssize_t i
@@ -65,6 +87,14 @@ cdef cIVAL array2interval(np.ndarray a):
 cdef vector[int] array2vector_int(object lst):
 	cdef vector[int] v
 	cdef Py_ssize_t i
+	cdef np.ndarray a
+	if isinstance(lst,np.ndarray):
+		# one block copy for arrays of ids
+		a = np.ascontiguousarray(lst,dtype=np.int32)
+		v.resize(a.size)
+		if a.size > 0:
+			memcpy(&v[0],a.data,a.size*sizeof(int))
+		return v
 	for i in range(len(lst)):
 		v.push_back(<int?>lst[i])
 	return v
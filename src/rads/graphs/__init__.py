@@ -1,5 +1,6 @@
-__all__ = ["Graph", "DiGraph", "algorithms"]
+__all__ = ["Graph", "DiGraph", "CSRDiGraph", "algorithms"]
 
 from graph import Graph
 from digraph import DiGraph
+from csrdigraph import CSRDiGraph
 import algorithms
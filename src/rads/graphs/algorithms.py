@@ -1,5 +1,8 @@
 import networkx as nx
-from rads.graphs import Graph, DiGraph
+import numpy as np
+from rads.graphs import Graph, DiGraph, CSRDiGraph
+from rads.graphs.cygraphs import scc_labels, scc_mis_parallel, mis_nodes, \
+    InvariantSet
 import itertools
 
 def condensation( G, components, loops=False ):
@@ -98,53 +101,72 @@ def condensation_nx( G, components) :
     cG.graph = nx.condensation( G.graph, components )
     return cG
 
-def graph_mis( G, return_rsccs=False ):
+def graph_mis( G, return_rsccs=False, threads=1 ):
     """Return the maximal invariant set of a graph G.
 
     Given a graph G, the maximal invariant set (MIS) is the maximal
     subset S of nodes such that for every node v in S, there exists a
     bi-infinite walk in G which passes through v.
 
+    These are the nodes reached from a real (non-transient) strongly
+    connected component which also reach one. The components are
+    labeled (see scc_raf), and the rest is two searches, forward and
+    backward, over the CSR arrays of G (see mis_nodes); G is not
+    changed.
+
     Parameters
     ----------
     G : DiGraph
 
+    threads : with threads != 1, the set is found with the components,
+    on that many threads (one per processor if threads <= 0; see
+    scc_raf). The set is the same.
+
     Returns
     -------
     S : list
-       The maximal invariant set of G.
+       The maximal invariant set of G, in the order of the nodes of G
+       (sorted, for a graph on 0..n-1). With return_rsccs, also the
+       components and real component indices of scc_raf. (For the
+       set as an int array, call mis_nodes on the CSR arrays.)
     """
-    if len(G)==0:
-        return []
-    sccs,rsccs = scc_raf( G )
-    #C = condensation( G, sccs )
-    # returns RADS digraph
-    #C = condensation_nx( G, sccs )
-    C = condensation( G, sccs )
-    forward = set( descendants( C, rsccs ) )
-    rC = C.reverse()
-    backward = set( descendants( rC, rsccs ) )
-    cnodes = forward & backward
+    indptr, indices, alive, nodes = csr_arrays( G )
+    labels, real, members, ptr, S = _sccs( indptr, indices, alive, threads )
+    if S is None:
+        S = mis_nodes( indptr, indices, alive, labels, real )
+    S = S.tolist()
+    if nodes is not None:
+        S = [ nodes[k] for k in S ]
     if return_rsccs:
-        return list(itertools.chain(*[sccs[c] for c in cnodes])), sccs, rsccs
+        sccs = _scc_lists( members, ptr, nodes )
+        return S, sccs, np.flatnonzero( real ).tolist()
     else:
-        return list(itertools.chain(*[sccs[c] for c in cnodes]))
+        return S
     
+def graph_mis_set( G ):
+    """Return the maximal invariant set of G as an InvariantSet (see
+    cygraphs), which is cut down by remove_nodes and restrict_to as
+    nodes are taken out, rather than found again with graph_mis.
+
+    The nodes of G must be 0..n-1 (as for the mvm of a CombEnc).
+    """
+    indptr, indices, alive, nodes = csr_arrays( G )
+    if nodes is not None:
+        raise ValueError( "graph_mis_set: the nodes must be 0..n-1" )
+    return InvariantSet( indptr, indices, alive )
+
 def descendants(G,S):
-    """Decendents of S (subset of nodes) in G"""
+    """Descendants of S (subset of nodes) in G, S included. G is not
+    changed."""
     G_nx = G.graph # get right to nx
-    n = len(G_nx)
-    G_nx.add_node(n)
-    for s in S:
-        G_nx.add_edge(n,s)
-    d = list( nx.algorithms.dfs_postorder_nodes(G_nx,n) )
-    d.remove(n)     # TODO: make more efficient!
-    # JJB - since dfs_postorder_nodes return a generator, we must
-    # keep the 'star' node n in until the generator is complete
-    # RMF - casting to a list for now, for simplicity
-    # JJB - when casting to a list, make sure to close your parens ;)
-    G_nx.remove_node(n)
-    return d
+    seen = set( S )
+    stack = list( seen )
+    while stack:
+        for w in G_nx[ stack.pop() ]:
+            if w not in seen:
+                seen.add( w )
+                stack.append( w )
+    return list( seen )
 
 def first_return_times( k, backwards=False ):
     """
@@ -182,7 +204,28 @@ def first_return_times( k, backwards=False ):
         if distances:
             rt[i] = min( distances )
 
-def scc_raf(G):
+def csr_arrays( G ):
+    """The CSR arrays indptr, indices of the DiGraph (or networkx or
+    CSRDiGraph) G, with the nodes of G numbered in its order, and the
+    successors of each in the order G lists them.  Returns indptr,
+    indices, alive, nodes, where nodes[k] is node k (None if the nodes
+    of G are 0..n-1 in order), and alive is the mask of the nodes of a
+    CSRDiGraph (None for others)."""
+    G_nx = G.graph
+    if isinstance( G_nx, CSRDiGraph ):
+        return G_nx.indptr, G_nx.indices, G_nx.alive, None
+    nodes = list( G_nx )
+    index = dict( zip( nodes, xrange( len( nodes ) ) ) )
+    indptr = np.zeros( len( nodes )+1, dtype=np.int32 )
+    indices = []
+    for k,v in enumerate( nodes ):
+        indices.extend( index[w] for w in G_nx[v] )
+        indptr[k+1] = len( indices )
+    if nodes == range( len( nodes ) ):
+        nodes = None
+    return indptr, np.array( indices, dtype=np.int32 ), None, nodes
+
+def scc_raf( G, threads=1 ):
     """Return nodes in strongly connected components of graph.
 
     Parameters
@@ -193,67 +236,54 @@ def scc_raf(G):
     Returns
     -------
     comp : list of lists
-       A list of nodes for each component of G.
-       The list is ordered from largest connected component to smallest.
+       A list of nodes for each component of G, in the order they are
+       completed (not sorted by size).
+
+    real_scc_inds : list
+       The indices in comp of the components which are not transient:
+       those with more than one node, or a loop.
 
     See Also       
     --------
-    connected_components
+    connected_components, cygraphs.scc_labels
 
     Notes
     -----
     Uses Tarjan's algorithm with Nuutila's modifications.
-    Nonrecursive version of algorithm.
+    Nonrecursive version of algorithm, compiled, on the CSR arrays of
+    G (see csr_arrays). For the labels alone, without the lists, call
+    scc_labels on those.
+
+    With threads != 1, the components are found on that many threads
+    (one per processor if threads <= 0) by trimming and coloring
+    instead (see scc_mis_parallel), for very large graphs. They are
+    the same components, but in the order of their smallest nodes,
+    each listed in node order.
     """
-    G_nx = G.graph
-    preorder={}
-    lowlink={}   
-    scc_found={}
-    scc_queue = []
-    scc_list=[]
-    real_scc_inds=[]    # RAF
-    i=0     # Preorder counter
-    for source in G_nx:
-        if source not in scc_found:
-            queue=[source]
-            while queue:
-                v=queue[-1]
-                if v not in preorder:
-                    i=i+1
-                    preorder[v]=i
-                done=1
-                v_nbrs=G_nx[v]
-                for w in v_nbrs:
-                    if w not in preorder:
-                        queue.append(w)
-                        done=0
-                        break
-                if done==1:
-                    lowlink[v]=preorder[v]
-                    for w in v_nbrs:
-                        if w not in scc_found:
-                            if preorder[w]>preorder[v]:
-                                lowlink[v]=min([lowlink[v],lowlink[w]])
-                            else:
-                                lowlink[v]=min([lowlink[v],preorder[w]])
-                    queue.pop()
-                    if lowlink[v]==preorder[v]:
-                        scc_found[v]=True
-                        scc=[v]
-                        while scc_queue and preorder[scc_queue[-1]]>preorder[v]:
-                            k=scc_queue.pop()
-                            scc_found[k]=True
-                            scc.append(k)
-                        # RAF: changed here to exclude 'transient' SCCs
-                        # thus, single vertices are SCCs iff they are loops
-                        scc_list.append(scc)
-                        if len(scc)>1 or G_nx.has_edge(scc[0],scc[0]):
-                            real_scc_inds.append(len(scc_list)-1) # index of the scc
-                    else:
-                        scc_queue.append(v)
-    # RAF: removed sorting... don't really need it
-    # scc_list.sort(key=len,reverse=True)           
-    return scc_list, real_scc_inds
+    indptr, indices, alive, nodes = csr_arrays( G )
+    labels, real, members, ptr, mis = _sccs( indptr, indices, alive, threads )
+    return _scc_lists( members, ptr, nodes ), np.flatnonzero( real ).tolist()
+
+def _sccs( indptr, indices, alive, threads ):
+    # the labels, real, members and ptr of scc_labels, by Tarjan or (if
+    # threads != 1) in parallel, and the invariant set if found too
+    if threads == 1:
+        return scc_labels( indptr, indices, alive,
+                           return_members=True ) + ( None, )
+    labels, real, mis = scc_mis_parallel( indptr, indices, alive, threads )
+    members = np.argsort( labels, kind='mergesort' ).astype( np.int32 )
+    members = members[ np.count_nonzero( labels < 0 ): ]
+    counts = np.bincount( labels[ labels >= 0 ], minlength=len( real ) )
+    ptr = np.r_[ 0, np.cumsum( counts ) ].astype( np.int32 )
+    return labels, real, members, ptr, mis
+
+def _scc_lists( members, ptr, nodes ):
+    # the components of scc_labels as lists of nodes, for scc_raf
+    members = members.tolist()
+    if nodes is not None:
+        members = [ nodes[k] for k in members ]
+    ptr = ptr.tolist()
+    return [ members[ptr[c]:ptr[c+1]] for c in xrange( len( ptr )-1 ) ]
     
 def blockmodel(G,partitions,multigraph=False):
     """
@@ -0,0 +1,249 @@
+import numpy as np
+from scipy import sparse
+from collections import OrderedDict
+
+class CSRDiGraph( object ):
+    """
+    A directed graph on the nodes 0..n-1 stored as int32 CSR arrays,
+    forward and reverse, rather than as networkx dicts: a few bytes
+    per edge instead of a few hundred, for the large transition graphs
+    of CombEnc.
+
+        G = CSRDiGraph( ce.mvm_csr )
+
+    The edges are fixed once made, but nodes can be removed (they are
+    masked out), and subgraphs keep the node labels of G, as networkx
+    does, sharing G's arrays. It has the methods of DiGraph that
+    graph_mis, ComputeIndex and friends use; G.graph is G itself, so
+    code reaching into the networkx graph of a DiGraph (as scc_raf
+    does, with G.graph[v] and has_edge) works on it too.
+    """
+    def __init__( self, A=None, nodes=None ):
+        """
+        A : square sparse (or dense) adjacency matrix, with an edge i->j
+        for each nonzero A[i,j]. Empty if None.
+
+        nodes : the nodes of the graph, a subset of range(n) (default:
+        all of them).
+        """
+        if A is None:
+            A = sparse.csr_matrix( (0,0), dtype=np.int8 )
+        A = sparse.csr_matrix( A )
+        A.sum_duplicates()
+        A.sort_indices()
+        self._set_arrays( A.indptr, A.indices, A.shape[0] )
+        self.alive = np.ones( self.n, dtype=bool )
+        if nodes is not None:
+            self.alive[:] = False
+            self.alive[ np.asarray( list( nodes ), dtype=np.int64 ) ] = True
+
+    def _set_arrays( self, indptr, indices, n ):
+        # the forward arrays, and the reverse ones, from a CSC copy
+        self.n = n
+        self.indptr = np.asarray( indptr, dtype=np.int32 )
+        self.indices = np.asarray( indices, dtype=np.int32 )
+        data = np.ones( len( self.indices ), dtype=np.int8 )
+        R = sparse.csr_matrix( (data, self.indices, self.indptr),
+                               shape=(n,n) ).tocsc()
+        R.sort_indices()
+        self.rindptr = np.asarray( R.indptr, dtype=np.int32 )
+        self.rindices = np.asarray( R.indices, dtype=np.int32 )
+
+    def _view( self, alive, reverse=False ):
+        # a graph on the same arrays (swapped if reverse) with other nodes
+        G = CSRDiGraph.__new__( CSRDiGraph )
+        G.n = self.n
+        if reverse:
+            G.indptr, G.indices = self.rindptr, self.rindices
+            G.rindptr, G.rindices = self.indptr, self.indices
+        else:
+            G.indptr, G.indices = self.indptr, self.indices
+            G.rindptr, G.rindices = self.rindptr, self.rindices
+        G.alive = alive
+        return G
+
+    @property
+    def graph( self ):
+        return self
+
+    def __repr__( self ):
+        return "rads CSRDiGraph object on %i nodes and %i edges" % (
+            self.number_of_nodes(), self.number_of_edges() )
+
+    def __len__( self ):
+        return int( self.alive.sum() )
+
+    def __iter__( self ):
+        return iter( self.nodes() )
+
+    def __contains__( self, n ):
+        if not isinstance( n, (int, long, np.integer) ):
+            return False
+        return 0 <= n < self.n and bool( self.alive[n] )
+
+    def __getitem__( self, u ):
+        """The successors of u, as the keys of a dict (as in networkx),
+        in CSR order."""
+        return OrderedDict.fromkeys( self.successors( u ), {} )
+
+    def is_directed( self ):
+        return True
+
+    def nodes( self, data=False ):
+        nodes = np.flatnonzero( self.alive ).tolist()
+        if data:
+            return [ (u, {}) for u in nodes ]
+        return nodes
+
+    def nodes_iter( self, data=False ):
+        return iter( self.nodes( data ) )
+
+    def number_of_nodes( self ):
+        return len( self )
+
+    def _edge_mask( self ):
+        # the edges between live nodes, in CSR order
+        src = np.repeat( self.alive, np.diff( self.indptr ) )
+        return src & self.alive[ self.indices ]
+
+    def number_of_edges( self ):
+        return int( self._edge_mask().sum() )
+
+    def successors( self, n ):
+        """Return a list of successor nodes of n."""
+        if n not in self:
+            raise KeyError( "node %s not in the graph" % (n,) )
+        s = self.indices[ self.indptr[n]:self.indptr[n+1] ]
+        return s[ self.alive[s] ].tolist()
+
+    def predecessors( self, n ):
+        """Return a list of predecessor nodes of n."""
+        if n not in self:
+            raise KeyError( "node %s not in the graph" % (n,) )
+        p = self.rindices[ self.rindptr[n]:self.rindptr[n+1] ]
+        return p[ self.alive[p] ].tolist()
+
+    # as for nx.DiGraph
+    neighbors = successors
+
+    def successors_iter( self, n ):
+        return iter( self.successors( n ) )
+
+    def predecessors_iter( self, n ):
+        return iter( self.predecessors( n ) )
+
+    def has_edge( self, u, v ):
+        if u not in self or v not in self:
+            return False
+        s = self.indices[ self.indptr[u]:self.indptr[u+1] ]
+        k = np.searchsorted( s, v )
+        return k < len( s ) and s[k] == v
+
+    def has_successor( self, u, v ):
+        return self.has_edge( u, v )
+
+    def has_predecessor( self, u, v ):
+        return self.has_edge( v, u )
+
+    def edges( self, nbunch=None, data=False ):
+        """Return a list of the edges (u,v), for u in nbunch (default:
+        all nodes)."""
+        keep = self._edge_mask()
+        if nbunch is not None:
+            if nbunch in self:
+                nbunch = [ nbunch ]
+            sel = np.zeros( self.n, dtype=bool )
+            sel[ [ u for u in nbunch if u in self ] ] = True
+            keep &= np.repeat( sel, np.diff( self.indptr ) )
+        src = np.repeat( np.arange( self.n ), np.diff( self.indptr ) )
+        edges = zip( src[keep].tolist(), self.indices[keep].tolist() )
+        if data:
+            return [ (u, v, {}) for u, v in edges ]
+        return edges
+
+    def edges_iter( self, nbunch=None, data=False ):
+        return iter( self.edges( nbunch, data ) )
+
+    def in_edges( self, nbunch=None, data=False ):
+        return [ (e[1], e[0]) + tuple( e[2:] ) for e in
+                 self.reverse().edges( nbunch, data ) ]
+
+    def _degree( self, ptr, ind, nbunch ):
+        if nbunch in self:
+            return int( self.alive[ ind[ ptr[nbunch]:ptr[nbunch+1] ] ].sum() )
+        deg = np.add.reduceat( np.r_[ self.alive[ind], 0 ], ptr[:-1] ) \
+            if len( ind ) else np.zeros( self.n, dtype=int )
+        deg = np.where( np.diff( ptr ) > 0, deg, 0 )
+        if nbunch is None:
+            nbunch = self.nodes()
+        return dict( (u, int( deg[u] )) for u in nbunch if u in self )
+
+    def out_degree( self, nbunch=None, weighted=False ):
+        """The number of edges out of a node, or a dict of them for nbunch
+        (default: all nodes)."""
+        return self._degree( self.indptr, self.indices, nbunch )
+
+    def in_degree( self, nbunch=None, weighted=False ):
+        """The number of edges into a node, or a dict of them for nbunch
+        (default: all nodes)."""
+        return self._degree( self.rindptr, self.rindices, nbunch )
+
+    def subgraph( self, nbunch ):
+        """
+        Return the CSRDiGraph on the nodes in nbunch (and in the graph),
+        with their labels. It shares the edge arrays with this graph.
+        """
+        alive = np.zeros( self.n, dtype=bool )
+        nodes = [ u for u in nbunch if u in self ]
+        alive[ np.asarray( nodes, dtype=np.int64 ) ] = True
+        return self._view( alive )
+
+    def reverse( self, copy=True ):
+        """
+        Return the reverse of the graph, sharing the arrays (the reverse
+        ones are kept anyway). With copy=False, reverse this graph in
+        place.
+        """
+        if copy:
+            return self._view( self.alive.copy(), reverse=True )
+        self.indptr, self.rindptr = self.rindptr, self.indptr
+        self.indices, self.rindices = self.rindices, self.indices
+
+    def copy( self ):
+        return self._view( self.alive.copy() )
+
+    def remove_node( self, n ):
+        if n not in self:
+            raise KeyError( "node %s not in the graph" % (n,) )
+        self.alive[n] = False
+
+    def remove_nodes_from( self, nbunch ):
+        """
+        Remove multiple nodes. Nodes not in the graph are silently
+        ignored, as in networkx.
+        """
+        nodes = [ u for u in nbunch if u in self ]
+        self.alive[ np.asarray( nodes, dtype=np.int64 ) ] = False
+
+    def to_csr( self ):
+        """The n x n CSR adjacency matrix of the graph (rows and columns
+        of removed nodes empty)."""
+        keep = self._edge_mask()
+        counts = np.add.reduceat( np.r_[ keep, False ].astype( np.int32 ),
+                                  self.indptr[:-1] ) if self.n else []
+        counts = np.where( np.diff( self.indptr ) > 0, counts, 0 )
+        indptr = np.r_[ 0, np.cumsum( counts ) ].astype( np.int32 )
+        data = np.ones( int( keep.sum() ), dtype=np.int8 )
+        return sparse.csr_matrix( (data, self.indices[keep], indptr),
+                                  shape=(self.n, self.n) )
+
+    def to_numpy_matrix( self, nodelist=None, **kwargs ):
+        """
+        The adjacency matrix on the nodes (or nodelist), in that order,
+        as a numpy matrix (as nx.to_numpy_matrix).
+        """
+        if nodelist is None:
+            nodelist = self.nodes()
+        nodelist = np.asarray( nodelist, dtype=np.int64 )
+        A = self.to_csr()[ nodelist ][ :, nodelist ]
+        return np.matrix( A.toarray(), dtype=kwargs.get( 'dtype', float ) )
@@ -0,0 +1,195 @@
+cimport numpy as np
+import numpy as np
+from libc.string cimport memcpy
+from cppdefs cimport *
+
+cdef np.ndarray vector2array(vector[int] &v):
+	cdef np.ndarray a = np.empty(v.size(),dtype=np.int32)
+	if v.size() > 0:
+		memcpy(a.data,&v[0],v.size()*sizeof(int))
+	return a
+
+def scc_labels(indptr, indices, alive=None, return_members=False):
+	"""
+	The strongly connected components of the directed graph on the
+	nodes 0..n-1 with the CSR arrays indptr, indices (as of a sparse
+	matrix, or a CSRDiGraph), found by the algorithm of scc_raf, with
+	the same order of components, compiled.
+
+	alive : bool array; if given, only the nodes i with alive[i] are
+	in the graph.
+
+	Returns labels, real: labels[i] is the component of node i (-1 if
+	not alive), and real[c] is True if component c is not transient
+	(it has more than one node, or a loop).  With return_members, also
+	members, ptr: component c is members[ptr[c]:ptr[c+1]], in the
+	order scc_raf lists it.
+	"""
+	cdef np.ndarray p = np.ascontiguousarray(indptr,dtype=np.int32)
+	cdef np.ndarray q = np.ascontiguousarray(indices,dtype=np.int32)
+	cdef int n = len(p)-1
+	cdef np.ndarray a
+	cdef char *live = NULL
+	if alive is not None:
+		a = np.ascontiguousarray(alive,dtype=np.uint8)
+		live = <char *>a.data
+	cdef vector[int] label, order, compptr
+	cdef vector[char] real
+	with nogil:
+		c_scc_labels(n,<int *>p.data,<int *>q.data,live,label,order,compptr,real)
+	cdef np.ndarray isreal = np.zeros(real.size(),dtype=bool)
+	if real.size() > 0:
+		memcpy(isreal.data,&real[0],real.size())
+	if return_members:
+		return vector2array(label),isreal,vector2array(order),vector2array(compptr)
+	return vector2array(label),isreal
+
+def mis_nodes(indptr, indices, alive=None, labels=None, real=None):
+	"""
+	The maximal invariant set of the directed graph with the CSR arrays
+	indptr, indices (and the nodes alive, as for scc_labels): the
+	sorted int32 array of the nodes reached from a real component which
+	also reach one, as graph_mis finds them.  The labels and real of
+	scc_labels are computed if not given.  Two searches over the
+	arrays (forward, and backward on the reverse arrays) with masks;
+	nothing is built but the reverse arrays.
+	"""
+	if labels is None or real is None:
+		labels,real = scc_labels(indptr,indices,alive)
+	cdef np.ndarray p = np.ascontiguousarray(indptr,dtype=np.int32)
+	cdef np.ndarray q = np.ascontiguousarray(indices,dtype=np.int32)
+	cdef np.ndarray l = np.ascontiguousarray(labels,dtype=np.int32)
+	cdef np.ndarray r = np.ascontiguousarray(real,dtype=np.uint8)
+	cdef int n = len(p)-1
+	cdef np.ndarray a
+	cdef char *live = NULL
+	if alive is not None:
+		a = np.ascontiguousarray(alive,dtype=np.uint8)
+		live = <char *>a.data
+	cdef vector[char] keep
+	with nogil:
+		invariant_nodes(n,<int *>p.data,<int *>q.data,live,
+						<int *>l.data,<char *>r.data,keep)
+	cdef np.ndarray mask = np.zeros(n,dtype=np.uint8)
+	if n > 0:
+		memcpy(mask.data,&keep[0],n)
+	return np.flatnonzero(mask).astype(np.int32)
+
+def scc_mis_parallel(indptr, indices, alive=None, int threads=0):
+	"""
+	The strongly connected components and the maximal invariant set of
+	the graph of scc_labels, at once, on threads threads (one per
+	processor if threads <= 0), by trimming off the nodes outside the
+	invariant set and coloring the rest (see scc_labels_parallel in
+	graphs.h).
+
+	Returns labels, real, mis: the components and real flags of
+	scc_labels, but with the components numbered in the order of their
+	smallest nodes, and the invariant set of mis_nodes.  The results do
+	not depend on the number of threads.
+	"""
+	cdef np.ndarray p = np.ascontiguousarray(indptr,dtype=np.int32)
+	cdef np.ndarray q = np.ascontiguousarray(indices,dtype=np.int32)
+	cdef int n = len(p)-1
+	cdef np.ndarray a
+	cdef char *live = NULL
+	if alive is not None:
+		a = np.ascontiguousarray(alive,dtype=np.uint8)
+		live = <char *>a.data
+	cdef vector[int] label
+	cdef vector[char] real,keep
+	with nogil:
+		scc_labels_parallel(n,<int *>p.data,<int *>q.data,live,threads,
+							label,real,keep)
+	cdef np.ndarray isreal = np.zeros(real.size(),dtype=bool)
+	if real.size() > 0:
+		memcpy(isreal.data,&real[0],real.size())
+	cdef np.ndarray mask = np.zeros(n,dtype=np.uint8)
+	if n > 0:
+		memcpy(mask.data,&keep[0],n)
+	return vector2array(label),isreal,np.flatnonzero(mask).astype(np.int32)
+
+cdef class InvariantSet:
+	"""InvariantSet(indptr,indices,alive=None)
+
+	The maximal invariant set of the directed graph with the CSR arrays
+	indptr, indices (and the nodes alive, as for scc_labels), as
+	mis_nodes finds it, kept up to date as nodes are taken out of the
+	graph with remove_nodes or restrict_to.  Each of these peels nodes
+	off the set as it is (as invariant_set in cycombenc does for the
+	whole graph), touching only the edges of the nodes that leave it,
+	rather than finding the components over again.
+
+		S = InvariantSet(A.indptr,A.indices)
+		S.restrict_to(region)
+		S.nodes()
+
+	Copies share the arrays, so a set found once on a big graph can be
+	cut down to many regions."""
+	cdef cInvariantSet *thisptr
+	cdef np.ndarray indptr,indices,revptr,rev
+
+	def __cinit__(self,indptr=None,indices=None,alive=None):
+		self.thisptr = NULL
+		if indptr is None:
+			return					# for copy
+		self.indptr = np.ascontiguousarray(indptr,dtype=np.int32)
+		self.indices = np.ascontiguousarray(indices,dtype=np.int32)
+		cdef int n = len(self.indptr)-1
+		cdef vector[int] rp,r
+		reverse_csr(n,<int *>self.indptr.data,<int *>self.indices.data,rp,r)
+		self.revptr = vector2array(rp)
+		self.rev = vector2array(r)
+		cdef np.ndarray a
+		cdef char *live = NULL
+		if alive is not None:
+			a = np.ascontiguousarray(alive,dtype=np.uint8)
+			live = <char *>a.data
+		self.thisptr = new cInvariantSet(n,<int *>self.indptr.data,
+										 <int *>self.indices.data,
+										 <int *>self.revptr.data,
+										 <int *>self.rev.data,live)
+
+	def __dealloc__(self):
+		del self.thisptr
+
+	def __len__(self):
+		return self.thisptr.size()
+
+	def __contains__(self,v):
+		return 0 <= v < len(self.indptr)-1 and self.thisptr.mask()[v] != 0
+
+	def copy(self):
+		cdef InvariantSet S = InvariantSet()
+		S.indptr,S.indices = self.indptr,self.indices
+		S.revptr,S.rev = self.revptr,self.rev
+		S.thisptr = new cInvariantSet(self.thisptr[0])
+		return S
+
+	def nodes(self):
+		"""The nodes in the set, as a sorted int32 array."""
+		cdef vector[char] keep = self.thisptr.mask()
+		cdef int n = keep.size()
+		cdef np.ndarray mask = np.zeros(n,dtype=np.uint8)
+		if n > 0:
+			memcpy(mask.data,&keep[0],n)
+		return np.flatnonzero(mask).astype(np.int32)
+
+	def remove_nodes(self,ids):
+		"""Take the nodes ids out of the graph.  Returns the nodes which
+		left the set (those of ids in it, and the ones peeled off)."""
+		if not isinstance(ids,np.ndarray):
+			ids = list(ids)
+		cdef np.ndarray a = np.ascontiguousarray(ids,dtype=np.int32).ravel()
+		cdef vector[int] lost
+		with nogil:
+			self.thisptr.remove(a.shape[0],<int *>a.data,lost)
+		return vector2array(lost)
+
+	def restrict_to(self,ids):
+		"""Take all nodes but ids out of the graph (see remove_nodes)."""
+		if not isinstance(ids,np.ndarray):
+			ids = list(ids)
+		cdef np.ndarray keep = np.zeros(len(self.indptr)-1,dtype=bool)
+		keep[np.asarray(ids,dtype=np.int64)] = True
+		return self.remove_nodes(np.flatnonzero(~keep))
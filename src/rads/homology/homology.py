@@ -177,6 +177,17 @@ class ComputeIndex( object ):
         r = boxes.width
         corners = boxes.corners
 
+        # the tree knows the exact integer coordinates of its boxes;
+        # shift them to where the division below would put them
+        try:
+            grid = self.tree.grid_coords()
+        except ValueError:
+            grid = None
+        if grid is not None:
+            offset = np.ceil( self.tree.bbox[0] / r )
+            self.scaled_boxes = np.asarray( grid + offset, dtype=np.int )
+            return
+
         self.scaled_boxes= np.empty_like( corners )
         for i in range( self.tree.dim ):
             # assume uniform box size in each dimension
@@ -334,6 +345,8 @@ def grow_isolating_neighborhood( region, adjacency, transition ):
     assert len( region ) > 0, "Number of boxes must be greater than 0."
     N = region
     while 1:
+        # N gains boxes at each step, so the set of the last N cannot
+        # just be cut down to it: it is found on the subgraph on N
         mis = max_invariant_set( N, transition ) 
         oN = get_onebox( mis, adjacency )
 
@@ -369,11 +382,17 @@ def max_invariant_set( I, transition ):
     """Restrict a region I to the maximal invariant set within that
     region. 
 
+    The set is peeled off the subgraph on I as an InvariantSet (see
+    cygraphs), rather than found from its components by graph_mis.
+
     Return indices of nodes in the maximal invariant set.
 
     """
     R = transition.subgraph( I )
-    S = algorithms.graph_mis( R )
+    indptr, indices, alive, nodes = algorithms.csr_arrays( R )
+    S = algorithms.InvariantSet( indptr, indices, alive ).nodes().tolist()
+    if nodes is not None:
+        S = [ nodes[k] for k in S ]
     return set( S )
 
 
@@ -1 +1,4 @@
 from henon import HenonMapper
+from iterated import IteratedMapper
+from intervals import IntervalArray
+from pymapper import PyMapper
@@ -15,3 +15,32 @@ IPoint HenonMapper::map_point(const IPoint &v) const
   w[1] = params[B] * v[0];
   return w;
 }
+
+bool HenonMapper::jacobian(const IPoint &v, vector<IPoint> &J) const
+{
+  J[0][0] = -2 * params[A] * v[0];
+  J[0][1] = 1.0;
+  J[1][0] = params[B];
+  J[1][1] = 0.0;
+  return true;
+}
+
+void HenonMapper::map_boxes(int n, const double *lo, const double *hi,
+							double *imlo, double *imhi) const
+{
+  double alo = _double(Inf(params[A])), ahi = _double(Sup(params[A]));
+  double blo = _double(Inf(params[B])), bhi = _double(Sup(params[B]));
+  const double *xlo = lo, *xhi = hi, *ylo = lo+n, *yhi = hi+n;
+  // one loop per coordinate, which keeps the alias checks the
+  // compiler needs to vectorize them few
+  for (int i=0; i<n; i++)
+  {
+	double slo, shi, tlo, thi, ulo, uhi;
+	sqr_bounds(xlo[i],xhi[i],slo,shi);
+	mul_bounds(alo,ahi,slo,shi,tlo,thi);
+	sub_bounds(1.0,1.0,tlo,thi,ulo,uhi);
+	add_bounds(ulo,uhi,ylo[i],yhi[i],imlo[i],imhi[i]);
+  }
+  for (int i=0; i<n; i++)
+	mul_bounds(blo,bhi,xlo[i],xhi[i],imlo[n+i],imhi[n+i]);
+}
@@ -6,4 +6,7 @@ class HenonMapper : public Mapper
 public:
   HenonMapper();
   IPoint map_point(const IPoint &v) const;
+  bool jacobian(const IPoint &v, vector<IPoint> &J) const;
+  void map_boxes(int n, const double *lo, const double *hi,
+				 double *imlo, double *imhi) const;
 };
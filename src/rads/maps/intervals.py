@@ -0,0 +1,179 @@
+"""Arrays of intervals for maps written in Python (see PyMapper).
+
+An IntervalArray holds a lower and an upper bound array of the same
+shape.  Arithmetic works elementwise on whole arrays, like NumPy's,
+and every result is rounded outward with np.nextafter, so that it
+encloses the exact result (just as with the C-XSC intervals of the
+compiled maps, only an ulp or two wider).  Plain numbers and arrays
+mix in as point intervals.
+
+    >>> x = IntervalArray([0.0,1.0],[0.5,2.0])
+    >>> y = 1 - 1.4*x**2
+"""
+import numpy as np
+
+# steps to move the results of functions NumPy computes to within one
+# ulp (exp, log, power) outward; the arithmetic operations and sqrt
+# are correctly rounded, and need one
+_ULPS = 2
+
+def _down(a, steps=1):
+    for i in range(steps):
+        a = np.nextafter(a, -np.inf)
+    return a
+
+def _up(a, steps=1):
+    for i in range(steps):
+        a = np.nextafter(a, np.inf)
+    return a
+
+class IntervalArray( object ):
+    """
+    IntervalArray(lo,hi=None)
+
+    Intervals [lo[i],hi[i]], elementwise.  With hi left out, the
+    intervals are the points lo.
+    """
+    # make NumPy arrays on the left of an operator defer to us
+    __array_priority__ = 1000
+
+    def __init__( self, lo, hi=None ):
+        self.lo = np.asarray( lo, dtype=np.double )
+        if hi is None:
+            self.hi = self.lo
+        else:
+            self.hi = np.asarray( hi, dtype=np.double )
+
+    def __repr__( self ):
+        return "IntervalArray(\n%s,\n%s)" % ( repr(self.lo), repr(self.hi) )
+
+    def __len__( self ):
+        return len( self.lo )
+
+    def __getitem__( self, i ):
+        return IntervalArray( self.lo[i], self.hi[i] )
+
+    @property
+    def shape( self ):
+        return self.lo.shape
+
+    def width( self ):
+        """Upper bounds on the widths hi-lo."""
+        return _up( self.hi - self.lo )
+
+    def mid( self ):
+        return ( self.lo + self.hi ) / 2
+
+    def contains( self, x ):
+        """True where the interval holds x."""
+        return ( self.lo <= x ) & ( x <= self.hi )
+
+    def hull( self, other ):
+        """The smallest intervals holding both self and other."""
+        other = as_intervals( other )
+        return IntervalArray( np.minimum( self.lo, other.lo ),
+                              np.maximum( self.hi, other.hi ) )
+
+    def __or__( self, other ):
+        return self.hull( other )
+
+    def __ror__( self, other ):
+        return self.hull( other )
+
+    def __neg__( self ):
+        return IntervalArray( -self.hi, -self.lo )
+
+    def __pos__( self ):
+        return self
+
+    def __add__( self, other ):
+        other = as_intervals( other )
+        return IntervalArray( _down( self.lo + other.lo ),
+                              _up( self.hi + other.hi ) )
+
+    __radd__ = __add__
+
+    def __sub__( self, other ):
+        other = as_intervals( other )
+        return IntervalArray( _down( self.lo - other.hi ),
+                              _up( self.hi - other.lo ) )
+
+    def __rsub__( self, other ):
+        return as_intervals( other ) - self
+
+    def __mul__( self, other ):
+        other = as_intervals( other )
+        p = [ self.lo * other.lo, self.lo * other.hi,
+              self.hi * other.lo, self.hi * other.hi ]
+        lo = np.minimum( np.minimum( p[0], p[1] ), np.minimum( p[2], p[3] ) )
+        hi = np.maximum( np.maximum( p[0], p[1] ), np.maximum( p[2], p[3] ) )
+        return IntervalArray( _down( lo ), _up( hi ) )
+
+    __rmul__ = __mul__
+
+    def __div__( self, other ):
+        other = as_intervals( other )
+        # no bounds at all where the divisor holds 0
+        zero = other.contains( 0 )
+        with np.errstate( divide='ignore', invalid='ignore' ):
+            inv = IntervalArray( np.where( zero, -np.inf, _down( 1 / other.hi ) ),
+                                 np.where( zero, np.inf, _up( 1 / other.lo ) ) )
+        q = self * inv
+        return IntervalArray( np.where( zero, -np.inf, q.lo ),
+                              np.where( zero, np.inf, q.hi ) )
+
+    def __rdiv__( self, other ):
+        return as_intervals( other ) / self
+
+    __truediv__ = __div__
+    __rtruediv__ = __rdiv__
+
+    def __pow__( self, n ):
+        """Integer powers only."""
+        if n != int( n ):
+            raise ValueError( "IntervalArray: only integer powers are supported" )
+        n = int( n )
+        if n < 0:
+            return 1 / self**(-n)
+        if n == 0:
+            return IntervalArray( np.ones_like( self.lo ) )
+        steps = 1 if n <= 2 else _ULPS
+        a = np.power( self.lo, n )
+        b = np.power( self.hi, n )
+        if n % 2:
+            return IntervalArray( _down( a, steps ), _up( b, steps ) )
+        # even powers: smallest at the point nearest 0
+        lo = np.where( self.contains( 0 ), 0.0, _down( np.minimum( a, b ), steps ) )
+        return IntervalArray( lo, _up( np.maximum( a, b ), steps ) )
+
+    def __abs__( self ):
+        a = np.abs( self.lo )
+        b = np.abs( self.hi )
+        lo = np.where( self.contains( 0 ), 0.0, np.minimum( a, b ) )
+        return IntervalArray( lo, np.maximum( a, b ) )
+
+def as_intervals( x ):
+    """x as an IntervalArray: intervals stay, numbers and arrays become
+    point intervals."""
+    if isinstance( x, IntervalArray ):
+        return x
+    return IntervalArray( x )
+
+def exp( x ):
+    x = as_intervals( x )
+    return IntervalArray( np.maximum( _down( np.exp( x.lo ), _ULPS ), 0.0 ),
+                          _up( np.exp( x.hi ), _ULPS ) )
+
+def log( x ):
+    """The log of x, for x > 0."""
+    x = as_intervals( x )
+    with np.errstate( divide='ignore', invalid='ignore' ):
+        return IntervalArray( _down( np.log( x.lo ), _ULPS ),
+                              _up( np.log( x.hi ), _ULPS ) )
+
+def sqrt( x ):
+    """The square root of x, for x >= 0."""
+    x = as_intervals( x )
+    with np.errstate( invalid='ignore' ):
+        return IntervalArray( np.maximum( _down( np.sqrt( x.lo ) ), 0.0 ),
+                              _up( np.sqrt( x.hi ) ) )
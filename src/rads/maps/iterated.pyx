@@ -0,0 +1,44 @@
+from rads.enclosure.cppdefs cimport *
+from rads.enclosure.cymapper cimport Mapper
+
+cdef extern from "iterated_cpp.h":
+	cdef cppclass cIterated "IteratedMapper":
+		cIPoint map_point (cIPoint &v)
+	cIterated *new_Iterated "new IteratedMapper" (cMapper &, int, int)
+	void del_Iterated "delete" (cIterated *)
+
+cdef class IteratedMapper(Mapper):
+	"""IteratedMapper(mapper,n,splits=0)
+
+	The n-th iterate of mapper, evaluated on boxes directly, so that a
+	CombEnc gives the n-step mvm in one pass.  For small n this is
+	sparser than the n-th power of mvm, whose paths go through whole
+	boxes at every step; for larger n the box around the image of f^n
+	grows, and may not be.  With splits > 0 each box is cut into
+	2^splits pieces along every axis (2^(splits*dim) in all), each
+	mapped n times on its own, which keeps the intermediate images from
+	growing by wrapping.  Both this mvm and the power of mvm enclose
+	f^n, so their elementwise product (A.multiply(B) of the CSR
+	matrices) does too, and is sparser than either.
+
+	If mapper, or this mapper, is centered, the image of every piece is
+	tightened by the centered form of mapper at each of the n steps.
+
+	The parameters are those of mapper, which get_params and set_params
+	pass on."""
+	cdef Mapper base
+
+	def __cinit__(self,Mapper mapper,int n,int splits=0):
+		if n < 1 or splits < 0:
+			raise ValueError("IteratedMapper: need n >= 1 and splits >= 0")
+		self.base = mapper
+		self.mapper = <cMapper *>new_Iterated(mapper.mapper[0],n,splits)
+
+	def __dealloc__(self):
+		del_Iterated(<cIterated *>self.mapper)
+
+	def set_params(self,object dict):
+		self.base.set_params(dict)
+
+	def get_params(self):
+		return self.base.get_params()
@@ -0,0 +1,68 @@
+#include "iterated_cpp.h"
+
+// no parameters of its own: those of f are used
+IteratedMapper::IteratedMapper(const Mapper &m, int n, int s)
+  : Mapper(m.dim(),0,m.name()+"_iterated"), f(m), iterates(n), splits(s)
+{
+}
+
+IPoint IteratedMapper::map_point(const IPoint &v) const
+{
+  int d = dim();
+  vector<double> lo(d), hi(d), imlo(d), imhi(d);
+  for (int k=0; k<d; k++)
+  {
+	lo[k] = _double(Inf(v[k]));
+	hi[k] = _double(Sup(v[k]));
+  }
+  map_boxes(1,&lo[0],&hi[0],&imlo[0],&imhi[0]);
+  IPoint w(d);
+  for (int k=0; k<d; k++)
+	w[k] = interval(imlo[k],imhi[k]);
+  return w;
+}
+
+void IteratedMapper::map_boxes(int n, const double *lo, const double *hi,
+							   double *imlo, double *imhi) const
+{
+  int d = dim();
+  int m = 1 << splits;			// pieces per axis
+  int P = 1 << (splits*d);		// pieces per box
+  int N = n*P;
+
+  // cut every box into P pieces, piece p of box i being number i*P+p;
+  // the cuts are computed the same way from both sides, so the pieces
+  // cover the box
+  vector<double> plo(N*d), phi(N*d), qlo(N*d), qhi(N*d);
+  for (int k=0; k<d; k++)
+	for (int i=0; i<n; i++)
+	{
+	  double a = lo[k*n+i], b = hi[k*n+i];
+	  for (int p=0; p<P; p++)
+	  {
+		int q = (p >> (k*splits)) & (m-1);
+		plo[k*N+i*P+p] = a + (b-a)*q/m;
+		phi[k*N+i*P+p] = (q+1 == m) ? b : a + (b-a)*(q+1)/m;
+	  }
+	}
+
+  // map the pieces on their own all the way, in centered form at
+  // every step if f or this mapper is centered
+  bool c = f.is_centered() || is_centered();
+  for (int t=0; t<iterates; t++)
+  {
+	f.map_boxes(N,&plo[0],&phi[0],&qlo[0],&qhi[0]);
+	if (c)
+	  f.center_boxes(N,&plo[0],&phi[0],&qlo[0],&qhi[0]);
+	plo.swap(qlo);
+	phi.swap(qhi);
+  }
+
+  for (int k=0; k<d; k++)
+	for (int i=0; i<n; i++)
+	{
+	  const double *l = &plo[k*N+i*P], *h = &phi[k*N+i*P];
+	  imlo[k*n+i] = *min_element(l,l+P);
+	  imhi[k*n+i] = *max_element(h,h+P);
+	}
+}
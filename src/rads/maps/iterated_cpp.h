@@ -0,0 +1,22 @@
+#include "mapper.h"
+
+// f^n, for a Mapper f: each box is mapped n times, as a box.  The
+// image of a box after each step wraps it in a box again, which can
+// make the final image much wider than that of f^n; with splits > 0,
+// each box is cut into 2^splits pieces along every axis, and each
+// piece mapped on its own all the way, so that the intermediate
+// images are covered by the boxes of the pieces rather than by one
+// box.  The hull of the images of the pieces is the image.  If f (or
+// this mapper) is centered, every step is tightened by the centered
+// form of f; this mapper has no jacobian of its own.
+class IteratedMapper : public Mapper
+{
+  const Mapper &f;
+  int iterates;
+  int splits;
+public:
+  IteratedMapper(const Mapper &m, int n, int s=0);
+  IPoint map_point(const IPoint &v) const;
+  void map_boxes(int n, const double *lo, const double *hi,
+				 double *imlo, double *imhi) const;
+};
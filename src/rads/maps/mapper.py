@@ -41,7 +41,7 @@ class Mapper( object ):
         self.depth = depth
 
         # our tree (with root box), mapper, enclosure
-        self.tree = Tree( box, full=True )
+        self.tree = Tree( self.box, full=True, binary=True )
         
         # set the parameter
         p = self.mapper.get_params()
@@ -50,5 +50,8 @@ class Mapper( object ):
         self.mapper.set_params( p )
 
     def subdivide( self ):
-        """Subdivide to specified depth """
-        pass
+        """Subdivide to specified depth, keeping only the maximal
+        invariant set at each level (see CombEnc.refine). Returns the
+        box counts and timings of each level."""
+        self.ce = CombEnc( self.tree, self.mapper )
+        return self.ce.refine( self.depth )
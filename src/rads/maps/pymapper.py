@@ -0,0 +1,63 @@
+"""Maps written in Python, evaluated on whole arrays of boxes.
+
+A PyMapper can be used by CombEnc in place of a compiled Mapper, so a
+new system can be tried without writing and building C++:
+
+    from rads.maps.pymapper import PyMapper
+
+    class Henon( PyMapper ):
+        def __init__( self ):
+            PyMapper.__init__( self, 2, a=1.4, b=0.3 )
+
+        def map( self, x, p ):
+            return [ 1 - p['a']*x[0]**2 + x[1], p['b']*x[0] ]
+
+    ce = CombEnc( tree, Henon() )
+"""
+import numpy as np
+from rads.maps.intervals import IntervalArray
+
+class PyMapper( object ):
+    """
+    PyMapper(dim,**params)
+
+    Base class for maps of dimension dim, with named (interval)
+    parameters given by their initial values.  Subclasses define either
+    map(x,p), on one IntervalArray per coordinate, or map_boxes(lo,hi)
+    on the bound arrays directly.
+    """
+    def __init__( self, dim, **params ):
+        self.dim = dim
+        self.params = {}
+        self.set_params( params )
+
+    def get_dim( self ):
+        return self.dim
+
+    def get_params( self ):
+        """The parameters, as a dict of [lo,hi] arrays (as for Mapper)."""
+        return dict( (k, v.copy()) for k, v in self.params.items() )
+
+    def set_params( self, d ):
+        """Set some of the parameters, each a number or [lo,hi]."""
+        for k in d:
+            v = np.asarray( d[k], dtype=np.double )
+            self.params[k] = np.array( [v.min(), v.max()] ) if v.ndim else np.array( [v, v] )
+
+    def map( self, x, p ):
+        """Return the images of the boxes x, a list of one IntervalArray
+        per coordinate, as a list of one IntervalArray per coordinate.
+        p maps the parameter names to IntervalArrays."""
+        raise NotImplementedError( "PyMapper: define map or map_boxes" )
+
+    def map_boxes( self, lo, hi ):
+        """Map N boxes at once: lo and hi are (N,d) arrays of lower and
+        upper bounds.  Returns the (N,d) bounds (imlo,imhi) of the
+        images."""
+        x = [ IntervalArray( lo[:,k], hi[:,k] ) for k in range( lo.shape[1] ) ]
+        p = dict( (k, IntervalArray( v[0], v[1] )) for k, v in self.params.items() )
+        y = self.map( x, p )
+        n = lo.shape[0]
+        imlo = np.column_stack( [ np.broadcast_to( z.lo, (n,) ) for z in y ] )
+        imhi = np.column_stack( [ np.broadcast_to( z.hi, (n,) ) for z in y ] )
+        return imlo, imhi
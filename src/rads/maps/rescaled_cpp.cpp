@@ -18,10 +18,39 @@ IPoint RescaledMapper::map_point(const IPoint &v) const
     IPoint w( dim() );
     //double midpoint = a/2 + b; 
 
-    if ( v[0] < params[a]/2 + b )
-      w[0] = 2 * (v[0] - params[b]) + params[b];
-    else 
-      w[0] = 2 * (params[a] - (v[0] - params[b])) + params[b];
+    // compare the bounds with the midpoint: a comparison of intervals
+    // is a set relation.  A box around it gets the hull of both branches.
+    interval m = params[a]/2 + params[b];
+    interval left = 2 * (v[0] - params[b]) + params[b];
+    interval right = 2 * (params[a] - (v[0] - params[b])) + params[b];
+    if ( Sup( v[0] ) <= Inf( m ) )
+      w[0] = left;
+    else if ( Inf( v[0] ) >= Sup( m ) )
+      w[0] = right;
+    else
+      w[0] = left | right;
     
     return w;
 }
+
+void RescaledMapper::map_boxes(int n, const double *lo, const double *hi,
+			       double *imlo, double *imhi) const
+{
+    double alo = _double( Inf( params[a] ) ), ahi = _double( Sup( params[a] ) );
+    double blo = _double( Inf( params[b] ) ), bhi = _double( Sup( params[b] ) );
+    double mlo, mhi;
+    add_bounds( alo/2, ahi/2, blo, bhi, mlo, mhi );
+
+    for ( int i = 0; i < n; i++ )
+      {
+	double tlo, thi, llo, lhi, rlo, rhi, hlo, hhi;
+	// t = v - b; left 2t + b, right 2(a - t) + b
+	sub_bounds( lo[i], hi[i], blo, bhi, tlo, thi );
+	add_bounds( 2*tlo, 2*thi, blo, bhi, llo, lhi );
+	sub_bounds( alo, ahi, tlo, thi, rlo, rhi );
+	add_bounds( 2*rlo, 2*rhi, blo, bhi, rlo, rhi );
+	hull_bounds( llo, lhi, rlo, rhi, hlo, hhi );
+	imlo[i] = hi[i] <= mlo ? llo : (lo[i] >= mhi ? rlo : hlo);
+	imhi[i] = hi[i] <= mlo ? lhi : (lo[i] >= mhi ? rhi : hhi);
+      }
+}
@@ -6,4 +6,6 @@ class RescaledMapper : public Mapper
 public:
   RescaledMapper();
   IPoint map_point(const IPoint &v) const;
+  void map_boxes(int n, const double *lo, const double *hi,
+				 double *imlo, double *imhi) const;
 };
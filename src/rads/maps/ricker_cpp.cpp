@@ -61,3 +61,41 @@ IPoint RickerMapper::map_point(const IPoint &v) const
 
   return w;
 }
+
+bool RickerMapper::jacobian(const IPoint &v, vector<IPoint> &J) const
+{
+    // only for the growth phase, where each patch is on its own
+    if ( dim() > 1 && params[ d ] != 0 )
+      return false;
+
+    for ( int i = 0; i < dim(); i ++ )
+      {
+	for ( int j = 0; j < dim(); j ++ )
+	  J[ i ][ j ] = 0.0;
+	// d/dv r v exp(-v) = r exp(-v) (1 - v)
+	J[ i ][ i ] = params[ r ] * exp( -v[ i ] ) * ( 1 - v[ i ] );
+      }
+    return true;
+}
+
+void RickerMapper::map_boxes(int n, const double *lo, const double *hi,
+			     double *imlo, double *imhi) const
+{
+    // the dispersal phase is only done one box at a time
+    if ( dim() > 1 && params[ d ] != 0 )
+      {
+	Mapper::map_boxes( n, lo, hi, imlo, imhi );
+	return;
+      }
+
+    double rlo = _double( Inf( params[ r ] ) ), rhi = _double( Sup( params[ r ] ) );
+
+    // growth phase, r * v * exp(-v) in every coordinate
+    for ( int i = 0; i < n * dim(); i ++ )
+      {
+	double elo, ehi, plo, phi;
+	exp_bounds( -hi[ i ], -lo[ i ], elo, ehi );
+	mul_bounds( lo[ i ], hi[ i ], elo, ehi, plo, phi );
+	mul_bounds( rlo, rhi, plo, phi, imlo[ i ], imhi[ i ] );
+      }
+}
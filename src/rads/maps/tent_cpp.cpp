@@ -13,10 +13,31 @@ IPoint TentMapper::map_point(const IPoint &v) const
     IPoint w( dim() );
     //double midpoint = 0.5; 
 
-    if ( v[0] < 0.5 )
+    // compare the bounds: a comparison of intervals is a set relation.
+    // A box around the midpoint gets the hull of both branches.
+    if ( Sup( v[0] ) <= 0.5 )
       w[0] = params[r] * v[0];
-    else 
+    else if ( Inf( v[0] ) >= 0.5 )
       w[0] = params[r] * (1 - v[0]);
+    else
+      w[0] = (params[r] * v[0]) | (params[r] * (1 - v[0]));
     
     return w;
 }
+
+void TentMapper::map_boxes(int n, const double *lo, const double *hi,
+			   double *imlo, double *imhi) const
+{
+    double rlo = _double( Inf( params[r] ) ), rhi = _double( Sup( params[r] ) );
+
+    for ( int i = 0; i < n; i++ )
+      {
+	double llo, lhi, ulo, uhi, glo, ghi;
+	mul_bounds( rlo, rhi, lo[i], hi[i], llo, lhi );
+	sub_bounds( 1.0, 1.0, lo[i], hi[i], ulo, uhi );
+	mul_bounds( rlo, rhi, ulo, uhi, glo, ghi );
+	hull_bounds( llo, lhi, glo, ghi, ulo, uhi );
+	imlo[i] = hi[i] <= 0.5 ? llo : (lo[i] >= 0.5 ? glo : ulo);
+	imhi[i] = hi[i] <= 0.5 ? lhi : (lo[i] >= 0.5 ? ghi : uhi);
+      }
+}
@@ -14,8 +14,9 @@ def show_uboxes(uboxes,S=None,col='b',ecol='k', fig=None):
 		S = range(uboxes.size)
 
 	patches = []
+	widths = uboxes.widths		# boxes of a locally refined tree differ
 	for i in S:
-		art = mpatches.Rectangle(uboxes.corners[i],uboxes.width[0],uboxes.width[1])
+		art = mpatches.Rectangle(uboxes.corners[i],widths[i][0],widths[i][1])
 		patches.append(art)
 
 	if not fig:
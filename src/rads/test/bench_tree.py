@@ -4,7 +4,8 @@ import sys
 import numpy as np
 import numpy.random
 import matplotlib.pylab as plt
-from rads import UBoxSet,Tree,gfx
+from rads.enclosure import UBoxSet,Tree
+from rads.misc import gfx
 import timeit
 
 def time_stuff(test_str,import_str,num_trials):
@@ -67,6 +68,12 @@ def bench(test,data):
 		print '%12s: %6.8f' % (f,1000*np.mean(r))
 		test['results'][f] = r
 		results[f][test['dim']][test['depth']] = np.mean(r)
+	# the same queries, answered in one call (time per query)
+	for f,b in [('search','search_points'),('search_box','search_boxes')]:
+		t = time_stuff('tree.%s(data[\'%s\'])' % (b,f),
+					   'from __main__ import tree, data',
+					   trials[f]) / len(data[f])
+		print '%12s: %6.8f' % (b,1000*t)
 
 def save_data(test,data):
 	for d in data:
@@ -77,6 +84,34 @@ def save_data(test,data):
 		np.savetxt('bench_%s_dim_%i_depth_%i.txt' % (d,test['dim'],test['depth']),
 				   data[d])
 
+def pointer_tree_bytes(dim,depth):
+	"""Estimated footprint of a full tree in the old pointer-based
+	layout: one heap Node per node, a heap Node*[2^dim] per internal
+	node, and a heap-allocated Point (std::vector<double>) plus a
+	Node* per leaf.  Every heap block pays ~16 bytes of malloc
+	overhead."""
+	malloc = 16
+	leaves = 2**(dim*depth)
+	nodes = sum([2**(dim*k) for k in range(depth+1)])
+	node = 24 + malloc
+	kids = 8*2**dim + malloc
+	point = 24 + 8*dim + malloc + 8
+	return nodes*node + (nodes-leaves)*kids + leaves*point
+
+def bench_memory(max_leaves=2**22):
+	"""Memory per leaf of full trees, array-backed vs. pointer-based."""
+	print '%4s %6s %10s %12s %12s' % ('dim','depth','leaves','bytes/leaf','old (est.)')
+	for dim in bounds:
+		for depth in range(1,bounds[dim][1]+1):
+			if 2**(dim*depth) > max_leaves:
+				break
+			bbox = np.tile([[0.0],[1]],dim)
+			tree = Tree(bbox,depth=depth,full=True)
+			print '%4i %6i %10i %12.1f %12.1f' % (
+				dim,depth,tree.size,float(tree.memory)/tree.size,
+				float(pointer_tree_bytes(dim,depth))/tree.size)
+			del tree
+
 import pickle
 import time
 import scipy.io
@@ -84,7 +119,9 @@ import scipy.io
 data = None
 tree = None
 print __name__
-if __name__ == "__main__":
+if __name__ == "__main__" and 'memory' in sys.argv:
+	bench_memory()
+elif __name__ == "__main__":
 	tests = []
 	for dim in bounds:
 		tests += [{'dim':dim, 'depth':d}
@@ -0,0 +1,32 @@
+#!/usr/bin/python
+
+# Tree.boxes().corners is a read-only view of the boxes' storage, not
+# a copy, and stays valid as long as it is referenced
+
+import numpy as np
+from rads.enclosure import Tree
+
+box = np.array([[-2.0,-2],[4,4]])
+t = Tree(box,full=True)
+t.subdivide(5)
+b = t.boxes()
+c = b.corners
+print 'a view:', not c.flags.owndata and np.may_share_memory(c,b.corners)
+try:
+	c[0,0] = 1
+	print 'read-only: False'
+except ValueError:
+	print 'read-only: True'
+
+cells = np.round((c - t.bbox[0])/b.width)
+expect = t.bbox[0] + cells*b.width
+print 'corners right:', (c == expect).all() and \
+	len(set(map(tuple,cells))) == t.size == 32*32
+
+# the view keeps its box set alive, and does not follow later changes
+t.subdivide()
+del b
+t.remove(range(t.size/2))
+del t
+junk = [np.ones(len(c)*2) for i in range(10)]
+print 'valid after the tree is gone:', (c == expect).all()
@@ -0,0 +1,31 @@
+#!/usr/bin/python
+
+# the CSR matrices of CombEnc against the graphs built from them, and
+# after boxes are removed and the enclosure updated
+
+import numpy as np
+from rads.enclosure import CombEnc,Tree
+from rads.maps import HenonMapper
+from rads.graphs.algorithms import graph_mis
+
+box = np.array([[-2.0,-2],[4,4]])
+m = HenonMapper()
+tree = Tree(box,full=True)
+tree.subdivide(6)
+ce = CombEnc(tree,m)
+
+def check(name):
+	ce.update()
+	A = ce.mvm_csr
+	rows,cols = A.nonzero()
+	print name + ':', tree.size, 'boxes,', \
+		'shape', A.shape == ce.adj_csr.shape == (tree.size,tree.size), \
+		'mvm edges', ce.mvm.number_of_edges() == A.nnz and \
+		set(ce.mvm.edges()) == set(zip(rows.tolist(),cols.tolist())), \
+		'adj symmetric', (ce.adj_csr != ce.adj_csr.T).nnz == 0, \
+		'adj edges', ce.adj.number_of_edges()*2 - tree.size == ce.adj_csr.nnz
+
+check('full')
+I = graph_mis(ce.mvm)
+tree.remove(list(set(range(tree.size))-set(I)))
+check('invariant set')
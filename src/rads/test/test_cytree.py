@@ -24,3 +24,7 @@ ubs = t.boxes()
 print ubs
 
 gfx.show_uboxes(ubs, col='c', ecol='b')
+
+# an empty UBoxSet (never filled from a tree) has no boxes
+e = UBoxSet()
+print 'empty UBoxSet:', e.size, e.corners, e.levels, e.widths
@@ -1,6 +1,9 @@
 import networkx as nx
-from rads.graphs import DiGraph
-from rads.graphs.algorithms import graph_mis
+import numpy as np
+from scipy import sparse
+from rads.graphs import DiGraph, CSRDiGraph
+from rads.graphs.algorithms import graph_mis, scc_raf
+from rads.graphs.cygraphs import scc_labels, InvariantSet
 
 if __name__ == "__main__":
 	E = [(0, 8), (0, 5), (1, 19), (1, 10), (1, 3), (1, 5), (2, 11), (2, 4), (2, 7), (4, 19), (6, 19), (6, 3), (6, 5), (7, 19), (7, 3), (8, 0), (9, 16), (9, 14), (9, 6), (10, 3), (10, 12), (11, 19), (11, 6), (12, 3), (12, 12), (13, 8), (13, 19), (13, 11), (13, 5), (14, 1), (14, 9), (16, 3), (17, 1), (18, 16), (18, 13), (19, 9)]
@@ -18,3 +21,86 @@ if __name__ == "__main__":
 	print 'graph_mis(G) =  ', my_answer
 	print 'correct answer =', [0,1,2,5,6]
 
+	# the same on the array-backed graph
+	u,v = zip(*E)
+	A = sparse.csr_matrix((np.ones(len(E)),(u,v)),shape=(9,9))
+	C = CSRDiGraph(A)
+	print 'CSRDiGraph:     ', sorted(graph_mis(C))
+	C.remove_nodes_from([6])
+	print 'without 6:      ', sorted(graph_mis(C)), 'correct answer =', [0,1,2]
+	print 'successors(2) = ', C.successors(2), 'predecessors(0) =', C.predecessors(0)
+
+	# the components, as labels on the arrays
+	labels,real = scc_labels(A.indptr,A.indices)
+	print 'scc_raf(G) =    ', scc_raf(G)
+	print 'labels =        ', labels.tolist(), 'real =', np.flatnonzero(real).tolist()
+
+	# the invariant set, cut down as nodes go
+	S = InvariantSet(A.indptr,A.indices)
+	print 'InvariantSet:   ', S.nodes().tolist()
+	lost = S.remove_nodes([6])
+	print 'remove 6:       ', S.nodes().tolist(), 'correct answer =', [0,1,2], 'lost', sorted(lost.tolist())
+
+	# the same components and set on threads
+	print 'scc_raf(G,2) =  ', scc_raf(G,threads=2)
+	print 'graph_mis(G,2) =', sorted(graph_mis(G,threads=2)), 'correct answer =', [0,1,2,5,6]
+
+	# nodes that are not 0..n-1 come back as themselves, in a list
+	T = DiGraph()
+	T.add_edges_from([((0,0),(0,1)), ((0,1),(0,0)), ((0,1),(1,1))])
+	print 'tuple nodes:    ', sorted(graph_mis(T)), 'correct answer =', [(0,0),(0,1)]
+	print 'none:           ', graph_mis(DiGraph())
+
+	# threads against one thread on bigger graphs: random ones (a big
+	# component and many small), and chains of cycles, each cycle
+	# reaching the one before it, which color one cycle per round
+	def same_on_threads(A):
+		G = CSRDiGraph(A)
+		comps,real = scc_raf(G)
+		tcomps,treal = scc_raf(G,threads=4)
+		key = lambda c,r: set((frozenset(c[k]),k in r) for k in range(len(c)))
+		return key(comps,set(real)) == key(tcomps,set(treal)) and \
+			sorted(graph_mis(G)) == sorted(graph_mis(G,threads=4))
+
+	def chain(ncycles,length,big):
+		u,v = [],[]
+		for c in range(ncycles):
+			nodes = range(c*length,(c+1)*length)
+			u += nodes
+			v += nodes[1:] + nodes[:1]
+			if c > 0:
+				u.append(c*length)
+				v.append(c*length-1)
+		n = ncycles*length
+		u += range(n,n+big)
+		v += range(n+1,n+big) + [n]
+		u.append(n)
+		v.append(n-1)
+		n += big
+		return sparse.csr_matrix((np.ones(len(u)),(u,v)),shape=(n,n))
+
+	rng = np.random.RandomState(1)
+	ok = True
+	for n,deg in [(200,1.2),(5000,1.0),(60000,1.1),(60000,2.0)]:
+		m = int(n*deg)
+		A = sparse.csr_matrix((np.ones(m),(rng.randint(0,n,m),rng.randint(0,n,m))),shape=(n,n))
+		A.sum_duplicates()
+		ok = ok and same_on_threads(A)
+	# many short cycles, with edges from each to cycles before it: too
+	# many nodes left after the pivot to go without coloring
+	u,v,first = [],[],[0]
+	while first[-1] < 60000:
+		k = rng.randint(3,10)
+		nodes = range(first[-1],first[-1]+k)
+		u += nodes
+		v += nodes[1:] + nodes[:1]
+		if len(first) > 1:
+			for j in rng.randint(0,len(first)-1,2):
+				u.append(nodes[0])
+				v.append(first[j])
+		first.append(first[-1]+k)
+	n = first[-1]
+	ok = ok and same_on_threads(sparse.csr_matrix((np.ones(len(u)),(u,v)),shape=(n,n)))
+	print 'random graphs on threads:', ok
+	print '2-cycles chained on threads:', same_on_threads(chain(5000,2,1000))
+	print '3-cycles chained on threads:', same_on_threads(chain(20000,3,1000))
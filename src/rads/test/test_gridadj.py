@@ -0,0 +1,45 @@
+#!/usr/bin/python
+
+# the adjacency matrix from grid coordinates (grid_adj) against the
+# one found by searching the tree for every box, on full grids, a
+# binary tree, and grids with most boxes removed (which are looked up
+# in the sorted cells instead of a table of the grid)
+
+import numpy as np
+from rads.enclosure import Tree
+from rads.enclosure.cycombenc import grid_adj,on_grid,csr_from_search
+
+def search_adj(tree):
+	# search is inclusive: each box hits its neighbors and itself
+	b = tree.boxes()
+	boxes = np.empty((b.size,2,b.dim))
+	boxes[:,0] = b.corners
+	boxes[:,1] = b.widths
+	indptr,indices = tree.search_boxes(boxes)
+	return csr_from_search(tree.size,indptr,indices)
+
+def check(name,tree):
+	A = grid_adj(tree)
+	B = search_adj(tree)
+	print name + ':', tree.size, 'boxes, on grid', on_grid(tree), \
+		'same adj', (A != B).nnz == 0
+
+box = np.array([[-2.0,-2],[4,4]])
+t = Tree(box,full=True)
+t.subdivide(5)
+check('full grid',t)
+t.remove(range(0,t.size,3))
+check('a third removed',t)
+t.remove(range(0,t.size-10))
+check('10 left',t)
+
+b = Tree(box,full=True,binary=True)
+b.subdivide(9)
+check('binary',b)
+b.remove(range(1,b.size,2))
+check('binary, half removed',b)
+
+c = Tree(np.array([[0.0,0,0],[1,1,1]]),full=True)
+c.subdivide(3)
+c.remove(range(0,c.size,7))
+check('3d',c)
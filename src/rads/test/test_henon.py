@@ -1,6 +1,7 @@
 #!/usr/bin/python
 
 import numpy as np
+import networkx as nx
 from rads.enclosure import CombEnc,Tree
 from rads.maps.henon import HenonMapper
 from rads.graphs.algorithms import graph_mis
@@ -32,11 +33,12 @@ for d in range(depth):
 	print 'len(I) = ', len(I) # fix the extra stuff returned by graph_mis
 	# now remove all boxes not in I (the maximal invariant set)
 	nodes = set(range(ce.tree.size))
-	ce.tree.remove(list(nodes-set(I)))
-        print ""
+	remap = ce.tree.remove(list(nodes-set(I)))
+	print ""
 
-# remove nodes not in I
+# remove nodes not in I, and relabel the rest to the new box ids
 ce.mvm.remove_nodes_from( list(nodes-set(I)) )
+nx.relabel_nodes( ce.mvm.graph, dict((i,remap[i]) for i in I), copy=False )
 
 # now display the tree!
 boxes = ce.tree.boxes()
@@ -0,0 +1,64 @@
+#!/usr/bin/python
+
+# CombEnc.update after subdividing and removing boxes, incrementally
+# from the last update, against a full update of the same tree
+
+import numpy as np
+from rads.enclosure import CombEnc,Tree
+from rads.maps import HenonMapper
+from rads.graphs.algorithms import graph_mis
+
+box = np.array([[-2.0,-2],[4,4]])
+m = HenonMapper()
+
+tree = Tree(box,full=True)
+tree.subdivide(4)
+ce = CombEnc(tree,m)
+ce.update()
+
+def compare(what):
+	ce.update(incremental=True)
+	full = CombEnc(tree.copy(),m)
+	full.update(incremental=False)
+	A,B = ce.mvm_csr,full.mvm_csr
+	# incremental may only miss images touching a box within rounding
+	print what + ':', tree.size, 'boxes,', \
+		'mvm', A.nnz, 'of', B.nnz, 'edges, none extra', A.multiply(B).nnz == A.nnz, \
+		'same adj', (ce.adj_csr != full.adj_csr).nnz == 0
+
+for d in range(3):
+	tree.subdivide()
+	compare('subdivide')
+	I = graph_mis(ce.mvm)
+	tree.remove(list(set(range(tree.size))-set(I)))
+	compare('remove')
+
+# only some boxes subdivided: the leaves are no longer on a grid
+tree.subdivide(range(0,tree.size,2))
+compare('subdivide half')
+tree.remove(range(0,tree.size,5))
+compare('remove a fifth')
+tree.sort()
+compare('sort')
+
+# the origins the tree keeps are the boxes of the marked tree holding
+# each box now; a box inserted, or another mark, loses them
+t = Tree(box,full=True)
+t.subdivide(3)
+mark = t.mark()
+old = t.copy()
+t.subdivide(range(0,t.size,3))
+t.remove(range(1,t.size,4))
+t.sort()
+t.subdivide()
+b = t.boxes()
+print 'origins hold the boxes:', \
+	(t.origins(mark) == old.search_points(b.corners + b.widths/2)).all()
+t.mark()
+u = Tree(box,depth=3)
+u.insert(np.array([0.1,0.1]))
+umark = u.mark()
+u.insert(np.array([0.1,0.1]))
+kept = u.origins(umark) is not None
+u.insert(np.array([-1.9,-1.9]))
+print 'origins lost:', t.origins(mark) is None and kept and u.origins(umark) is None
@@ -0,0 +1,48 @@
+#!/usr/bin/python
+
+# the mvm of the second iterate of Henon, in one pass (see
+# rads.maps.iterated), against the square of the mvm
+
+import numpy as np
+from rads.enclosure import CombEnc,Tree
+from rads.maps import HenonMapper,IteratedMapper
+
+box = np.array([[-2.0,-2],[4,4]])
+tree = Tree(box,full=True)
+tree.subdivide(7)
+
+m = HenonMapper()
+ce = CombEnc(tree,m)
+ce.update()
+A = ce.mvm_csr.astype(np.int32)
+A2 = A*A
+print 'mvm squared:', A2.nnz, 'edges'
+
+for splits in range(3):
+	ce2 = CombEnc(tree,IteratedMapper(m,2,splits))
+	ce2.update()
+	B = ce2.mvm_csr
+	print 'f^2, splits =', splits, ':', B.nnz, 'edges,', \
+		B.multiply(A2).nnz, 'in both'
+
+# points mapped twice land in the image boxes of f^2
+b = tree.boxes()
+x = b.corners + np.random.rand(*b.corners.shape)*b.widths
+for i in range(2):
+	x = np.column_stack([1 - 1.4*x[:,0]**2 + x[:,1], 0.3*x[:,0]])
+imlo,imhi = IteratedMapper(m,2,1).map_boxes(b.corners,b.corners + b.widths)
+print 'points mapped into their image boxes:', \
+	((imlo <= x) & (x <= imhi)).all()
+
+# centered, on the map or on the iterate, tightens every step: the
+# images are no wider, narrower somewhere, and still hold the points
+w0 = imhi - imlo
+mc = HenonMapper()
+mc.centered = True
+g = IteratedMapper(m,2,1)
+g.centered = True
+for g in [IteratedMapper(mc,2,1), g]:
+	clo,chi = g.map_boxes(b.corners,b.corners + b.widths)
+	print 'centered images no wider:', (chi - clo <= w0).all(), \
+		'narrower somewhere:', (chi - clo < w0).any(), \
+		'points inside:', ((clo <= x) & (x <= chi)).all()
@@ -0,0 +1,29 @@
+#!/usr/bin/python
+
+# Morton keys and integer grid coordinates of the tree boxes, and
+# neighbor lookup by key
+
+import numpy as np
+from rads.enclosure import Tree
+
+box = np.array([[0.0,0],[8,8]])
+t = Tree(box,full=True,sorted=True)
+t.subdivide(3)
+t.subdivide([0,9,33])			# mixed depths
+t.remove([5,6,7])
+
+k = t.keys()
+g = t.grid_coords()
+print 'sorted by key:', (np.diff(k.astype(float)) > 0).all()
+print 'coords match corners:', \
+	(g == np.round(t.boxes().corners/t.boxes().width)).all()
+print 'keys from coords:', (t.coords_to_keys(g) == k).all()
+
+# the boxes starting right where each box ends along the first axis
+# (box widths in grid steps are powers of two)
+steps = np.round(t.boxes().widths/t.boxes().width).astype(np.int64)
+right = t.coords_to_keys(g + steps*[1,0])
+pos = np.searchsorted(k,right)
+pos[pos == len(k)] = 0
+found = k[pos] == right
+print found.sum(), 'of', len(k), 'boxes have a box starting right next to them'
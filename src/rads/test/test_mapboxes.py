@@ -0,0 +1,44 @@
+#!/usr/bin/python
+
+# the mvm of Henon, whose boxes are now mapped all at once, against
+# the exact image hull of each box: the edges are those of the hull,
+# up to boxes the hull only misses within rounding
+
+import numpy as np
+from rads.enclosure import CombEnc,Tree
+from rads.maps import HenonMapper
+
+m = HenonMapper()
+p = m.get_params()
+a = p['a'].mean()
+b = p['b'].mean()
+
+box = np.array([[-2.0,-2],[4,4]])
+tree = Tree(box,full=True)
+tree.subdivide(5)
+ce = CombEnc(tree,m)
+ce.update()
+edges = set(ce.mvm.edges())
+
+B = tree.boxes()
+lo = B.corners
+hi = lo + B.width
+# x^2 over [lo,hi] is [0,max] if the box straddles 0
+x2lo = np.where(lo[:,0]*hi[:,0] <= 0,0,np.minimum(lo[:,0]**2,hi[:,0]**2))
+x2hi = np.maximum(lo[:,0]**2,hi[:,0]**2)
+exlo = np.column_stack([1 - a*x2hi + lo[:,1],b*lo[:,0]])
+exhi = np.column_stack([1 - a*x2lo + hi[:,1],b*hi[:,0]])
+
+def hits(eps):
+	ims = np.empty((len(lo),2,2))
+	ims[:,0] = exlo - eps
+	ims[:,1] = exhi - exlo + 2*eps
+	indptr,indices = tree.search_boxes(ims)
+	src = np.repeat(np.arange(len(lo)),np.diff(indptr))
+	return set(zip(src.tolist(),indices.tolist()))
+
+inner = hits(-1e-9)
+outer = hits(1e-9)
+print 'mvm:', len(edges), 'edges,', \
+	'holds the exact images', inner <= edges, \
+	'and no more', edges <= outer
@@ -0,0 +1,60 @@
+#!/usr/bin/python
+
+# the Henon map written in Python (see rads.maps.pymapper) against the
+# compiled one
+
+import time
+import numpy as np
+from rads.enclosure import CombEnc,Tree
+from rads.maps.henon import HenonMapper
+from rads.maps.pymapper import PyMapper
+
+class PyHenon( PyMapper ):
+	def __init__( self ):
+		PyMapper.__init__( self, 2, a=1.4, b=0.3 )
+
+	def map( self, x, p ):
+		return [ 1 - p['a']*x[0]**2 + x[1], p['b']*x[0] ]
+
+box = np.array([[-2.0,-2],[4,4]])
+tree = Tree(box,full=True)
+tree.subdivide(7)
+
+edges = []
+for m in [HenonMapper(), PyHenon()]:
+	ce = CombEnc(tree,m)
+	t = time.time()
+	ce.update()
+	print m.__class__.__name__, ':', ce.mvm.number_of_edges(), 'edges,', \
+		'%.2f s' % (time.time() - t)
+	edges.append(set(ce.mvm.graph.edges()))
+
+print 'same edges:', edges[0] == edges[1]
+
+# point images lie in the image boxes
+m = PyHenon()
+b = tree.boxes()
+lo = b.corners
+hi = lo + b.widths
+imlo,imhi = m.map_boxes(lo,hi)
+x = lo + np.random.rand(*lo.shape)*b.widths
+y = np.column_stack([1 - 1.4*x[:,0]**2 + x[:,1], 0.3*x[:,0]])
+print 'points mapped into their image boxes:', \
+	((imlo <= y) & (y <= imhi)).all()
+
+# an error in the map reaches the caller of update, and leaves the
+# enclosure as it was
+class Broken( PyHenon ):
+	def map( self, x, p ):
+		raise ArithmeticError( 'broken map' )
+
+ce = CombEnc(tree,PyHenon())
+ce.update()
+before = ce.mvm_csr
+ce.mapper = Broken()
+try:
+	ce.update()
+	print 'update with a broken map raised: False'
+except ArithmeticError:
+	print 'update with a broken map raised: True'
+print 'mvm left as it was:', ce.mvm_csr is before
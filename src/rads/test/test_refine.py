@@ -0,0 +1,27 @@
+#!/usr/bin/python
+
+# CombEnc.refine against the loop of test_henon.py
+
+import numpy as np
+from rads.enclosure import CombEnc,Tree
+from rads.maps.henon import HenonMapper
+from rads.graphs.algorithms import graph_mis
+
+depth = 8
+box = np.array([[-2.0,-2],[4,4]])
+m = HenonMapper()
+
+tree = Tree(box,full=True)
+ce = CombEnc(tree,m)
+for d in range(depth):
+	tree.subdivide()
+	ce.update()
+	I = graph_mis(ce.mvm)
+	tree.remove(list(set(range(tree.size))-set(I)))
+
+tree2 = Tree(box,full=True)
+ce2 = CombEnc(tree2,m)
+levels = ce2.refine(depth,verbose=True)
+
+print 'same boxes:', (tree.boxes().corners == tree2.boxes().corners).all()
+print 'mvm of the boxes left:', ce2.mvm_csr.shape[0] == tree2.size
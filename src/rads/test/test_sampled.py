@@ -0,0 +1,35 @@
+#!/usr/bin/python
+
+# the sampled (non-rigorous) mvm against the rigorous one: every
+# sampled edge is a rigorous edge, and pruning by the sampled mvm
+# then updating rigorously works from the last rigorous update
+
+import numpy as np
+from rads.enclosure import CombEnc,Tree
+from rads.maps import HenonMapper
+from rads.graphs.algorithms import graph_mis
+
+box = np.array([[-2.0,-2],[4,4]])
+m = HenonMapper()
+tree = Tree(box,full=True)
+tree.subdivide(6)
+ce = CombEnc(tree,m)
+ce.update()
+A = ce.mvm_csr
+
+for k in [1,4,16]:
+	ce.update(mode='sampled',samples_per_box=k)
+	S = ce.mvm_csr
+	print 'samples_per_box = %i:' % k, S.nnz, 'of', A.nnz, 'edges,', \
+		'all rigorous', S.multiply(A).nnz == S.nnz, \
+		'rigorous', ce.rigorous, 'adj', ce.adj_csr
+
+I = graph_mis(ce.mvm)
+tree.remove(list(set(range(tree.size))-set(I)))
+tree.subdivide()
+ce.update()
+full = CombEnc(tree.copy(),m)
+full.update(incremental=False)
+print 'rigorous update after pruning:', tree.size, 'boxes,', \
+	'rigorous', ce.rigorous, \
+	'same mvm', (ce.mvm_csr != full.mvm_csr).nnz == 0
@@ -0,0 +1,52 @@
+#!/usr/bin/python
+
+# Tree.search_points and Tree.search_boxes against searching for one
+# point or box at a time, and from several threads at once
+
+import numpy as np
+import threading
+from rads.enclosure import Tree
+
+box = np.array([[-2.0,-2],[4,4]])
+t = Tree(box,full=True)
+t.subdivide(5)
+t.remove(range(0,t.size,7))
+
+rs = np.random.RandomState(2)
+P = rs.uniform(-3,3,(2000,2))		# some outside the tree
+ids = t.search_points(P)
+one = np.array([t.search(p) for p in P])
+print 'search_points:', (ids == one).all(), \
+	(ids >= 0).sum(), 'of', len(P), 'points found'
+
+B = np.empty((500,2,2))
+B[:,0] = rs.uniform(-3,3,(500,2))
+B[:,1] = rs.uniform(0,0.5,(500,2))
+B[:50,1] = 0					# points, as boxes
+indptr,indices = t.search_boxes(B)
+same = len(indptr) == len(B)+1
+for k in range(len(B)):
+	same &= sorted(indices[indptr[k]:indptr[k+1]]) == sorted(t.search_box(B[k]))
+print 'search_boxes:', same, len(indices), 'hits'
+
+try:
+	t.search_points(P[:,:1])
+	print 'wrong shape raised: False'
+except ValueError:
+	print 'wrong shape raised: True'
+
+# the searches release the GIL: threads searching the same tree get
+# what one thread gets
+Q = rs.uniform(-3,3,(200000,2))
+want = t.search_points(Q)
+want_boxes = t.search_boxes(B)
+got = [None]*8
+def run(k):
+	got[k] = t.search_points(Q),t.search_boxes(B)
+threads = [threading.Thread(target=run,args=(k,)) for k in range(8)]
+for th in threads:
+	th.start()
+for th in threads:
+	th.join()
+print 'threaded searches:', all((g[0] == want).all() and
+	(g[1][0] == want_boxes[0]).all() and (g[1][1] == want_boxes[1]).all() for g in got)
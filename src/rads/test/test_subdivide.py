@@ -0,0 +1,46 @@
+#!/usr/bin/python
+
+# local refinement: only subdivide the boxes that meet a circle, and
+# check that point searches agree with the boxes on a mixed-depth tree
+
+import numpy as np
+from rads.enclosure import Tree
+
+box = np.array([[-2.0,-2],[4,4]])
+t = Tree(box,full=True)
+
+for i in range(7):
+	b = t.boxes()
+	c = b.corners + b.widths/2
+	# distance from the box centers to the unit circle, vs. half diagonal
+	d = abs(np.sqrt((c**2).sum(1)) - 1)
+	near = np.nonzero(d <= np.sqrt((b.widths**2).sum(1))/2)[0]
+	children = t.subdivide(near)
+	print 'depth', t.depth, ':', len(near), 'refined,', t.size, 'boxes'
+
+b = t.boxes()
+print 'boxes per level:', np.bincount(b.levels)
+print 'full subdivision would have', 4**t.depth, 'boxes'
+
+pts = np.random.uniform(-2,2,(2000,2))
+ids = t.search_points(pts)
+lo = b.corners[ids]
+hi = lo + b.widths[ids]
+print 'every point lies in the box found:', (ids >= 0).all() and \
+	((lo <= pts) & (pts <= hi)).all()
+
+# binary subdivision: one axis per level, so the box count only doubles
+box = np.array([[0.0,0,0,0],[1,1,1,1]])
+b = Tree(box,full=True,binary=True)
+for i in range(8):
+	b.subdivide()
+	print 'binary depth', b.depth, ':', b.size, 'boxes of width', b.boxes().width
+
+# the depth can be raised, but not lowered
+t = Tree(box,depth=3)
+t.set_depth(5)
+try:
+	t.set_depth(2)
+	print 'lowering the depth raised: False'
+except ValueError:
+	print 'lowering the depth raised: True, depth', t.depth
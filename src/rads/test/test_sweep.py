@@ -0,0 +1,34 @@
+#!/usr/bin/python
+
+# a parameter sweep starting every run from a snapshot of the same
+# refined tree: the snapshots share its storage, and each one only
+# pays for the boxes it keeps
+
+import numpy as np
+from rads.enclosure import CombEnc,Tree
+from rads.maps.henon import HenonMapper
+from rads.graphs.algorithms import graph_mis
+
+box = np.array([[-2.0,-2],[4,4]])
+base = Tree(box,full=True)
+base.subdivide(5)
+print 'base tree:', base.size, 'boxes,', base.memory, 'bytes'
+
+m = HenonMapper()
+runs = []
+for a in np.linspace(1.2,1.4,5):
+	p = m.get_params()
+	p['a'][:] = a
+	p['b'][:] = 0.3
+	m.set_params( p )
+
+	t = base.copy()
+	ce = CombEnc(t,m)
+	ce.update()
+	I = graph_mis(ce.mvm)
+	t.remove(list(set(range(t.size))-set(I)))
+	runs.append(t)
+	print 'a = %.2f:' % a, t.size, 'boxes,', t.unshared_memory, 'bytes of its own'
+
+print 'base tree still has', base.size, 'boxes,', \
+	base.unshared_memory, 'bytes not shared'
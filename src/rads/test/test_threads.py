@@ -0,0 +1,29 @@
+#!/usr/bin/python
+
+# CombEnc.update on several threads against one thread: the graphs
+# are the same, on a full grid and on a tree of mixed depths
+
+import numpy as np
+from rads.enclosure import CombEnc,Tree
+from rads.maps import HenonMapper
+
+box = np.array([[-2.0,-2],[4,4]])
+m = HenonMapper()
+
+grid = Tree(box,full=True)
+grid.subdivide(6)
+mixed = Tree(box,full=True)
+mixed.subdivide(5)
+mixed.subdivide(range(0,mixed.size,3))
+
+def graphs(tree,threads):
+	ce = CombEnc(tree,m)
+	ce.update(threads=threads)
+	return set(ce.mvm.edges()),set(ce.adj.edges())
+
+for name,tree in [('grid',grid),('mixed depths',mixed)]:
+	mvm,adj = graphs(tree,1)
+	for threads in [2,4,0]:
+		mvm2,adj2 = graphs(tree,threads)
+		print name, 'threads = %i:' % threads, \
+			'same mvm', mvm2 == mvm, 'same adj', adj2 == adj
@@ -0,0 +1,44 @@
+#!/usr/bin/python
+
+# the array-backed Tree: the boxes tile the bounding box, every box
+# is found where it is, and boxes removed and inserted again land
+# where they belong
+
+import numpy as np
+from rads.enclosure import Tree
+
+def check(name,t):
+	b = t.boxes()
+	cells = np.round((b.corners - t.bbox[0])/b.width).astype(int)
+	n = int(np.round(t.bbox[1]/b.width).prod())
+	own = [t.search(c + b.width/2) for c in b.corners]
+	print name + ':', t.size, 'boxes,', \
+		'distinct cells', len(set(map(tuple,cells))) == t.size, \
+		'on the grid', np.allclose(t.bbox[0] + cells*b.width,b.corners), \
+		'found in place', own == range(t.size), \
+		'memory', t.memory > 0
+
+box = np.array([[-2.0,-2],[4,4]])
+t = Tree(box,full=True)
+t.subdivide(4)
+check('full',t)
+print '  tiles the box:', t.size == int(np.round(t.bbox[1]/t.boxes().width).prod())
+
+before = set(map(tuple,t.boxes().corners))
+gone = range(0,t.size,3)
+removed = set(map(tuple,t.boxes().corners[gone]))
+t.remove(gone)
+check('removed a third',t)
+print '  the others left:', set(map(tuple,t.boxes().corners)) == before - removed
+
+# a point in a removed box brings it back
+p = np.array(sorted(removed)[1]) + 1e-3
+t.insert(p)
+check('inserted',t)
+i = t.search(p)
+print '  insert after remove: found', i >= 0 and \
+	tuple(t.boxes().corners[i]) in removed
+
+c = Tree(np.array([[0.0,0,0],[1,1,1]]),full=True)
+c.subdivide(3)
+check('3d',c)
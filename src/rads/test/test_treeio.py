@@ -0,0 +1,93 @@
+#!/usr/bin/python
+
+# round trip a pruned tree through Tree.save / Tree.load, with and
+# without memory mapping
+
+import os
+import tempfile
+import numpy as np
+from rads.enclosure import Tree
+
+box = np.array([[0.0,0],[8,8]])
+t = Tree(box,full=True)
+t.subdivide(6)
+t.remove(range(0,t.size,3))
+
+path = os.path.join(tempfile.mkdtemp(),'test.tree')
+t.save(path)
+print 'saved', t.size, 'boxes,', os.path.getsize(path), 'bytes'
+
+pts = np.random.uniform(0,8,(1000,2))
+ids = t.search_points(pts)
+
+for mmap in [True,False]:
+	u = Tree.load(path,mmap=mmap)
+	print 'mmap =', mmap,
+	print u.size == t.size and u.depth == t.depth,
+	print (u.bbox == t.bbox).all(),
+	print (u.boxes().corners == t.boxes().corners).all(),
+	print (u.search_points(pts) == ids).all()
+
+	# modifying a loaded tree copies the mapped arrays first
+	u.remove([0])
+	u.insert(np.array([[0.0,0],[1,1]]))
+	print '  after remove/insert:', u.size
+
+os.remove(path)
+
+# a copy shares the arrays of the tree until one of them really
+# changes: sorting a sorted copy writes nothing, and removing boxes
+# from one builds new arrays for it, without touching the shared ones
+t = Tree(box,full=True)
+t.subdivide(6)
+c = t.copy()
+c.sort()
+print 'sorted copy still shared:', c.unshared_memory == 0 and t.unshared_memory == 0
+c2 = t.copy()
+corners = t.boxes().corners.copy()
+c.remove(range(0,c.size,3))
+print 'remove from a copy:', c.size, 'boxes;',
+print 'original unchanged and still shared:', \
+	t.size == len(corners) and (t.boxes().corners == corners).all() and \
+	t.unshared_memory == 0 and c2.unshared_memory == 0
+
+# a damaged file is refused, not used: a truncated one, one with a
+# child link pointing past the nodes, and one with a cycle in the links
+t.save(path)
+data = open(path,'rb').read()
+with open(path,'wb') as f:
+	f.write(data[:len(data)/2])
+bad = []
+for mmap in [True,False]:
+	try:
+		Tree.load(path,mmap=mmap)
+		bad.append(False)
+	except IOError:
+		bad.append(True)
+# the header starts with the number of nodes (after the magic, version,
+# dim and depth), then come the root box, the nodes (16 bytes each) and
+# the links
+nnodes = np.frombuffer(data[20:24],dtype=np.int32)[0]
+links = data.find(np.asarray(box,dtype=np.double).tobytes()) + box.nbytes + 16*nnodes
+with open(path,'wb') as f:
+	f.write(data[:links] + np.int32(1<<30).tobytes() + data[links+4:])
+for mmap in [True,False]:
+	try:
+		Tree.load(path,mmap=mmap)
+		bad.append(False)
+	except IOError:
+		bad.append(True)
+# the first child of node 1 made node 1 itself (the children offset is
+# the last field of a node)
+nodes = links - 16*nnodes
+child = links + 4*np.frombuffer(data[nodes+16+12:nodes+16+16],dtype=np.int32)[0]
+with open(path,'wb') as f:
+	f.write(data[:child] + np.int32(1).tobytes() + data[child+4:])
+for mmap in [True,False]:
+	try:
+		Tree.load(path,mmap=mmap)
+		bad.append(False)
+	except IOError:
+		bad.append(True)
+print 'damaged files refused:', bad
+os.remove(path)